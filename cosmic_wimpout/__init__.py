@@ -0,0 +1,123 @@
+"""
+Cosmic Wimpout
+
+A Python implementation of the dice game Cosmic Wimpout.
+
+Importing the package imports none of its modules. Every public name is
+imported from its module the first time it is used, so worker processes
+only pay for the engines they play with, and the NumPy engines, solvers
+and server are never loaded unless they are asked for.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Dict, List
+
+
+__all__ = (
+    'Face',
+    'Player',
+    'Policy',
+    'ThresholdPolicy',
+    'DiceStream',
+    'ScoringLogic',
+    'TurnLogic',
+    'CosmicWimpout',
+    'ConsoleDecisions',
+    'RemoteDecisions',
+    'ScriptedDecisions',
+    'CallableDecisions',
+    'HeadlessTurnLogic',
+    'SimulationResult',
+    'TurnSimulator',
+    'GameSimulator',
+    'MonteCarloRunner',
+    'TurnStatistics',
+    'BatchThresholdPolicy',
+    'BatchTurnLogic',
+    'TurnSolver',
+    'OptimalPolicy',
+    'CompiledPolicy',
+    'compile_policy',
+    'TurnEstimator',
+    'WinOracle',
+    'OraclePolicy',
+    'League',
+    'GameServer',
+    'TurnProfiler',
+    'TurnRecorder',
+    'GameRecorder',
+    'load_columns',
+)
+
+
+# the module defining every public name
+_MODULES: Dict[str, str] = {
+    'Face': 'dice',
+    'Player': 'player',
+    'Policy': 'policy',
+    'ThresholdPolicy': 'policy',
+    'DiceStream': 'rng',
+    'ScoringLogic': 'cosmic_wimpout',
+    'TurnLogic': 'cosmic_wimpout',
+    'CosmicWimpout': 'cosmic_wimpout',
+    'ConsoleDecisions': 'decisions',
+    'RemoteDecisions': 'decisions',
+    'ScriptedDecisions': 'decisions',
+    'CallableDecisions': 'decisions',
+    'HeadlessTurnLogic': 'simulator',
+    'SimulationResult': 'simulator',
+    'TurnSimulator': 'simulator',
+    'GameSimulator': 'simulator',
+    'MonteCarloRunner': 'runner',
+    'TurnStatistics': 'stats',
+    'BatchThresholdPolicy': 'batch',
+    'BatchTurnLogic': 'batch',
+    'TurnSolver': 'solver',
+    'OptimalPolicy': 'solver',
+    'CompiledPolicy': 'compiled_policy',
+    'compile_policy': 'compiled_policy',
+    'TurnEstimator': 'estimators',
+    'WinOracle': 'oracle',
+    'OraclePolicy': 'oracle',
+    'League': 'league',
+    'GameServer': 'server',
+    'TurnProfiler': 'profiling',
+    'TurnRecorder': 'export',
+    'GameRecorder': 'export',
+    'load_columns': 'export',
+}
+
+
+if TYPE_CHECKING:
+    from .batch import BatchThresholdPolicy, BatchTurnLogic
+    from .compiled_policy import CompiledPolicy, compile_policy
+    from .cosmic_wimpout import CosmicWimpout, ScoringLogic, TurnLogic
+    from .decisions import CallableDecisions, ConsoleDecisions, RemoteDecisions, ScriptedDecisions
+    from .dice import Face
+    from .estimators import TurnEstimator
+    from .export import GameRecorder, TurnRecorder, load_columns
+    from .league import League
+    from .oracle import OraclePolicy, WinOracle
+    from .player import Player
+    from .policy import Policy, ThresholdPolicy
+    from .profiling import TurnProfiler
+    from .rng import DiceStream
+    from .runner import MonteCarloRunner
+    from .server import GameServer
+    from .simulator import GameSimulator, HeadlessTurnLogic, SimulationResult, TurnSimulator
+    from .solver import OptimalPolicy, TurnSolver
+    from .stats import TurnStatistics
+
+
+def __getattr__(name: str) -> Any:
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(f'.{module}', __name__), name)
+    # later lookups find the name without calling this again
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(__all__)
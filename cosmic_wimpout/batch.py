@@ -0,0 +1,394 @@
+"""
+Vectorized batch turn logic
+
+Holds many turns in parallel as NumPy arrays and rolls and scores all
+of them with array operations. The scoring steps mirror the standard
+rules of :class:`ScoringLogic` rule for rule, including the order in
+which they are applied, so the results are statistically identical to
+the scalar engine when both are driven by equivalent policies.
+
+Faces are encoded as indices into :data:`FACES`. A black die that was
+not rolled and an unset clearing face are both encoded as ``-1``.
+"""
+
+from typing import Optional, Union
+
+import numpy as np
+
+from .dice import WhiteDie, Face
+from .cosmic_wimpout import TurnLogic
+from .rng import DRAW_RANGE, DiceStream
+from .rolls import WHITE_ROLLS, roll_sampler
+from .simulator import SimulationResult
+from .stats import TurnStatistics
+
+
+__all__ = (
+    'FACES',
+    'BatchPolicy',
+    'BatchThresholdPolicy',
+    'BatchTurnLogic',
+)
+
+
+FACES = tuple(Face)
+
+_WHITE = [FACES.index(face) for face in WhiteDie().faces]
+_TWO, _THREE, _FOUR, _FIVE, _SIX, _TEN, _SUN = (FACES.index(face) for face in Face)
+_NONE = -1
+
+
+def _build_roll_samplers():
+    """Builds the equally likely rolls of every dice state, indexed by
+    ``(remaining white * 2 + remaining black) * 8 + clearing face + 1``
+    :return: table of rolls as white face counts and black face, padded
+             to the largest state, and the number of rolls of each state
+    """
+    states = 5 * 2 * (len(FACES) + 1)
+    samplers = [roll_sampler(remaining_white, remaining_black, clearing)
+                for remaining_white in range(5) for remaining_black in (False, True)
+                for clearing in range(len(FACES) + 1)]
+    white_counts = np.zeros((states, max(map(len, samplers)), len(_WHITE)), dtype=np.int8)
+    black_faces = np.full((states, white_counts.shape[1]), _NONE, dtype=np.int8)
+    sizes = np.zeros(states, dtype=np.int64)
+    for state, sampler in enumerate(samplers):
+        rolls = np.array(sampler, dtype=np.int64)
+        white_counts[state, :len(rolls)] = np.array(WHITE_ROLLS, dtype=np.int8)[rolls >> 3]
+        # face codes are FACES indices shifted by one, 0 standing for no face
+        black_faces[state, :len(rolls)] = (rolls & 7) - 1
+        sizes[state] = len(rolls)
+    return white_counts, black_faces, sizes
+
+
+_ROLL_WHITE_COUNTS, _ROLL_BLACK_FACES, _ROLL_SIZES = _build_roll_samplers()
+
+# every state has a number of rolls dividing DRAW_RANGE ** 5, so
+# five draws read as a base DRAW_RANGE number pick a roll uniformly
+_DRAW_WEIGHTS = DRAW_RANGE ** np.arange(5, dtype=np.int64)
+
+_THREE_OF_A_KIND_POINTS = np.array(
+    [TurnLogic.get_three_of_a_kind_points(face) for face in FACES], dtype=np.int64)
+_FIVE_OF_A_KIND_POINTS = np.array(
+    [0 if face in (Face.SIX, Face.TEN) else TurnLogic.get_five_of_a_kind_points(face)
+     for face in FACES], dtype=np.int64)
+
+
+class BatchPolicy:
+    """Vectorized counterpart of :class:`Policy`.
+
+    Every method receives the batch and an index array selecting the
+    turns that need an answer, and returns an array of 1-based choices
+    for those turns. The defaults match :class:`Policy`.
+    """
+
+    __slots__ = ()
+
+    def keep_playing_choice(self, batch: 'BatchTurnLogic', index: np.ndarray) -> np.ndarray:
+        return np.full(len(index), 2, dtype=np.int8)
+
+    def sun_die_use_choice(self, batch: 'BatchTurnLogic', index: np.ndarray) -> np.ndarray:
+        return np.full(len(index), 1, dtype=np.int8)
+
+    def sun_die_point_choice(self, batch: 'BatchTurnLogic', index: np.ndarray) -> np.ndarray:
+        return np.full(len(index), 2, dtype=np.int8)
+
+    def sun_trio_choice(self, batch: 'BatchTurnLogic', index: np.ndarray, faces: np.ndarray) -> np.ndarray:
+        """:param faces: (len(index), 2) array of the candidate faces"""
+        points = _THREE_OF_A_KIND_POINTS[faces]
+        return np.where(points[:, 1] > points[:, 0], 2, 1).astype(np.int8)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}>'
+
+
+class BatchThresholdPolicy(BatchPolicy):
+    """Vectorized counterpart of :class:`ThresholdPolicy`."""
+
+    __slots__ = (
+        'target',
+        'min_dice',
+    )
+
+    def __init__(self, target: int = 35, min_dice: int = 1):
+        self.target: int = target
+        self.min_dice: int = min_dice
+
+    def keep_playing_choice(self, batch: 'BatchTurnLogic', index: np.ndarray) -> np.ndarray:
+        dice_left = batch.remaining_white[index] + batch.remaining_black[index]
+        keep_playing = (batch.score[index] < self.target) & (dice_left >= self.min_dice)
+        return np.where(keep_playing, 1, 2).astype(np.int8)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} target={self.target} min_dice={self.min_dice}>'
+
+
+class BatchTurnLogic:
+    """Resolves many turns in parallel.
+
+    Attributes
+    -----------
+    size: :class:`int`
+        The number of turns held by the batch.
+    policy: :class:`BatchPolicy`
+        The policy answering every decision of every turn.
+    rng: Union[:class:`DiceStream`, :class:`numpy.random.Generator`]
+        The random generator used to roll the dice.
+    score: :class:`numpy.ndarray`
+        The total accumulated score of each turn.
+    white_die_rolls: :class:`numpy.ndarray`
+        A (size, 6) array counting how many times each white
+        face was rolled, in :data:`FACES` order.
+    black_die_roll: :class:`numpy.ndarray`
+        The face rolled on the black die of each turn.
+    remaining_white: :class:`numpy.ndarray`
+        The number of white dice still able to be rolled.
+    remaining_black: :class:`numpy.ndarray`
+        If the black die is still able to be rolled.
+    clearing_face: :class:`numpy.ndarray`
+        The face that must be cleared in each turn.
+    scoring_dice: :class:`numpy.ndarray`
+        If at least one die scored points for the last roll.
+    active: :class:`numpy.ndarray`
+        If the turn is still in progress.
+    instant: :class:`numpy.ndarray`
+        ``1`` if the turn instantly won the game, ``-1`` if it
+        instantly lost the game and ``0`` otherwise.
+    """
+
+    __slots__ = (
+        'size',
+        'policy',
+        'rng',
+        'score',
+        'white_die_rolls',
+        'black_die_roll',
+        'remaining_white',
+        'remaining_black',
+        'clearing_face',
+        'scoring_dice',
+        'active',
+        'instant',
+        '_draws',
+    )
+
+    def __init__(self, size: int, policy: Optional[BatchPolicy] = None,
+                 rng: Optional[Union[DiceStream, np.random.Generator]] = None):
+        self.size: int = size
+        self.policy: BatchPolicy = policy or BatchPolicy()
+        self.rng: Union[DiceStream, np.random.Generator] = rng if rng is not None else DiceStream()
+        self.score = np.zeros(size, dtype=np.int64)
+        self.white_die_rolls = np.zeros((size, len(_WHITE)), dtype=np.int8)
+        self.black_die_roll = np.full(size, _NONE, dtype=np.int8)
+        self.remaining_white = np.full(size, 4, dtype=np.int8)
+        self.remaining_black = np.ones(size, dtype=bool)
+        self.clearing_face = np.full(size, _NONE, dtype=np.int8)
+        self.scoring_dice = np.zeros(size, dtype=bool)
+        self.active = np.ones(size, dtype=bool)
+        self.instant = np.zeros(size, dtype=np.int8)
+        # one draw for each white die and the black die of every turn
+        self._draws = np.zeros((size, 5), dtype=np.uint8)
+
+    def reset(self) -> None:
+        self.score[:] = 0
+        self.white_die_rolls[:] = 0
+        self.black_die_roll[:] = _NONE
+        self.remaining_white[:] = 4
+        self.remaining_black[:] = True
+        self.clearing_face[:] = _NONE
+        self.scoring_dice[:] = False
+        self.active[:] = True
+        self.instant[:] = 0
+
+    def resolve_turns(self) -> None:
+        """Resolves every turn of the batch until all of them ended"""
+        index = np.flatnonzero(self.active)
+        while len(index):
+            self._resolve_turns(index)
+            index = self._continue_turns(index)
+
+    def _resolve_turns(self, index: np.ndarray) -> None:
+        self._roll_dice(index)
+        self.scoring_dice[index] = False
+        self.clearing_face[index] = _NONE
+
+        index = self._test_five_of_a_kind(index)
+        self._test_three_of_a_kind(index)
+        self._test_forced_three_of_a_kind(index)
+        self._test_single_scoring_dice(index)
+        self._test_single_sun_die(index)
+
+    def _continue_turns(self, index: np.ndarray) -> np.ndarray:
+        """Mirrors the continuation rules of :meth:`TurnLogic.resolve_turn`
+        :return: index of the turns still in progress
+        """
+        index = index[self.active[index]]
+
+        # if all dice were used, we should continue
+        consumed = (self.remaining_white[index] == 0) & ~self.remaining_black[index]
+        self.remaining_white[index[consumed]] = 4
+        self.remaining_black[index[consumed]] = True
+
+        # if a clearing face was set, we should continue
+        undecided = index[~consumed & (self.clearing_face[index] == _NONE)]
+
+        # if no scoring dice were rolled, we need to stop
+        bust = undecided[~self.scoring_dice[undecided]]
+        self.score[bust] = 0
+        self.active[bust] = False
+
+        # ask the policy if it wants to keep playing
+        asked = undecided[self.scoring_dice[undecided]]
+        if len(asked):
+            stop = asked[self.policy.keep_playing_choice(self, asked) != 1]
+            self.active[stop] = False
+
+        return index[self.active[index]]
+
+    def _test_five_of_a_kind(self, index: np.ndarray) -> np.ndarray:
+        """:return: index of the turns that did not end instantly"""
+        black = self.black_die_roll[index].astype(np.int64)
+        rolled = (black != _NONE) & (black != _SUN)
+        counts = self.white_die_rolls[index, np.where(rolled, black, 0)]
+        hit = index[rolled & (counts == 4)]
+        if not len(hit):
+            return index
+
+        face = self.black_die_roll[hit].astype(np.int64)
+        self.instant[hit[face == _SIX]] = 1
+        self.instant[hit[face == _TEN]] = -1
+        self.active[hit[(face == _SIX) | (face == _TEN)]] = False
+
+        self.score[hit] += _FIVE_OF_A_KIND_POINTS[face]
+        self.white_die_rolls[hit, face] = 0
+        self.black_die_roll[hit] = _NONE
+        self.remaining_white[hit] = 0
+        self.remaining_black[hit] = False
+        self.scoring_dice[hit] = True
+        return index[self.active[index]]
+
+    def _test_three_of_a_kind(self, index: np.ndarray) -> None:
+        for face in range(len(_WHITE)):
+            counts = self.white_die_rolls[index, face]
+
+            # check for three of a kind using only white dice
+            white_only = counts >= 3
+            hit = index[white_only]
+            self.score[hit] += _THREE_OF_A_KIND_POINTS[face]
+            self.clearing_face[hit] = face
+            self.white_die_rolls[hit, face] -= 3
+            self.remaining_white[hit] -= 3
+            self.scoring_dice[hit] = True
+
+            # check for three of a kind using black die
+            hit = index[~white_only & (counts == 2) & (self.black_die_roll[index] == face)]
+            self.score[hit] += _THREE_OF_A_KIND_POINTS[face]
+            self.clearing_face[hit] = face
+            self.white_die_rolls[hit, face] -= 2
+            self.black_die_roll[hit] = _NONE
+            self.remaining_white[hit] -= 2
+            self.remaining_black[hit] = False
+            self.scoring_dice[hit] = True
+
+    def _test_forced_three_of_a_kind(self, index: np.ndarray) -> None:
+        index = index[self.black_die_roll[index] == _SUN]
+        pairs = self.white_die_rolls[index] == 2
+        num_pairs = pairs.sum(axis=1)
+
+        single = index[num_pairs == 1]
+        face = pairs[num_pairs == 1].argmax(axis=1)
+
+        multiple = index[num_pairs > 1]
+        if len(multiple):
+            # faces are offered in white die order, like the scalar prompt
+            candidates = np.nonzero(pairs[num_pairs > 1])[1].reshape(-1, 2)
+            choice = self.policy.sun_trio_choice(self, multiple, candidates) - 1
+            single = np.concatenate((single, multiple))
+            face = np.concatenate((face, candidates[np.arange(len(multiple)), choice]))
+
+        self.score[single] += _THREE_OF_A_KIND_POINTS[face]
+        self.clearing_face[single] = face
+        self.white_die_rolls[single, face] -= 2
+        self.black_die_roll[single] = _NONE
+        self.remaining_white[single] -= 2
+        self.remaining_black[single] = False
+        self.scoring_dice[single] = True
+
+    def _test_single_scoring_dice(self, index: np.ndarray) -> None:
+        for face, points in ((_FIVE, 5), (_TEN, 10)):
+            counts = self.white_die_rolls[index, face]
+            hit = index[counts > 0]
+            self.score[hit] += counts[counts > 0] * points
+            self.white_die_rolls[hit, face] = 0
+            self.remaining_white[hit] -= counts[counts > 0]
+            self.scoring_dice[hit] = True
+
+            hit = index[self.black_die_roll[index] == face]
+            self.score[hit] += points
+            self.black_die_roll[hit] = _NONE
+            self.remaining_black[hit] = False
+            self.scoring_dice[hit] = True
+
+    def _test_single_sun_die(self, index: np.ndarray) -> None:
+        index = index[self.black_die_roll[index] == _SUN]
+        if not len(index):
+            return
+
+        # if dice were already scored, the policy doesn't have to use the sun die
+        optional = index[self.scoring_dice[index]]
+        if len(optional):
+            kept = optional[self.policy.sun_die_use_choice(self, optional) == 2]
+            index = np.setdiff1d(index, kept, assume_unique=True)
+            if not len(index):
+                return
+
+        points = np.where(self.policy.sun_die_point_choice(self, index) == 1, 5, 10)
+        self.score[index] += points
+        self.black_die_roll[index] = _NONE
+        self.remaining_black[index] = False
+        self.scoring_dice[index] = True
+
+    def _roll_dice(self, index: np.ndarray) -> None:
+        rng = self.rng
+        state = (self.remaining_white[index].astype(np.int64) * 2 + self.remaining_black[index]) * 8 \
+            + self.clearing_face[index] + 1
+        sizes = _ROLL_SIZES[state]
+
+        # pick one of the equally likely rolls of every turn, which
+        # rolls all of its dice without the clearing face at once
+        if isinstance(rng, DiceStream):
+            draws = rng.fill(self._draws[:len(index)])
+            roll = draws @ _DRAW_WEIGHTS % sizes
+        else:
+            roll = rng.integers(0, sizes)
+
+        self.white_die_rolls[index] = _ROLL_WHITE_COUNTS[state, roll]
+        self.black_die_roll[index] = _ROLL_BLACK_FACES[state, roll]
+
+    def simulate(self, turns: int, statistics: Optional[TurnStatistics] = None) -> SimulationResult:
+        """Plays turns in batches and aggregates their outcomes
+        :param turns: number of turns to play
+        :param statistics: statistics fed the final score of every turn  [default None]
+        :return: the aggregated outcome of every turn
+        """
+        result = SimulationResult(turns=turns, statistics=statistics)
+        remaining = turns
+        while remaining > 0:
+            self.reset()
+            if remaining < self.size:
+                self.active[remaining:] = False
+            self.resolve_turns()
+
+            played = slice(0, min(remaining, self.size))
+            instant = self.instant[played]
+            score = self.score[played][instant == 0]
+            result.total_score += int(score.sum())
+            result.busts += int((score == 0).sum())
+            result.instant_wins += int((instant == 1).sum())
+            result.instant_losses += int((instant == -1).sum())
+            if statistics is not None:
+                statistics.add_scores(score, int((instant == 1).sum()), int((instant == -1).sum()))
+            remaining -= self.size
+        return result
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} size={self.size} policy={self.policy!r}>'
@@ -0,0 +1,462 @@
+"""
+Benchmarks
+
+Run with ``cosmic-wimpout bench`` or ``python -m cosmic_wimpout.bench``.
+Every workload uses fixed seeds, so two runs measure the same dice.
+Results can be saved as JSON and compared against a stored baseline to
+flag regressions::
+
+    cosmic-wimpout bench --output baseline.json
+    cosmic-wimpout bench --baseline baseline.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from array import array
+from typing import Callable, Dict, List, Optional
+
+from .policy import ThresholdPolicy
+from .rng import DiceStream
+from .simulator import HeadlessTurnLogic, TurnSimulator
+from .throwables import CosmicWimpoutException
+
+
+__all__ = (
+    'bench_rolls',
+    'bench_scoring',
+    'bench_turns',
+    'bench_turn_memory',
+    'bench_roll_allocations',
+    'bench_allocation_control',
+    'bench_imports',
+    'bench_pools',
+    'bench_listeners',
+    'run_benchmarks',
+    'save_results',
+    'load_results',
+    'compare_results',
+)
+
+
+Results = Dict[str, Dict[str, float]]
+
+# modules the engine must not import unless they are asked for
+HEAVY_MODULES = ('numpy', 'asyncio', 'socket', 'concurrent.futures')
+
+# imports the engine used by a worker and reports the time it took
+_IMPORT_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import cosmic_wimpout.simulator
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, len(sys.modules), len(heavy))
+'''
+
+
+def _measure_allocations(step: Callable[[], None], count: int) -> Dict[str, float]:
+    """Measures the memory allocated by running a step many times
+
+    CPython does not count allocations as they happen, and memory freed
+    within a step never shows in what is left allocated after it, so
+    every step is traced on its own: the peak of the traced memory is
+    reset before the step and read after it. Tracing slows down every
+    allocation, so the step is timed in a separate run without it.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        remaining = count
+        while remaining:
+            step()
+            remaining -= 1
+        elapsed = time.perf_counter() - start
+
+        # filled in place, so storing a peak allocates nothing
+        peaks = array('q', bytes(8 * count))
+        get_traced_memory = tracemalloc.get_traced_memory
+        reset_peak = tracemalloc.reset_peak
+        tracemalloc.start()
+        try:
+            blocks = sys.getallocatedblocks()
+            for index in range(count):
+                traced, _ = get_traced_memory()
+                reset_peak()
+                step()
+                peaks[index] = get_traced_memory()[1] - traced
+            blocks = sys.getallocatedblocks() - blocks
+        finally:
+            tracemalloc.stop()
+    finally:
+        gc.enable()
+
+    return {
+        'per_sec': count / elapsed,
+        'allocating_steps': sum(1 for peak in peaks if peak > 0),
+        'peak_bytes_per_step': sum(peaks) / count,
+        'retained_blocks': blocks,
+    }
+
+
+def bench_rolls(rolls: int = 200_000, seed: int = 0) -> Dict[str, float]:
+    """Measures how fast the dice of a fresh turn are rolled
+    :param rolls: number of rolls to make
+    :param seed: seed of the dice  [default 0]
+    :return: the measurements
+    """
+    turn_logic = HeadlessTurnLogic(rng=DiceStream(seed))
+    roll_dice = turn_logic._roll_dice
+
+    start = time.perf_counter()
+    for _ in range(rolls):
+        roll_dice()
+    elapsed = time.perf_counter() - start
+
+    return {'rolls': rolls, 'rolls_per_sec': rolls / elapsed}
+
+
+def bench_scoring(rolls: int = 100_000, seed: int = 0) -> Dict[str, float]:
+    """Measures how fast rolls are scored, both by running every rule
+    and by looking the roll up in the compiled scoring table
+    :param rolls: number of rolls to score
+    :param seed: seed of the dice  [default 0]
+    :return: the measurements
+    """
+    turn_logic = HeadlessTurnLogic(rng=DiceStream(seed))
+    scoring = turn_logic.scoring
+    scoring.compile()
+
+    # the same rolls are scored both ways
+    dice = []
+    for _ in range(rolls):
+        turn_logic._roll_dice()
+        dice.append((turn_logic.white_roll, turn_logic.black_roll))
+
+    def run(score_roll: Callable[[], None]) -> float:
+        reset = turn_logic.reset
+        start = time.perf_counter()
+        for white_roll, black_roll in dice:
+            reset()
+            turn_logic.white_roll = white_roll
+            turn_logic.black_roll = black_roll
+            try:
+                score_roll()
+            except CosmicWimpoutException:
+                pass
+        return rolls / (time.perf_counter() - start)
+
+    return {
+        'rolls': rolls,
+        'rule_evaluations_per_sec': run(turn_logic._score_roll),
+        'lookups_per_sec': run(turn_logic._lookup_roll),
+    }
+
+
+def bench_turns(turns: int = 100_000, seed: int = 0) -> Dict[str, float]:
+    """Measures how fast full turns are played with scripted decisions
+    :param turns: number of turns to play
+    :param seed: seed of the dice  [default 0]
+    :return: the measurements
+    """
+    simulator = TurnSimulator(ThresholdPolicy(), DiceStream(seed))
+    simulator.turn_logic.scoring.compile()
+
+    start = time.perf_counter()
+    result = simulator.simulate(turns)
+    elapsed = time.perf_counter() - start
+
+    return {'turns': turns, 'turns_per_sec': turns / elapsed, 'mean_score': result.mean_score}
+
+
+def bench_turn_memory(turns: int = 20_000, seed: int = 0) -> Dict[str, float]:
+    """Measures the memory allocated by each simulated turn
+    :param turns: number of turns to play
+    :param seed: seed of the dice  [default 0]
+    :return: the measurements, per turn and in total
+    """
+    simulator = TurnSimulator(ThresholdPolicy(), DiceStream(seed))
+    play_turn = simulator.play_turn
+
+    def step():
+        try:
+            play_turn()
+        except CosmicWimpoutException:
+            pass
+
+    # warm up the scoring table and any lazily created state
+    for _ in range(1000):
+        step()
+
+    measured = _measure_allocations(step, turns)
+    return {
+        'turns': turns,
+        'allocating_turns': measured['allocating_steps'],
+        'peak_bytes_per_turn': measured['peak_bytes_per_step'],
+        'retained_blocks': measured['retained_blocks'],
+        'retained_blocks_per_turn': measured['retained_blocks'] / turns,
+    }
+
+
+def bench_roll_allocations(rolls: int = 100_000, seed: int = 0) -> Dict[str, float]:
+    """Measures the memory allocated by the per-roll path of a headless turn
+    :param rolls: number of rolls to make
+    :param seed: seed of the dice  [default 0]
+    :return: the measurements, per roll and in total
+    """
+    turn_logic = HeadlessTurnLogic(rng=DiceStream(seed))
+    resolve_roll = turn_logic._resolve_turn
+    reset = turn_logic.reset
+
+    def step():
+        reset()
+        try:
+            resolve_roll()
+        except CosmicWimpoutException:
+            pass
+
+    # warm up the scoring table and any lazily created state
+    for _ in range(1000):
+        step()
+
+    measured = _measure_allocations(step, rolls)
+    return {
+        'rolls': rolls,
+        'rolls_per_sec': measured['per_sec'],
+        'allocating_rolls': measured['allocating_steps'],
+        'peak_bytes_per_roll': measured['peak_bytes_per_step'],
+        'retained_blocks': measured['retained_blocks'],
+        'retained_blocks_per_roll': measured['retained_blocks'] / rolls,
+    }
+
+
+def bench_allocation_control(steps: int = 100_000, seed: int = 0) -> Dict[str, float]:
+    """Checks that the allocation measurements see allocations at all, by
+    measuring a step building a short-lived dict against a step doing nothing
+    :param steps: number of steps to run
+    :param seed: unused, as the steps roll no dice  [default 0]
+    :return: the measurements of both steps
+    """
+    def allocating():
+        {'a': [1, 2, 3]}
+
+    def empty():
+        pass
+
+    measured = {'steps': steps}
+    for name, step in (('control', allocating), ('empty', empty)):
+        allocations = _measure_allocations(step, steps)
+        measured[f'{name}_allocating_steps'] = allocations['allocating_steps']
+        measured[f'{name}_peak_bytes_per_step'] = allocations['peak_bytes_per_step']
+    return measured
+
+
+def bench_imports(runs: int = 5, seed: int = 0) -> Dict[str, float]:
+    """Measures how long a fresh interpreter takes to import the simulator,
+    which every worker process of a pool pays before playing its first turn
+    :param runs: number of interpreters to start, keeping the fastest
+    :param seed: unused, as imports roll no dice  [default 0]
+    :return: the measurements
+    """
+    script = _IMPORT_SCRIPT.format(heavy=HEAVY_MODULES)
+    package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', script], cwd=package, check=True,
+                                capture_output=True, text=True).stdout.split()
+        timings.append((float(output[0]), int(output[1]), int(output[2])))
+    seconds, modules, heavy_modules = min(timings)
+
+    return {'import_seconds': seconds, 'imported_modules': modules, 'heavy_modules': heavy_modules}
+
+
+def bench_pools(turns: int = 400_000, seed: int = 0) -> Dict[str, float]:
+    """Measures a simulation played by a process pool and by a thread pool
+    :param turns: number of turns to play
+    :param seed: root seed of the run  [default 0]
+    :return: the measurements of both pools
+    """
+    from .runner import MonteCarloRunner
+
+    # a single worker would play in the calling thread, skipping both pools
+    workers = max(os.cpu_count() or 1, 2)
+    # enough shards to keep every worker busy
+    shard_size = max(turns // (4 * workers), 1000)
+    measured = {'turns': turns, 'workers': workers}
+    for pool in ('process', 'thread'):
+        runner = MonteCarloRunner(ThresholdPolicy(), workers, shard_size, threads=pool == 'thread')
+        start = time.perf_counter()
+        result = runner.run(turns, seed)
+        measured[f'{pool}_turns_per_sec'] = turns / (time.perf_counter() - start)
+        # both pools play the same shards, so the scores must match
+        measured[f'{pool}_mean_score'] = result.mean_score
+
+    measured['thread_speedup'] = measured['thread_turns_per_sec'] / measured['process_turns_per_sec']
+    # free-threaded builds report if the GIL was turned back on, older ones always have it
+    measured['gil_enabled'] = int(getattr(sys, '_is_gil_enabled', lambda: True)())
+    return measured
+
+
+def bench_listeners(turns: int = 50_000, seed: int = 0) -> Dict[str, float]:
+    """Measures turns played with a listener, walking the rules one by one, against
+    the same turns played by table lookups, with the optimal policy, whose sun die
+    decisions depend on the turn score and dice left when they are asked
+    :param turns: number of turns to play
+    :param seed: seed of the dice  [default 0]
+    :return: the measurements, with the turns whose outcome differed
+    """
+    from .solver import OptimalPolicy, TurnSolver
+    from .stats import TurnStatistics
+
+    policy = OptimalPolicy(TurnSolver().solve())
+    results = []
+    for listening in (False, True):
+        simulator = TurnSimulator(policy, DiceStream(seed))
+        start = time.perf_counter()
+        result = simulator.simulate(turns, TurnStatistics(), count_rules=listening)
+        results.append((time.perf_counter() - start, result))
+    (lookup_seconds, lookups), (listener_seconds, listened) = results
+
+    # listeners only observe, so the same dice must play the same turns
+    mismatches = sum(getattr(lookups, name) != getattr(listened, name)
+                     for name in ('total_score', 'busts', 'instant_wins', 'instant_losses'))
+    return {
+        'turns': turns,
+        'lookup_turns_per_sec': turns / lookup_seconds,
+        'listener_turns_per_sec': turns / listener_seconds,
+        'listener_mismatches': mismatches,
+    }
+
+
+BENCHMARKS: Dict[str, Callable[..., Dict[str, float]]] = {
+    'rolls': bench_rolls,
+    'scoring': bench_scoring,
+    'turns': bench_turns,
+    'turn_memory': bench_turn_memory,
+    'roll_allocations': bench_roll_allocations,
+    'allocation_control': bench_allocation_control,
+    'imports': bench_imports,
+    'pools': bench_pools,
+    'listeners': bench_listeners,
+}
+
+
+def run_benchmarks(names: Optional[List[str]] = None, seed: int = 0) -> Results:
+    """Runs benchmarks
+    :param names: names of the benchmarks to run  [default all of them]
+    :param seed: seed of the dice  [default 0]
+    :return: the measurements of each benchmark
+    """
+    return {name: BENCHMARKS[name](seed=seed) for name in names or BENCHMARKS}
+
+
+def save_results(results: Results, path: str) -> None:
+    """Saves benchmark results as JSON
+    :param results: measurements of each benchmark
+    :param path: path of the file to write
+    """
+    document = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(path, 'w') as file:
+        json.dump(document, file, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Results:
+    """Loads benchmark results saved by :func:`save_results`
+    :param path: path of the file to read
+    :return: the measurements of each benchmark
+    """
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def compare_results(results: Results, baseline: Results, tolerance: float = 0.1) -> List[str]:
+    """Compares benchmark results against a baseline
+
+    Rates (``*_per_sec``) regress when they drop, and memory
+    measurements (``*_bytes*`` and ``*_blocks*``), times (``*_seconds``)
+    and module counts (``*_modules``) regress when they grow, by more
+    than the tolerance. Other values are not compared.
+
+    :param results: measurements of each benchmark
+    :param baseline: measurements to compare against
+    :param tolerance: fraction a measurement may worsen by  [default 0.1]
+    :return: a description of every regression
+    """
+    regressions = []
+    for name, measurements in results.items():
+        for metric, value in measurements.items():
+            expected = baseline.get(name, {}).get(metric)
+            if expected is None:
+                continue
+            if metric.endswith('_per_sec'):
+                regressed = value < expected * (1 - tolerance)
+            elif 'bytes' in metric or 'blocks' in metric:
+                # a small slack keeps zero allocation baselines from flapping
+                regressed = value > expected * (1 + tolerance) + 64
+            elif metric.endswith('_seconds') or metric.endswith('_modules'):
+                regressed = value > expected * (1 + tolerance)
+            else:
+                continue
+            if regressed:
+                regressions.append(f'{name}.{metric}: {value:,.3f} (baseline {expected:,.3f})')
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='cosmic-wimpout bench', description='Benchmarks the Cosmic Wimpout engine.')
+    parser.add_argument('benchmarks', nargs='*',
+                        help=f'benchmarks to run, any of {", ".join(BENCHMARKS)}  [default all of them]')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the dice')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--baseline', help='compare the results against this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='fraction a measurement may worsen by before it is flagged')
+    args = parser.parse_args(argv)
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark "{name}"')
+
+    results = run_benchmarks(args.benchmarks, args.seed)
+    for name, measurements in results.items():
+        print(name)
+        for metric, value in measurements.items():
+            print(f'{metric:>28}: {value:,.3f}' if isinstance(value, float) else f'{metric:>28}: {value:,}')
+
+    if args.output:
+        save_results(results, args.output)
+
+    # heavy modules are a regression whatever the baseline
+    if results.get('imports', {}).get('heavy_modules'):
+        print(f'REGRESSION importing the simulator loads one of {", ".join(HEAVY_MODULES)}')
+        return 1
+    control = results.get('allocation_control')
+    if control and control['control_allocating_steps'] < control['steps']:
+        print('REGRESSION the allocation measurements miss the allocations of the control step')
+        return 1
+    if results.get('listeners', {}).get('listener_mismatches'):
+        print('REGRESSION attaching a listener changes how turns are played')
+        return 1
+
+    if args.baseline:
+        regressions = compare_results(results, load_results(args.baseline), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
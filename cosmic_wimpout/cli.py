@@ -0,0 +1,162 @@
+"""
+Command line interface
+
+Run with ``cosmic-wimpout <command>`` once installed, or with
+``python -m cosmic_wimpout <command>``::
+
+    cosmic-wimpout play --players 2 --bots 1
+    cosmic-wimpout simulate --turns 1000000 --target 30
+    cosmic-wimpout simulate --turns 1000000 --export turns/
+    cosmic-wimpout solve --output optimal.table --compile optimal.cwpc
+    cosmic-wimpout profile --turns 100000 --folded turns.folded
+    cosmic-wimpout bench turns imports
+
+Every command imports the modules it needs when it runs, so asking for
+help or playing a game never loads the NumPy engines or the solver.
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+
+__all__ = (
+    'main',
+)
+
+
+def _play(args: argparse.Namespace) -> int:
+    from .cosmic_wimpout import CosmicWimpout, TurnLogic
+    from .decisions import ConsoleDecisions
+    from .policy import ThresholdPolicy
+    from .rng import DiceStream
+
+    if not 0 <= args.bots <= args.players:
+        raise SystemExit(f'error: --bots must be between 0 and {args.players}')
+    rng = DiceStream(args.seed)
+    people = args.players - args.bots
+    turn_logic = [TurnLogic(rng=rng, decisions=ConsoleDecisions(timeout=args.timeout)) for _ in range(people)]
+    turn_logic += [TurnLogic(rng=rng, decisions=ThresholdPolicy(args.target)) for _ in range(args.bots)]
+
+    game = CosmicWimpout(args.players, args.goal, turn_logic)
+    winner = game.play()
+    print()
+    for player in game.players:
+        print(f'{player}: {player.score} points')
+    print(f'Winner: {winner}')
+    return 0
+
+
+def _simulate(args: argparse.Namespace) -> int:
+    from .runner import MonteCarloRunner
+
+    if args.policy:
+        from .compiled_policy import CompiledPolicy
+        policy = CompiledPolicy.load(args.policy)
+    elif args.batch:
+        from .batch import BatchThresholdPolicy
+        policy = BatchThresholdPolicy(args.target, args.min_dice)
+    else:
+        from .policy import ThresholdPolicy
+        policy = ThresholdPolicy(args.target, args.min_dice)
+
+    runner = MonteCarloRunner(policy, args.workers, statistics=args.statistics, threads=args.threads,
+                              export=args.export)
+    result = runner.run(args.turns, args.seed)
+    print(result)
+    if result.statistics is not None:
+        print(result.statistics)
+    return 0
+
+
+def _solve(args: argparse.Namespace) -> int:
+    from .solver import OptimalPolicy, TurnSolver
+
+    table = TurnSolver(args.max_score).solve()
+    print(table)
+    if args.output:
+        table.save(args.output)
+    if args.compile:
+        from .compiled_policy import compile_policy
+        print(compile_policy(OptimalPolicy(table), args.goals, path=args.compile))
+    return 0
+
+
+def _profile(args: argparse.Namespace) -> int:
+    from .policy import ThresholdPolicy
+    from .profiling import TurnProfiler
+    from .rng import DiceStream
+    from .simulator import TurnSimulator
+
+    simulator = TurnSimulator(ThresholdPolicy(args.target, args.min_dice), DiceStream(args.seed))
+    simulator.turn_logic.scoring.compile()
+    profiler = TurnProfiler(rules=not args.lookups)
+    profiler.attach(simulator.turn_logic)
+    print(simulator.simulate(args.turns))
+    print(profiler.report())
+    if args.folded:
+        profiler.write_folded(args.folded)
+    return 0
+
+
+def _bench(args: argparse.Namespace) -> int:
+    from .bench import main as bench_main
+
+    return bench_main(args.arguments)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='cosmic-wimpout', description='Plays and analyzes Cosmic Wimpout.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    play = commands.add_parser('play', help='play a game on the console')
+    play.add_argument('--players', type=int, default=2, help='players in the game')
+    play.add_argument('--bots', type=int, default=0, help='players played by a threshold policy')
+    play.add_argument('--goal', type=int, default=500, help='points needed to win')
+    play.add_argument('--target', type=int, default=35, help='turn score at which bots end their turn')
+    play.add_argument('--timeout', type=float, help='seconds people have to answer')
+    play.add_argument('--seed', type=int, help='seed of the dice')
+    play.set_defaults(run=_play)
+
+    simulate = commands.add_parser('simulate', help='simulate many turns of a policy')
+    simulate.add_argument('--turns', type=int, default=1_000_000, help='turns to play')
+    simulate.add_argument('--target', type=int, default=35, help='turn score at which the policy ends its turn')
+    simulate.add_argument('--min-dice', type=int, default=1, help='fewest dice the policy rolls')
+    simulate.add_argument('--policy', help='play a compiled policy file instead of a threshold policy')
+    simulate.add_argument('--batch', action='store_true', help='play with the vectorized batch engine')
+    simulate.add_argument('--workers', type=int, help='worker processes or threads  [default one per CPU]')
+    simulate.add_argument('--threads', action='store_true', help='play the shards on threads instead of processes')
+    simulate.add_argument('--statistics', action='store_true', help='gather score statistics')
+    simulate.add_argument('--export', help='write every turn as columns to this directory')
+    simulate.add_argument('--seed', type=int, default=0, help='root seed of the run')
+    simulate.set_defaults(run=_simulate)
+
+    solve = commands.add_parser('solve', help='solve the optimal single turn strategy')
+    solve.add_argument('--max-score', type=int, default=1000, help='turn score at which turns are always banked')
+    solve.add_argument('--output', help='save the policy table to this file')
+    solve.add_argument('--compile', help='compile the optimal policy to this file')
+    solve.add_argument('--goals', type=int, nargs='+', default=[500], help='goals the compiled policy plays')
+    solve.set_defaults(run=_solve)
+
+    profile = commands.add_parser('profile', help='time every step of simulated turns')
+    profile.add_argument('--turns', type=int, default=100_000, help='turns to play')
+    profile.add_argument('--target', type=int, default=35, help='turn score at which the policy ends its turn')
+    profile.add_argument('--min-dice', type=int, default=1, help='fewest dice the policy rolls')
+    profile.add_argument('--lookups', action='store_true', help='time table lookups instead of every scoring rule')
+    profile.add_argument('--folded', help='write the timings as folded stacks for flame graph tools to this file')
+    profile.add_argument('--seed', type=int, default=0, help='seed of the dice')
+    profile.set_defaults(run=_profile)
+
+    # the benchmarks parse their own arguments, including their help
+    bench = commands.add_parser('bench', help='benchmark the engine', add_help=False)
+    bench.set_defaults(run=_bench)
+
+    args, arguments = parser.parse_known_args(argv)
+    if arguments and args.command != 'bench':
+        parser.error(f'unrecognized arguments: {" ".join(arguments)}')
+    args.arguments = arguments
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+Compiled policies
+
+Evaluates a :class:`Policy` once over every decision it can be asked and
+stores the answers in flat byte arrays, so playing the compiled policy
+costs an index computation per decision instead of running the policy.
+
+Keep playing decisions are compiled for every goal, game score bucket of
+the player and of their best opponent, turn score bucket and remaining
+dice. Sun die decisions are compiled for every goal, turn score bucket
+and roll asking a decision, where the roll includes the clearing face it
+was rolled with, but without game scores.
+
+A compiled policy is saved as a single file::
+
+    header      magic, version, game buckets, max score, score step,
+                goal count, decision count
+    goals       u4 per goal
+    roll index  i2 decision of every (clearing, white roll, black face),
+                -1 if the roll asks no decision
+    keep        u1 choice, indexed by goal, game bucket, opponent bucket,
+                score bucket, remaining white dice and black die
+    sun         u1 outcome index, indexed by goal, score bucket and decision
+
+Loaded files are memory-mapped, so every process playing the same file
+shares one copy of the tables.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dice import Face
+from .cosmic_wimpout import ScoringLogic
+from .policy import Policy
+from .rolls import FACE_BY_CODE, ROLL_FACES, WHITE_ROLLS
+from .scoring_table import NO_DECISION, SUN_USE_DECISION
+from .simulator import HeadlessTurnLogic
+from .solver import SCORE_STEP
+
+
+__all__ = (
+    'CompiledPolicy',
+    'compile_policy',
+)
+
+
+_MAGIC = b'CWPC'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHIHHI')
+
+_CLEARINGS = len(FACE_BY_CODE)
+_WHITE_ROLLS = len(WHITE_ROLLS)
+_ROLL_INDEX_SIZE = _CLEARINGS * _WHITE_ROLLS * _CLEARINGS
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+class CompiledPolicy(Policy):
+    """A policy answering every decision from compiled tables.
+
+    Turns outside the compiled space are answered by the closest entry:
+    turn scores above ``max_score`` as ``max_score``, game scores above
+    the goal as the goal, and goals that were not compiled as the first
+    goal. A sun die decision the tables do not hold, which can only be
+    asked while the scoring rules are walked one by one, is answered by
+    the base :class:`Policy`.
+
+    Attributes
+    -----------
+    goals: Tuple[:class:`int`, ...]
+        The goals the policy was compiled for.
+    game_buckets: :class:`int`
+        The number of buckets game scores up to the goal are split into.
+    max_score: :class:`int`
+        The highest turn score compiled.
+    score_step: :class:`int`
+        The turn score covered by each score bucket.
+    decisions: :class:`int`
+        The number of rolls asking a sun die decision.
+    path: Optional[:class:`str`]
+        The file the policy is mapped from, if any.
+    """
+
+    __slots__ = (
+        'goals',
+        'game_buckets',
+        'max_score',
+        'score_step',
+        'decisions',
+        'path',
+        '_buffer',
+        '_roll_index',
+        '_keep',
+        '_sun',
+        '_goal_index',
+        '_score_buckets',
+        '_keep_strides',
+        '_keep_bases',
+    )
+
+    def __init__(self, buffer, path: Optional[str] = None):
+        """
+        :param buffer: bytes-like object holding a compiled policy file
+        :param path: file the buffer was mapped from  [default None]
+        :raises ValueError: if the buffer is not a compiled policy
+        """
+        view = memoryview(buffer).cast('B')
+        magic, version, game_buckets, max_score, score_step, goals, decisions = _HEADER.unpack_from(view)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f'Not a version {_VERSION} compiled policy')
+
+        self.goals: Tuple[int, ...] = struct.unpack_from(f'<{goals}I', view, _HEADER.size)
+        self.game_buckets: int = game_buckets
+        self.max_score: int = max_score
+        self.score_step: int = score_step
+        self.decisions: int = decisions
+        self.path: Optional[str] = path
+        self._buffer = buffer
+        self._goal_index = {goal: index for index, goal in enumerate(self.goals)}
+        self._score_buckets: int = max_score // score_step + 1
+        # entries skipped by one step of the goal, game bucket and opponent bucket,
+        # where every score bucket holds ten choices
+        opponent_stride = self._score_buckets * 10
+        game_stride = (game_buckets + 1) * opponent_stride
+        self._keep_strides: Tuple[int, int, int] = ((game_buckets + 1) * game_stride, game_stride, opponent_stride)
+        self._keep_bases: Dict[Tuple[int, int, int], int] = {}
+
+        offset = _align(_HEADER.size + 4 * goals)
+        # the roll index is small enough to be copied into native order
+        self._roll_index = array('h')
+        self._roll_index.frombytes(view[offset:offset + 2 * _ROLL_INDEX_SIZE])
+        if sys.byteorder == 'big':
+            self._roll_index.byteswap()
+        offset = _align(offset + 2 * _ROLL_INDEX_SIZE)
+
+        keep_size = goals * (game_buckets + 1) ** 2 * self._score_buckets * 10
+        self._keep: memoryview = view[offset:offset + keep_size]
+        offset = _align(offset + keep_size)
+        self._sun: memoryview = view[offset:offset + goals * self._score_buckets * decisions]
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledPolicy':
+        """Maps a compiled policy file into memory
+        :param path: path of the file
+        :return: the compiled policy
+        """
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, path)
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as file:
+            file.write(self._buffer)
+
+    @property
+    def keep_table(self) -> np.ndarray:
+        """The keep playing choices, indexed by goal, game bucket, opponent
+        bucket, score bucket, remaining white dice and black die
+        """
+        return np.frombuffer(self._keep, np.uint8).reshape(
+            len(self.goals), self.game_buckets + 1, self.game_buckets + 1, self._score_buckets, 5, 2)
+
+    @property
+    def sun_table(self) -> np.ndarray:
+        """The outcome index of every sun die decision, indexed by goal, score bucket and decision"""
+        return np.frombuffer(self._sun, np.uint8).reshape(len(self.goals), self._score_buckets, self.decisions)
+
+    def _keep_base(self, context: Tuple[int, int, int]) -> int:
+        """Gets the offset of the keep playing choices of a game context
+        :param context: goal, game score and opponent score of the turn
+        """
+        goal, game_score, opponent_score = context
+        goal_index = self._goal_index.get(goal, 0)
+        goal = self.goals[goal_index]
+        buckets = self.game_buckets
+        goal_stride, game_stride, opponent_stride = self._keep_strides
+        base = (goal_index * goal_stride + min(game_score * buckets // goal, buckets) * game_stride
+                + min(opponent_score * buckets // goal, buckets) * opponent_stride)
+        self._keep_bases[context] = base
+        return base
+
+    def keep_playing_choice(self, turn) -> int:
+        # the game context only changes between turns, so its offset is cached
+        context = (turn.goal, turn.game_score, turn.opponent_score)
+        base = self._keep_bases.get(context)
+        if base is None:
+            base = self._keep_base(context)
+        score = turn.score
+        if score > self.max_score:
+            score = self.max_score
+        return self._keep[base + score // self.score_step * 10 + turn.remaining_white * 2 + turn.remaining_black]
+
+    def _option(self, turn) -> int:
+        """Gets the compiled outcome index of the rolled dice, or ``-1``"""
+        decision = self._roll_index[(turn.clearing * _WHITE_ROLLS + turn.white_roll) * _CLEARINGS + turn.black_roll]
+        if decision < 0:
+            return -1
+        goal_index = self._goal_index.get(turn.goal, 0)
+        score = min(turn.score, self.max_score) // self.score_step
+        return self._sun[(goal_index * self._score_buckets + score) * self.decisions + decision]
+
+    def sun_die_use_choice(self, turn) -> int:
+        option = self._option(turn)
+        if option < 0:
+            return super().sun_die_use_choice(turn)
+        # the outcomes of using the sun die are five points, ten points and keeping it
+        return 2 if option == 2 else 1
+
+    def sun_die_point_choice(self, turn) -> int:
+        option = self._option(turn)
+        if option < 0:
+            return super().sun_die_point_choice(turn)
+        return option + 1
+
+    def sun_trio_choice(self, turn, faces: Sequence[Face]) -> int:
+        option = self._option(turn)
+        if option < 0:
+            return super().sun_trio_choice(turn, faces)
+        return option + 1
+
+    def __reduce__(self):
+        # mapped policies are mapped again by each process instead of copied
+        if self.path is not None:
+            return CompiledPolicy.load, (self.path,)
+        return CompiledPolicy, (bytes(self._buffer),)
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} goals={self.goals} game_buckets={self.game_buckets} '
+                f'max_score={self.max_score} decisions={self.decisions}>')
+
+
+def compile_policy(policy: Policy, goals: Sequence[int] = (500,), game_buckets: int = 20, max_score: int = 1000,
+                   scoring: Optional[ScoringLogic] = None, path: Optional[str] = None) -> CompiledPolicy:
+    """Compiles a deterministic policy into lookup tables
+    :param policy: policy to compile
+    :param goals: goals of the games the policy plays  [default (500,)]
+    :param game_buckets: number of buckets game scores up to the goal are split into  [default 20]
+    :param max_score: highest turn score compiled  [default 1000]
+    :param scoring: rules used to score each roll  [default the standard rules]
+    :param path: file the compiled policy is saved to and mapped from  [default kept in memory]
+    :return: the compiled policy
+    :raises ValueError: if the policy answers with an invalid choice
+    """
+    scoring = scoring or ScoringLogic()
+    turn = HeadlessTurnLogic(policy, scoring=scoring)
+    score_buckets = max_score // SCORE_STEP + 1
+
+    # every roll asking a decision, with the clearing face it was rolled with
+    roll_index = np.full((_CLEARINGS, _WHITE_ROLLS, _CLEARINGS), -1, dtype='<i2')
+    decisions = []
+    for clearing, (white_die_faces, black_die_faces) in enumerate(ROLL_FACES):
+        for white_roll, counts in enumerate(WHITE_ROLLS):
+            if any(count and position not in white_die_faces for position, count in enumerate(counts)):
+                continue
+            for black_roll in black_die_faces:
+                turn.white_roll = white_roll
+                turn.black_roll = black_roll
+                entry = scoring.lookup(turn)
+                if entry.decision != NO_DECISION:
+                    roll_index[clearing, white_roll, black_roll] = len(decisions)
+                    decisions.append((clearing, white_roll, black_roll, entry))
+
+    keep = np.zeros((len(goals), game_buckets + 1, game_buckets + 1, score_buckets, 5, 2), dtype=np.uint8)
+    sun = np.zeros((len(goals), score_buckets, len(decisions)), dtype=np.uint8)
+    for goal_index, goal in enumerate(goals):
+        turn.goal = goal
+        turn.clearing = 0
+        for game in range(game_buckets + 1):
+            turn.game_score = game * goal // game_buckets
+            for opponent in range(game_buckets + 1):
+                turn.opponent_score = opponent * goal // game_buckets
+                for score in range(score_buckets):
+                    turn.score = score * SCORE_STEP
+                    for remaining_white in range(5):
+                        turn.remaining_white = remaining_white
+                        for remaining_black in (False, True):
+                            turn.remaining_black = remaining_black
+                            choice = policy.keep_playing_choice(turn)
+                            if choice not in (1, 2):
+                                raise ValueError(f'{policy!r} answered {choice!r} to keep playing')
+                            keep[goal_index, game, opponent, score, remaining_white, int(remaining_black)] = choice
+
+        turn.game_score = turn.opponent_score = 0
+        for score in range(score_buckets):
+            turn.score = score * SCORE_STEP
+            for decision, (clearing, white_roll, black_roll, entry) in enumerate(decisions):
+                turn.remaining_white = sum(WHITE_ROLLS[white_roll])
+                turn.remaining_black = True
+                turn.clearing = clearing
+                turn.white_roll = white_roll
+                turn.black_roll = black_roll
+                option = turn._choose_outcome(entry)
+                if not 0 <= option < len(entry.outcomes) or (entry.decision == SUN_USE_DECISION and option > 2):
+                    raise ValueError(f'{policy!r} answered an invalid choice to a sun die decision')
+                sun[goal_index, score, decision] = option
+
+    header = _HEADER.pack(_MAGIC, _VERSION, game_buckets, max_score, SCORE_STEP, len(goals), len(decisions))
+    header += struct.pack(f'<{len(goals)}I', *goals)
+    parts = [header, roll_index.tobytes(), keep.tobytes(), sun.tobytes()]
+    buffer = bytearray()
+    for part in parts:
+        buffer += part
+        buffer += bytes(_align(len(buffer)) - len(buffer))
+
+    if path is None:
+        return CompiledPolicy(bytes(buffer))
+    with open(path, 'wb') as file:
+        file.write(buffer)
+    return CompiledPolicy.load(path)
@@ -8,12 +8,21 @@ Date:   December 1, 2021
 See:    https://www.cosmicwimpout.com/how-to-play
 """
 
-from random import choice
-from typing import Optional, Dict, Any, Callable, TypeVar, List
-
-from dice import BlackDie, WhiteDie, Face
-from decorators import validate_choice
-from throwables import PlayerInstantlyWon, PlayerInstantlyLost
+from typing import Optional, Dict, Any, Callable, TypeVar, List, Sequence, Tuple
+
+from .dice import BlackDie, WhiteDie, Face
+from .player import Player
+from .policy import Policy
+from .decisions import ConsoleDecisions
+from .events import (BustEvent, ClearingFaceEvent, ConsoleRenderer, Listener, RollEvent, ScoreEvent, ScoreKind,
+                    TurnEndEvent, TurnEvent)
+from .rng import DiceStream
+from .rolls import (WHITE_DIE, BLACK_DIE, WHITE_FACES, FACE_BY_CODE, FACE_CODES,
+                   WHITE_ROLLS, WHITE_ROLL_INDEX, EMPTY_WHITE_ROLL, roll_sampler)
+from .scoring_table import (RollEntry, RollKey, ScoredRoll, build_scoring_table, get_scoring_table,
+                           index_roll_entries, DECISION_ANSWERS, NO_DECISION, SUN_TRIO_DECISION, SUN_USE_DECISION,
+                           SUN_POINT_DECISION)
+from .throwables import PlayerInstantlyWon, PlayerInstantlyLost
 
 
 TurnStateT = TypeVar('TurnStateT', bound='TurnState')
@@ -23,6 +32,11 @@ ScoreRule = Callable[[TurnStateT], Any]
 class TurnState:
     """Represents the state of a turn in progress.
 
+    The rolled dice and the clearing face are stored as the small
+    integers of :mod:`rolls`, so a state can be reused across turns
+    without building new objects. The :class:`Face` based attributes are views
+    over that compact encoding.
+
     Attributes
     -----------
     score: :class:`int`
@@ -39,6 +53,16 @@ class TurnState:
     remaining_black: :class:`bool`
         A boolean representing if the black die is still
         able to be rolled.
+    white_roll: :class:`int`
+        The index in ``WHITE_ROLLS`` of the white faces rolled.
+    white_counts: List[:class:`int`]
+        The number of times each white face was rolled, in
+        ``WHITE_FACES`` order. Scoring rules consume these.
+    black_roll: :class:`int`
+        The code of the face rolled on the black die, or ``0``
+        if the die was not rolled.
+    clearing: :class:`int`
+        The code of the clearing face, or ``0`` if not present.
     white_die_rolls: Dict[:class:`Face`, :class:`int`]
         A dictionary mapping each face of :class:`WhiteDie`
         to the number of times it was rolled.
@@ -57,26 +81,73 @@ class TurnState:
         'scoring_dice',
         'remaining_white',
         'remaining_black',
-        'white_die_rolls',
-        'black_die_roll',
-        'clearing_face',
+        'white_roll',
+        'white_counts',
+        'black_roll',
+        'clearing',
     )
 
     def __init__(self, **kwargs: Dict[str, Any]):
         self.score: int = kwargs.get('score', 0)
-        self.white_die: WhiteDie = kwargs.get('white_die') or WhiteDie()
-        self.black_die: BlackDie = kwargs.get('black_die') or BlackDie()
+        self.white_die: WhiteDie = kwargs.get('white_die') or WHITE_DIE
+        self.black_die: BlackDie = kwargs.get('black_die') or BLACK_DIE
         self.scoring_dice: bool = kwargs.get('scoring_dice', False)
         self.remaining_white: int = kwargs.get('remaining_white', 4)
         self.remaining_black: bool = kwargs.get('remaining_black', True)
-        self.white_die_rolls: Dict[Face, int] = kwargs.get('white_die_rolls') or {}
-        self.black_die_roll: Optional[Face] = kwargs.get('black_die_roll')
-        self.clearing_face: Optional[Face] = kwargs.get('clearing_face')
+        self.white_roll: int = EMPTY_WHITE_ROLL
+        self.white_counts: List[int] = [0] * len(WHITE_FACES)
+        self.black_roll: int = 0
+        self.clearing: int = 0
+        self.white_die_rolls = kwargs.get('white_die_rolls') or {}
+        self.black_die_roll = kwargs.get('black_die_roll')
+        self.clearing_face = kwargs.get('clearing_face')
+
+    @property
+    def white_die_rolls(self) -> Dict[Face, int]:
+        return {face: count for face, count in zip(WHITE_FACES, WHITE_ROLLS[self.white_roll]) if count}
+
+    @white_die_rolls.setter
+    def white_die_rolls(self, white_die_rolls: Dict[Face, int]) -> None:
+        counts = tuple([white_die_rolls.get(face, 0) for face in WHITE_FACES])
+        self.white_roll = WHITE_ROLL_INDEX[counts]
+        self.white_counts[:] = counts
+
+    @property
+    def black_die_roll(self) -> Optional[Face]:
+        return FACE_BY_CODE[self.black_roll]
+
+    @black_die_roll.setter
+    def black_die_roll(self, face: Optional[Face]) -> None:
+        self.black_roll = FACE_CODES[face]
+
+    @property
+    def clearing_face(self) -> Optional[Face]:
+        return FACE_BY_CODE[self.clearing]
+
+    @clearing_face.setter
+    def clearing_face(self, face: Optional[Face]) -> None:
+        self.clearing = FACE_CODES[face]
 
 
 class ScoringLogic:
-    """
+    """The pipeline of rules used to score a roll.
+
+    Each rule is a callable run on the :class:`TurnLogic` holding the
+    rolled dice. It consumes the dice it scores from ``white_counts``
+    and the black die, and adds its points to the turn. Rules run in
+    order, so a rule only sees the dice left over by the rules before it.
 
+    Rules can be registered, removed and reordered to play house rules.
+    Before the first roll is looked up, the rules are compiled into a
+    table holding the outcome of every possible roll, so playing with
+    custom rules costs a single lookup per roll like the standard ones.
+
+    Attributes
+    -----------
+    rules: Tuple[:class:`str`, ...]
+        The names of the rules, in the order they are run.
+    table: Dict[RollKey, :class:`RollEntry`]
+        The compiled outcome of every possible roll.
     """
 
     def __init__(self):
@@ -87,90 +158,371 @@ class ScoringLogic:
             self.__score_rule__single_scoring_dice,
             self.__score_rule__single_sun_die,
         ]
+        self._table: Optional[Dict[RollKey, RollEntry]] = None
+        self._entries: Optional[List[List[Optional[RollEntry]]]] = None
+
+    @staticmethod
+    def _rule_name(rule: ScoreRule) -> str:
+        return rule.__name__.replace('__score_rule__', '')
+
+    @property
+    def rules(self) -> Tuple[str, ...]:
+        return tuple(map(self._rule_name, self.__score_rules__))
+
+    def _index(self, name: str) -> int:
+        try:
+            return self.rules.index(name)
+        except ValueError:
+            raise ValueError(f'Unknown scoring rule "{name}"') from None
+
+    def register(self, rule: ScoreRule, before: Optional[str] = None) -> None:
+        """Adds a rule to the pipeline
+        :param rule: rule to add, named after its ``__name__``
+        :param before: name of the rule to run it before  [default last]
+        """
+        index = len(self.__score_rules__) if before is None else self._index(before)
+        self.__score_rules__.insert(index, rule)
+        self._table = self._entries = None
+
+    def unregister(self, name: str) -> ScoreRule:
+        """Removes a rule from the pipeline
+        :param name: name of the rule to remove
+        :return: the removed rule
+        """
+        rule = self.__score_rules__.pop(self._index(name))
+        self._table = self._entries = None
+        return rule
+
+    def reorder(self, names: Sequence[str]) -> None:
+        """Changes the order the rules are run in
+        :param names: name of every rule, in the new order
+        """
+        if sorted(names) != sorted(self.rules):
+            raise ValueError('The new order must name every scoring rule exactly once')
+        self.__score_rules__ = [self.__score_rules__[self._index(name)] for name in names]
+        self._table = self._entries = None
+
+    def _is_standard(self) -> bool:
+        standard = [ScoringLogic.__score_rule__five_of_a_kind,
+                    ScoringLogic.__score_rule__three_of_a_kind,
+                    ScoringLogic.__score_rule__forced_three_of_a_kind,
+                    ScoringLogic.__score_rule__single_scoring_dice,
+                    ScoringLogic.__score_rule__single_sun_die]
+        return type(self) is ScoringLogic \
+            and [getattr(rule, '__func__', None) for rule in self.__score_rules__] == standard
+
+    def compile(self) -> Dict[RollKey, RollEntry]:
+        """Scores every possible roll with the current rules
+
+        The standard rules share a table cached on disk, while any
+        other pipeline is compiled in memory.
+
+        :return: the compiled scoring table
+        """
+        if self._is_standard():
+            self._table = get_scoring_table()
+        else:
+            self._table = build_scoring_table(self)
+        self._entries = index_roll_entries(self._table)
+        return self._table
+
+    @property
+    def table(self) -> Dict[RollKey, RollEntry]:
+        return self._table if self._table is not None else self.compile()
+
+    def lookup(self, state: TurnState) -> RollEntry:
+        """Gets every possible outcome of the rolled dice
+        :param state: turn holding the rolled dice
+        :return: the entry of the roll in the scoring table
+        """
+        entries = self._entries
+        if entries is None:
+            self.compile()
+            entries = self._entries
+        return entries[state.black_roll][state.white_roll]
 
-    def ingest(self, state: TurnState) -> None:
-        for rule in self.__score_rules__:
+    @staticmethod
+    def apply(state: TurnState, outcome: ScoredRoll) -> None:
+        """Applies a scored roll to the turn
+        :param state: turn holding the rolled dice
+        :param outcome: outcome of the roll to apply
+        :raises PlayerInstantlyWon:  if five sixes were rolled
+        :raises PlayerInstantlyLost: if five tens were rolled
+        """
+        if outcome.instant == 1:
+            raise PlayerInstantlyWon()
+        if outcome.instant == -1:
+            raise PlayerInstantlyLost()
+        state.score += outcome.points
+        state.remaining_white -= outcome.white_used
+        if outcome.black_used:
+            state.black_roll = 0
+            state.remaining_black = False
+        state.clearing = outcome.clearing
+        state.scoring_dice = outcome.scoring_dice
+
+    def ingest(self, state: TurnState, option: int = 0) -> None:
+        """Scores the rolled dice
+        :param state: turn holding the rolled dice
+        :param option: index of the outcome to apply when the
+                       roll asks for a decision  [default 0]
+        """
+        self.apply(state, self.lookup(state).outcomes[option])
+
+    def score(self, state: 'TurnLogic', rules: Optional[Sequence[ScoreRule]] = None) -> None:
+        """Scores the rolled dice by running every rule in order
+        :param state: turn holding the rolled dice
+        :param rules: rules run in place of the pipeline, such as
+                      instrumented copies of it  [default the pipeline]
+        :raises PlayerInstantlyWon:  if five sixes were rolled
+        :raises PlayerInstantlyLost: if five tens were rolled
+        """
+        state.white_counts[:] = WHITE_ROLLS[state.white_roll]
+        state.scoring_dice = False
+        state.clearing = 0
+
+        for rule in self.__score_rules__ if rules is None else rules:
             rule(state)
 
-    def __score_rule__five_of_a_kind(self, state: TurnState) -> None:
-        pass
+    def __score_rule__five_of_a_kind(self, state: 'TurnLogic') -> None:
+
+        # Shortcut if black die was not rolled
+        if state.black_die_roll is None:
+            return
+
+        white_counts = state.white_counts
+        for position, face in enumerate(WHITE_FACES):
+            if white_counts[position] == 4 and state.black_die_roll == face:
+                points = state.get_five_of_a_kind_points(face)
+                if state.listeners:
+                    state.emit(ScoreEvent('five_of_a_kind', ScoreKind.FIVE_OF_A_KIND, face, 4, True, points))
+                state.score += points
+                white_counts[position] = 0
+                state.black_die_roll = None
+                state.remaining_white = 0
+                state.remaining_black = False
+                state.scoring_dice = True
+
+    def __score_rule__three_of_a_kind(self, state: 'TurnLogic') -> None:
+        white_counts = state.white_counts
+        for position, face in enumerate(WHITE_FACES):
+            # check for three of a kind using only white dice
+            if white_counts[position] >= 3:
+                points = state.get_three_of_a_kind_points(face)
+                if state.listeners:
+                    state.emit(ScoreEvent('three_of_a_kind', ScoreKind.THREE_OF_A_KIND, face, 3, False, points))
+                state.score += points
+                state.clearing_face = face
+                white_counts[position] -= 3
+                state.remaining_white -= 3
+                state.scoring_dice = True
+
+            # check for three of a kind using black die
+            elif white_counts[position] == 2 and state.black_die_roll == face:
+                points = state.get_three_of_a_kind_points(face)
+                if state.listeners:
+                    state.emit(ScoreEvent('three_of_a_kind', ScoreKind.THREE_OF_A_KIND, face, 2, True, points))
+                state.score += points
+                state.clearing_face = face
+                white_counts[position] -= 2
+                state.black_die_roll = None
+                state.remaining_white -= 2
+                state.remaining_black = False
+                state.scoring_dice = True
+
+    def __score_rule__forced_three_of_a_kind(self, state: 'TurnLogic') -> None:
+        white_counts = state.white_counts
+        forced_three_of_a_kind = []
 
-    def __score_rule__three_of_a_kind(self, state: TurnState) -> None:
-        pass
+        if state.black_die_roll == Face.SUN:
+            for position, face in enumerate(WHITE_FACES):
+                if white_counts[position] == 2:
+                    forced_three_of_a_kind.append(face)
 
-    def __score_rule__forced_three_of_a_kind(self, state: TurnState) -> None:
-        pass
+        if len(forced_three_of_a_kind) == 1:
+            face = forced_three_of_a_kind[0]
+            points = state.get_three_of_a_kind_points(face)
+            if state.listeners:
+                state.emit(ScoreEvent('forced_three_of_a_kind', ScoreKind.THREE_OF_A_KIND, face, 2, True, points,
+                                      wild=True))
+            state.score += points
+            state.clearing_face = face
+            white_counts[WHITE_FACES.index(face)] -= 2
+            state.black_die_roll = None
+            state.remaining_white -= 2
+            state.remaining_black = False
+            state.scoring_dice = True
 
-    def __score_rule__single_scoring_dice(self, state: TurnState) -> None:
-        pass
+        elif len(forced_three_of_a_kind) > 1:
+            face_index = state._answer(SUN_TRIO_DECISION, tuple(forced_three_of_a_kind)) - 1
+            face = forced_three_of_a_kind[face_index]
+            points = state.get_three_of_a_kind_points(face)
+            if state.listeners:
+                state.emit(ScoreEvent('forced_three_of_a_kind', ScoreKind.THREE_OF_A_KIND, face, 2, True, points,
+                                      wild=True))
+            state.score += points
+            state.clearing_face = face
+            white_counts[WHITE_FACES.index(face)] -= 2
+            state.black_die_roll = None
+            state.remaining_white -= 2
+            state.remaining_black = False
+            state.scoring_dice = True
+
+    def __score_rule__single_scoring_dice(self, state: 'TurnLogic') -> None:
+        white_counts = state.white_counts
+        black_die_roll = state.black_die_roll
+        five = WHITE_FACES.index(Face.FIVE)
+        ten = WHITE_FACES.index(Face.TEN)
+
+        if white_counts[five] > 0:
+            num_white_fives = white_counts[five]
+            points = num_white_fives * 5
+            if state.listeners:
+                state.emit(ScoreEvent('single_scoring_dice', ScoreKind.SINGLE, Face.FIVE, num_white_fives, False, points))
+            state.score += points
+            white_counts[five] -= num_white_fives
+            state.remaining_white -= num_white_fives
+            state.scoring_dice = True
 
-    def __score_rule__single_sun_die(self, state: TurnState) -> None:
-        pass
+        if black_die_roll == Face.FIVE:
+            if state.listeners:
+                state.emit(ScoreEvent('single_scoring_dice', ScoreKind.SINGLE, Face.FIVE, 0, True, 5))
+            state.score += 5
+            state.black_die_roll = None
+            state.remaining_black = False
+            state.scoring_dice = True
+
+        if white_counts[ten] > 0:
+            num_white_tens = white_counts[ten]
+            points = num_white_tens * 10
+            if state.listeners:
+                state.emit(ScoreEvent('single_scoring_dice', ScoreKind.SINGLE, Face.TEN, num_white_tens, False, points))
+            state.score += points
+            white_counts[ten] -= num_white_tens
+            state.remaining_white -= num_white_tens
+            state.scoring_dice = True
+
+        if black_die_roll == Face.TEN:
+            if state.listeners:
+                state.emit(ScoreEvent('single_scoring_dice', ScoreKind.SINGLE, Face.TEN, 0, True, 10))
+            state.score += 10
+            state.black_die_roll = None
+            state.remaining_black = False
+            state.scoring_dice = True
+
+    def __score_rule__single_sun_die(self, state: 'TurnLogic') -> None:
+        if state.black_die_roll == Face.SUN:
+            # if dice were already scored, the user doesn't have to use the sun die
+            if state.scoring_dice:
+                if state._answer(SUN_USE_DECISION) == 2:
+                    return
+            points = (5, 10)[state._answer(SUN_POINT_DECISION)-1]
+            if state.listeners:
+                state.emit(ScoreEvent('single_sun_die', ScoreKind.SUN, Face.SUN, 0, True, points))
+            state.score += points
+            state.black_die_roll = None
+            state.remaining_black = False
+            state.scoring_dice = True
 
 
-class TurnLogic:
+class TurnLogic(TurnState):
     """The core game logic to score a single turn.
 
+    The turn logic is itself the :class:`TurnState` of the turn it is
+    playing, and reuses it for every turn.
+
+    Everything that happens during a turn is reported as events to the
+    listeners of the turn logic. While no listener is attached, no event
+    is created and each roll is scored with a single table lookup.
+
     Attributes
     -----------
-    score: :class:`int`
-        The total accumulated score for this turn.
-    white_die: :class:`WhiteDie`
-        The die object used to represent white dice.
-    black_die: :class:`BlackDie`
-        The die object used to represent black dice.
-    scoring_dice: :class:`bool`
-        A boolean representing if at least one die
-        scored points for the last roll.
-    remaining_white: :class:`int`
-        The number of white dice still able to be rolled.
-    remaining_black: :class:`bool`
-        A boolean representing if the black die is still
-        able to be rolled.
-    white_die_rolls: Dict[:class:`Face`, :class:`int`]
-        A dictionary mapping each face of :class:`WhiteDie`
-        to the number of times it was rolled.
-    black_die_roll: Optional[:class:`Face`]
-        The face rolled on a :class:`BlackDie`, or ``None``
-        if the die was not rolled.
-    clearing_face: Optional[:class:`Face`]
-        The face that must be cleared in order to continue
-        scoring points, or ``None`` if not present.
+    listeners: List[:class:`Listener`]
+        The callables receiving every :class:`TurnEvent` of the turn.
+    verbose: :class:`bool`
+        A boolean representing if the rolls and scoring
+        decisions are printed to the console.
+    rng: :class:`DiceStream`
+        The random generator used to roll the dice. Any
+        object with a ``randrange`` method, such as a
+        :class:`random.Random`, can be used instead.
+    scoring: :class:`ScoringLogic`
+        The rules used to score each roll.
+    decisions: :class:`Policy`
+        The provider answering every decision of the turn. Any
+        :class:`Policy` can answer them, by default they are asked
+        on the console.
+    game_score: :class:`int`
+        The game score of the player taking the turn.
+    opponent_score: :class:`int`
+        The highest game score of the other players still in the game.
+    goal: :class:`int`
+        The number of points needed to win the game, or ``0``
+        if the turn is not part of a game.
+    final_round: :class:`bool`
+        A boolean representing if another player reached the goal,
+        so this is the last turn of the player and they must beat
+        ``opponent_score`` to win.
     """
 
     __slots__ = (
-        'score',
-        'white_die',
-        'black_die',
-        'scoring_dice',
-        'remaining_white',
-        'remaining_black',
-        'white_die_rolls',
-        'black_die_roll',
-        'clearing_face',
+        'listeners',
+        'rng',
+        'scoring',
+        'decisions',
+        'game_score',
+        'opponent_score',
+        'goal',
+        'final_round',
         '_state',
+        '_answers',
     )
 
-    def __init__(self):
-        self.score: int = 0
-        self.white_die: WhiteDie = WhiteDie()
-        self.black_die: BlackDie = BlackDie()
-        self.scoring_dice: bool = False
-        self.remaining_white: int = 4
-        self.remaining_black: bool = True
-        self.white_die_rolls: Dict[Face, int] = {}
-        self.black_die_roll: Optional[Face] = None
-        self.clearing_face: Optional[Face] = None
+    def __init__(self, verbose: bool = True, rng: Optional[DiceStream] = None,
+                 scoring: Optional[ScoringLogic] = None, listeners: Optional[List[Listener]] = None,
+                 decisions: Optional[Policy] = None):
+        super().__init__()
+        self.listeners: List[Listener] = list(listeners or ())
+        # renderers passed as listeners are kept, whatever stream they print to
+        if verbose:
+            self.verbose = True
+        self.rng: DiceStream = rng or DiceStream()
+        self.scoring: ScoringLogic = scoring or ScoringLogic()
+        self.decisions: Policy = decisions or ConsoleDecisions()
+        self.game_score: int = 0
+        self.opponent_score: int = 0
+        self.goal: int = 0
+        self.final_round: bool = False
         self._state: TurnState = TurnState()
+        self._answers: List[Tuple[int, int]] = []
+
+    @property
+    def verbose(self) -> bool:
+        return any(isinstance(listener, ConsoleRenderer) for listener in self.listeners)
+
+    @verbose.setter
+    def verbose(self, verbose: bool) -> None:
+        if verbose and not self.verbose:
+            self.listeners.append(ConsoleRenderer())
+        elif not verbose:
+            self.listeners[:] = [listener for listener in self.listeners
+                                 if not isinstance(listener, ConsoleRenderer)]
+
+    def emit(self, event: TurnEvent) -> None:
+        """Sends an event to every listener
+        :param event: event to send
+        """
+        for listener in self.listeners:
+            listener(event)
 
     def reset(self) -> None:
         self.score = 0
         self.scoring_dice = False
         self.remaining_white = 4
         self.remaining_black = True
-        self.white_die_rolls = {}
-        self.black_die_roll = None
-        self.clearing_face = None
+        self.white_roll = EMPTY_WHITE_ROLL
+        self.black_roll = 0
+        self.clearing = 0
 
     def resolve_turn(self):
         should_continue = True
@@ -183,188 +535,71 @@ class TurnLogic:
                 self.remaining_white = 4
                 self.remaining_black = True
                 should_continue = True
-                print('[DEBUG] All dice were consumed, so the turn continues')
-                if self.clearing_face is not None:
-                    print(f'[DEBUG] The "{self.clearing_face.value}" face must be cleared')
+                if self.listeners:
+                    self.emit(ClearingFaceEvent(self.clearing_face, True))
             # if a clearing face was set, we should continue
-            elif self.clearing_face is not None:
+            elif self.clearing:
                 should_continue = True
-                print(f'[DEBUG] The "{self.clearing_face.value}" face must be cleared, so the turn continues')
+                if self.listeners:
+                    self.emit(ClearingFaceEvent(self.clearing_face, False))
             # if no scoring dice were rolled, we need to stop
             elif not self.scoring_dice:
                 should_continue = False
-                print('[DEBUG] No scoring dice were rolled, so the turn ends with no points scored')
-                print(f'[DEBUG] Score {self.score} -> 0')
+                if self.listeners:
+                    self.emit(BustEvent(self.score))
                 self.score = 0
             # ask the user if they want to keep playing
             else:
                 should_continue = self._get_keep_playing_choice() == 1
 
+        if self.listeners:
+            self.emit(TurnEndEvent(self.score))
+
     def _resolve_turn(self):
         self._roll_dice()
 
-        print()
-        self.print_roll()
-        print()
-
-        self.scoring_dice = False
-        self.clearing_face = None
-
-        self._test_five_of_a_kind()
-        self._test_three_of_a_kind()
-        self._test_forced_three_of_a_kind()
-        self._test_single_scoring_dice()
-        self._test_single_sun_die()
-
-    def _test_five_of_a_kind(self) -> None:
-
-        # Shortcut if black die was not rolled
-        if self.black_die_roll is None:
-            return
-
-        for face in self.white_die.faces:
-            if self.white_die_rolls.get(face, 0) == 4 and self.black_die_roll == face:
-                points = self.get_five_of_a_kind_points(face)
-                print(f'[DEBUG] Rolled five "{face.value}" faces and increased score by {points} points')
-                self.score += points
-                self.white_die_rolls[face] = 0
-                self.black_die_roll = None
-                self.remaining_white = 0
-                self.remaining_black = False
-                self.scoring_dice = True
-
-    def _test_three_of_a_kind(self) -> None:
-        for face in self.white_die.faces:
-            # check for three of a kind using only white dice
-            if self.white_die_rolls.get(face, 0) >= 3:
-                points = self.get_three_of_a_kind_points(face)
-                print(f'[DEBUG] Rolled three "{face.value}" faces and increased score by {points} points')
-                self.score += points
-                self.clearing_face = face
-                self.white_die_rolls[face] -= 3
-                self.remaining_white -= 3
-                self.scoring_dice = True
-
-            # check for three of a kind using black die
-            elif self.white_die_rolls.get(face, 0) == 2 and self.black_die_roll == face:
-                points = self.get_three_of_a_kind_points(face)
-                print(f'[DEBUG] Rolled three "{face.value}" faces and increased score by {points} points')
-                self.score += points
-                self.clearing_face = face
-                self.white_die_rolls[face] -= 2
-                self.black_die_roll = None
-                self.remaining_white -= 2
-                self.remaining_black = False
-                self.scoring_dice = True
-
-    def _test_forced_three_of_a_kind(self) -> None:
-        forced_three_of_a_kind = []
-
-        if self.black_die_roll == Face.SUN:
-            for face in self.white_die.faces:
-                if self.white_die_rolls.get(face, 0) == 2:
-                    forced_three_of_a_kind.append(face)
-
-        if len(forced_three_of_a_kind) == 1:
-            face = forced_three_of_a_kind[0]
-            points = self.get_three_of_a_kind_points(face)
-            print(f'[DEBUG] Rolled two white "{face.value}" faces and a wild sun and increased score by {points} points')
-            self.score += points
-            self.clearing_face = face
-            self.white_die_rolls[face] -= 2
-            self.black_die_roll = None
-            self.remaining_white -= 2
-            self.remaining_black = False
-            self.scoring_dice = True
-
-        elif len(forced_three_of_a_kind) > 1:
-            face_index = self._get_sun_trio_choice(forced_three_of_a_kind) - 1
-            face = forced_three_of_a_kind[face_index]
-            points = self.get_three_of_a_kind_points(face)
-            print(f'[DEBUG] Rolled two white "{face.value}" faces and a wild sun and increased score by {points} points')
-            self.score += points
-            self.clearing_face = face
-            self.white_die_rolls[face] -= 2
-            self.black_die_roll = None
-            self.remaining_white -= 2
-            self.remaining_black = False
-            self.scoring_dice = True
-
-    def _test_single_scoring_dice(self) -> None:
-        white_die_rolls = self.white_die_rolls
-        black_die_roll = self.black_die_roll
-
-        if white_die_rolls.get(Face.FIVE, 0) > 0:
-            num_white_fives = white_die_rolls[Face.FIVE]
-            points = num_white_fives * 5
-            print(f'[DEBUG] Rolled {num_white_fives} white "5" faces and increased score by {points} points')
-            self.score += points
-            self.white_die_rolls[Face.FIVE] -= num_white_fives
-            self.remaining_white -= num_white_fives
-            self.scoring_dice = True
+        # the rules are only walked one by one when someone listens
+        if self.listeners:
+            self.emit(RollEvent(self.white_die_rolls, self.black_die_roll))
+            self._score_roll()
+        else:
+            self._lookup_roll()
 
-        if black_die_roll == Face.FIVE:
-            print('[DEBUG] Rolled a black "5" face and increased score by 5 points')
-            self.score += 5
-            self.black_die_roll = None
-            self.remaining_black = False
-            self.scoring_dice = True
-
-        if white_die_rolls.get(Face.TEN, 0) > 0:
-            num_white_tens = white_die_rolls[Face.TEN]
-            points = num_white_tens * 10
-            print(f'[DEBUG] Rolled {num_white_tens} white "10" faces and increased score by {points} points')
-            self.score += points
-            self.white_die_rolls[Face.TEN] -= num_white_tens
-            self.remaining_white -= num_white_tens
-            self.scoring_dice = True
-
-        if black_die_roll == Face.TEN:
-            print('[DEBUG] Rolled a black "10" face and increased score by 10 points')
-            self.score += 10
-            self.black_die_roll = None
-            self.remaining_black = False
-            self.scoring_dice = True
-
-    def _test_single_sun_die(self) -> None:
-        if self.black_die_roll == Face.SUN:
-            # if dice were already scored, the user doesn't have to use the sun die
-            if self.scoring_dice:
-                if self._get_sun_die_use_choice() == 2:
-                    return
-            points = (5, 10)[self._get_sun_die_point_choice()-1]
-            print(f'[DEBUG] Sun die increased score by {points} points')
-            self.score += points
-            self.black_die_roll = None
-            self.remaining_black = False
-            self.scoring_dice = True
+    def _score_roll(self, rules: Optional[Sequence[ScoreRule]] = None) -> None:
+        """Scores the roll by walking the rules one by one, emitting their events
+        :param rules: rules run in place of the pipeline  [default the pipeline]
+        """
+        # decisions are asked before any rule changes the turn, exactly
+        # as the table lookup asks them, and the rules replay the answers
+        entry = self.scoring.lookup(self)
+        self._answers[:] = DECISION_ANSWERS[entry.decision][self._choose_outcome(entry)]
+        self.scoring.score(self, rules)
+
+    def _lookup_roll(self) -> None:
+        entry = self.scoring.lookup(self)
+        self.scoring.apply(self, entry.outcomes[self._choose_outcome(entry)])
+
+    def _choose_outcome(self, entry: RollEntry) -> int:
+        """Asks the decision of a roll before it is scored
+        :param entry: entry of the rolled dice in the scoring table
+        :return: index of the chosen outcome of the roll
+        """
+        decision = entry.decision
+        if decision == NO_DECISION:
+            return 0
+        if decision == SUN_TRIO_DECISION:
+            return self._get_sun_trio_choice(list(entry.faces)) - 1
+        if decision == SUN_USE_DECISION and self._get_sun_die_use_choice() == 2:
+            return 2
+        return self._get_sun_die_point_choice() - 1
 
     def _roll_dice(self) -> None:
-        # Copying the faces since we may need to mutate them
-        white_die_faces = self.white_die.faces.copy()
-        black_die_faces = self.black_die.faces.copy()
-        clearing_face = self.clearing_face
-
-        # remove clearing face from face options if present
-        if clearing_face in white_die_faces:
-            white_die_faces.remove(clearing_face)
-        if clearing_face in black_die_faces:
-            black_die_faces.remove(clearing_face)
-
-        # resolve white dice
-        white_die_rolls = {}
-        for _ in range(self.remaining_white):
-            roll = choice(white_die_faces)
-            if roll not in white_die_rolls:
-                white_die_rolls[roll] = 0
-            white_die_rolls[roll] += 1
-        self.white_die_rolls = white_die_rolls
-
-        # resolve black die
-        black_die_roll = None
-        if self.remaining_black:
-            black_die_roll = choice(black_die_faces)
-        self.black_die_roll = black_die_roll
+        # every equally likely roll of the remaining dice without the
+        # clearing face, so a single draw rolls all of them at once
+        rolls = roll_sampler(self.remaining_white, self.remaining_black, self.clearing)
+        roll = rolls[self.rng.randrange(len(rolls))]
+        self.white_roll = roll >> 3
+        self.black_roll = roll & 7
 
     @staticmethod
     def get_five_of_a_kind_points(face: Face) -> int:
@@ -394,39 +629,37 @@ class TurnLogic:
                   Face.FIVE: 50, Face.SIX: 60, Face.TEN: 100}
         return points.get(face, 0)
 
-    @staticmethod
-    @validate_choice(range(1, 3))
-    def _get_sun_trio_choice(faces):
-        print('\nPlease choose which face to make a trio with using the sun die:')
-        for index, face in enumerate(faces):
-            print(f'\t[{index + 1}] Face "{face.value}"')
-        return input('>>> ')
+    def _answer(self, decision: int, faces: Tuple[Face, ...] = ()) -> int:
+        """Gets the answer a scoring rule prompts for, as decided before the rules ran
 
-    @staticmethod
-    @validate_choice(range(1, 3))
-    def _get_sun_die_use_choice():
-        print('\nYou rolled a sun face. Do you want to use it for points or reuse the die?')
-        print('\t[1] Use it for points')
-        print('\t[2] Keep the die for later')
-        return input('>>> ')
+        Prompts beyond the decision of the roll are answered with the first
+        choice, as they were when the scoring table was built, so walking
+        the rules scores every roll like looking it up.
 
-    @staticmethod
-    @validate_choice(range(1, 3))
-    def _get_sun_die_point_choice():
-        print('\nDo you want to use the sun face for "5" or "10" points?')
-        print('\t[1] Use it for five points')
-        print('\t[2] Use it for ten points')
-        return input('>>> ')
-
-    @validate_choice(range(1, 3))
-    def _get_keep_playing_choice(self):
-        dice_left = self.remaining_white
-        if self.remaining_black:
-            dice_left += 1
-        print(f'\nYou currently scored {self.score} points this turn and have {dice_left} dice left. Keep going?')
-        print('\t[1] Keep playing')
-        print('\t[2] End turn')
-        return input('>>> ')
+        :param decision: decision the rule asks about
+        :param faces: faces offered by a :data:`SUN_TRIO_DECISION`  [default none]
+        :return: the answer
+        :raises ValueError: if the rule asks another decision than the one answered
+        """
+        answers = self._answers
+        if not answers:
+            return 1
+        expected, answer = answers.pop(0)
+        if decision != expected:
+            raise ValueError(f'A scoring rule asked decision {decision} where decision {expected} was answered')
+        return answer
+
+    def _get_sun_trio_choice(self, faces: List[Face]) -> int:
+        return self.decisions.sun_trio_choice(self, faces)
+
+    def _get_sun_die_use_choice(self) -> int:
+        return self.decisions.sun_die_use_choice(self)
+
+    def _get_sun_die_point_choice(self) -> int:
+        return self.decisions.sun_die_point_choice(self)
+
+    def _get_keep_playing_choice(self) -> int:
+        return self.decisions.keep_playing_choice(self)
 
     def print_roll(self) -> None:
         print('Dice:', end=' ')
@@ -438,65 +671,119 @@ class TurnLogic:
         print()
 
 
-# class CosmicWimpout:
-#     def __init__(self, players: int, goal: int = 500):
-#         """
-#         :param players: number of players
-#         :param goal:    number of points needed to win (usually 300 or 500)
-#         """
-#         self.goal = goal
-#         self.players: List[Player] = []
-#         for index in range(players):
-#             self.players.append(Player(name=f'Player {index}'))
-#
-#     def play(self):
-#         # This becomes the first player who's score meets or exceeds
-#         # the desired goal. All other players take one more turn.
-#         first_player_to_meet_the_goal: Optional[Player] = None
-#         current_winner = None
-#
-#         # The game will keep running until either the victory condition
-#         # was met or all players got disqualified due to a supernova.
-#         game_in_progress: bool = True
-#
-#         while game_in_progress:
-#             for player in self.players:
-#
-#                 # Skip if this player is not alive
-#                 if not player.alive:
-#                     continue
-#
-#                 # If this player matches first_player_to_meet_the_goal, then
-#                 # this marks the end of the final round. The game is finished
-#                 if player == first_player_to_meet_the_goal:
-#                     game_in_progress = False
-#                     break  # no need to process the remaining players
-#
-#                 # If this player was disqualified due to rolling a supernova
-#                 if player.score < 0:
-#                     continue
-#
-#                 # Number of points accumulated after the player's turn is resolved
-#                 points_earned = 0  # TODO: method call here
-#
-#                 # Only increment the player's score if they weren't disqualified
-#                 # due to a supernova (rolling all 10's). Otherwise, disqualify the score.
-#                 if points_earned is not None:
-#                     self.scores[player] += points_earned
-#
-#                     # Check if this marks the start of the final round
-#                     if first_player_to_meet_the_goal is None \
-#                             and self.scores[player] >= self.goal:
-#                         first_player_to_meet_the_goal = player
-#                         current_winner = player
-#                     # elif first_player_to_meet_the_goal is not None \
-#                     #         and
+class CosmicWimpout:
+    """The game loop for a full game of Cosmic Wimpout.
+
+    Players take turns in order until one of them meets the goal. Every
+    other player then takes one more turn, and the highest score wins.
+    Rolling five sixes instantly wins the game, while rolling five tens
+    (a supernova) removes the player from the game.
+
+    Attributes
+    -----------
+    goal: :class:`int`
+        The number of points needed to win (usually 300 or 500).
+    players: List[:class:`Player`]
+        The players of the game, in turn order.
+    turn_logic: List[:class:`TurnLogic`]
+        The turn logic resolving each player's turns.
+    """
+
+    __slots__ = (
+        'goal',
+        'players',
+        'turn_logic',
+    )
+
+    def __init__(self, players: int, goal: int = 500, turn_logic: Optional[List[TurnLogic]] = None):
+        """
+        :param players:    number of players
+        :param goal:       number of points needed to win (usually 300 or 500)
+        :param turn_logic: turn logic for each player  [default one shared interactive turn logic]
+        """
+        self.goal: int = goal
+        self.players: List[Player] = []
+        for index in range(players):
+            self.players.append(Player(name=f'Player {index + 1}'))
+        if turn_logic is None:
+            turn_logic = [TurnLogic()] * players
+        self.turn_logic: List[TurnLogic] = list(turn_logic)
+
+    def reset(self) -> None:
+        for player in self.players:
+            player.score = 0
+            player.alive = True
+
+    def play(self) -> Optional[Player]:
+        """Plays the game until it is finished
+        :return: the winning player, or ``None`` if every
+                 player was removed from the game
+        """
+        # This becomes the first player who's score meets or exceeds
+        # the desired goal. All other players take one more turn.
+        first_player_to_meet_the_goal: Optional[Player] = None
+        current_winner: Optional[Player] = None
+
+        # The game will keep running until either the victory condition
+        # was met or all players got disqualified due to a supernova.
+        while True:
+            for player, turn_logic in zip(self.players, self.turn_logic):
+
+                # Skip if this player is not alive
+                if not player.alive:
+                    continue
+
+                # If this player matches first_player_to_meet_the_goal, then
+                # this marks the end of the final round. The game is finished
+                if player is first_player_to_meet_the_goal:
+                    return current_winner
+
+                if turn_logic.verbose:
+                    print(f'\n{player} has {player.score} points and is taking their turn')
+
+                # let the decisions of the turn see the state of the game
+                turn_logic.game_score = player.score
+                turn_logic.opponent_score = max(
+                    (other.score for other in self.players if other.alive and other is not player), default=0)
+                turn_logic.goal = self.goal
+                turn_logic.final_round = first_player_to_meet_the_goal is not None
+
+                try:
+                    turn_logic.reset()
+                    turn_logic.resolve_turn()
+                except PlayerInstantlyWon:
+                    return player
+                # Rolling a supernova removes the player from the game
+                except PlayerInstantlyLost:
+                    player.alive = False
+                    survivors = [other for other in self.players if other.alive]
+                    if len(survivors) <= 1 < len(self.players):
+                        return survivors[0] if survivors else None
+                    continue
+
+                player.score += turn_logic.score
+
+                # Check if this marks the start of the final round
+                if first_player_to_meet_the_goal is None:
+                    if player.score >= self.goal:
+                        first_player_to_meet_the_goal = player
+                        current_winner = player
+                # During the final round, a player must beat the current winner
+                elif player.score > current_winner.score:
+                    current_winner = player
+
+            # A single player game ends once that player is removed
+            if not any(player.alive for player in self.players):
+                return None
 
 
 def main():
-    turn_logic = TurnLogic()
-    turn_logic.resolve_turn()
-    print(f'\nTotal score: {turn_logic.score}')
+    game = CosmicWimpout(players=2)
+    winner = game.play()
+    print()
+    for player in game.players:
+        print(f'{player}: {player.score} points')
+    print(f'Winner: {winner}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,382 @@
+"""
+Decision providers
+
+Every decision of a turn is answered by a provider implementing the
+methods of :class:`Policy`, which :class:`TurnLogic` calls directly, so
+a provider that does not wait for anyone costs a single method call per
+decision. Any :class:`Policy` is a provider as it is.
+
+Answers are checked against lookup tables built once for every number
+of choices, so an invalid answer never raises on its way to being
+rejected. Providers waiting for a person give up on a decision after its
+timeout, and providers running out of answers give up for good; either
+way the ``default`` policy answers in their place.
+"""
+
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from .dice import Face
+from .policy import Policy
+
+# sockets are only imported by whoever makes the connection
+if TYPE_CHECKING:
+    import socket
+
+
+__all__ = (
+    'KEEP_PLAYING',
+    'SUN_USE',
+    'SUN_POINTS',
+    'SUN_TRIO',
+    'PromptedDecisions',
+    'ConsoleDecisions',
+    'RemoteDecisions',
+    'ScriptedDecisions',
+    'CallableDecisions',
+)
+
+
+# names of the decisions, as used for timeouts and callable providers
+KEEP_PLAYING = 'keep_playing'
+SUN_USE = 'sun_use'
+SUN_POINTS = 'sun_points'
+SUN_TRIO = 'sun_trio'
+_DECISIONS = (KEEP_PLAYING, SUN_USE, SUN_POINTS, SUN_TRIO)
+
+# the accepted answers for every number of choices, numbered from 1
+_MAX_CHOICES = 8
+_ANSWERS: List[Dict[str, int]] = [{str(choice): choice for choice in range(1, choices + 1)}
+                                  for choices in range(_MAX_CHOICES + 1)]
+_CHOICES: List[frozenset] = [frozenset(answers.values()) for answers in _ANSWERS]
+
+
+class PromptedDecisions(ABC):
+    """Base of the providers asking a person for every decision.
+
+    A person is asked again after an invalid answer, until they answer
+    or the timeout of the decision passes. The timeout covers every
+    attempt at a decision, so invalid answers do not extend it.
+
+    Attributes
+    -----------
+    default: :class:`Policy`
+        The policy answering when the person does not.
+    timeouts: Dict[:class:`str`, Optional[:class:`float`]]
+        The number of seconds given to each decision, by decision
+        name, where ``None`` waits forever.
+    """
+
+    __slots__ = (
+        'default',
+        'timeouts',
+    )
+
+    def __init__(self, default: Optional[Policy] = None,
+                 timeout: Union[Optional[float], Dict[str, Optional[float]]] = None):
+        """
+        :param default: policy answering in place of the person  [default :class:`Policy`]
+        :param timeout: seconds given to every decision, or to each decision by name  [default None]
+        """
+        self.default: Policy = default or Policy()
+        if isinstance(timeout, dict):
+            self.timeouts: Dict[str, Optional[float]] = {decision: timeout.get(decision) for decision in _DECISIONS}
+        else:
+            self.timeouts = dict.fromkeys(_DECISIONS, timeout)
+
+    def _ask(self, decision: str, question: str, choices: int, fallback: Callable[[], int]) -> int:
+        """Asks the person until they answer with a valid choice
+        :param decision: name of the decision
+        :param question: question to show
+        :param choices: number of choices, numbered from 1
+        :param fallback: answers in place of the person
+        :return: the choice
+        """
+        answers = _ANSWERS[choices]
+        timeout = self.timeouts[decision]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if deadline is not None:
+                timeout = max(deadline - time.monotonic(), 0.0)
+            line = self._read(question, timeout)
+            if line is None:
+                return fallback()
+            choice = answers.get(line.strip())
+            if choice is not None:
+                return choice
+            self._reject()
+
+    @abstractmethod
+    def _read(self, question: str, timeout: Optional[float]) -> Optional[str]:
+        """Shows a question and reads the answer
+        :param question: question to show
+        :param timeout: seconds left to answer, or ``None`` to wait forever
+        :return: the answer, or ``None`` if the person did not answer in time
+        """
+
+    @abstractmethod
+    def _reject(self) -> None:
+        """Tells the person their answer was invalid"""
+
+    @abstractmethod
+    def keep_playing_choice(self, turn) -> int:
+        pass
+
+    @abstractmethod
+    def sun_die_use_choice(self, turn) -> int:
+        pass
+
+    @abstractmethod
+    def sun_die_point_choice(self, turn) -> int:
+        pass
+
+    @abstractmethod
+    def sun_trio_choice(self, turn, faces: List[Face]) -> int:
+        pass
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} default={self.default!r}>'
+
+
+class ConsoleDecisions(PromptedDecisions):
+    """Asks every decision on the console.
+
+    Timeouts wait for the console with :func:`select.select`, so they are
+    only supported where it accepts standard input, i.e. not on Windows.
+    """
+
+    __slots__ = ()
+
+    def _read(self, question: str, timeout: Optional[float]) -> Optional[str]:
+        print(question)
+        if timeout is None:
+            try:
+                return input('>>> ')
+            except EOFError:
+                return None
+
+        import select
+        print('>>> ', end='', flush=True)
+        readable, _, _ = select.select([sys.stdin], [], [], timeout)
+        if not readable:
+            print()
+            return None
+        # an empty read is the end of the input, not an empty line
+        return sys.stdin.readline() or None
+
+    def _reject(self) -> None:
+        print('Invalid choice!')
+
+    def keep_playing_choice(self, turn) -> int:
+        dice_left = turn.remaining_white + turn.remaining_black
+        return self._ask(KEEP_PLAYING,
+                         f'\nYou currently scored {turn.score} points this turn and have {dice_left} dice left. '
+                         f'Keep going?\n\t[1] Keep playing\n\t[2] End turn',
+                         2, lambda: self.default.keep_playing_choice(turn))
+
+    def sun_die_use_choice(self, turn) -> int:
+        return self._ask(SUN_USE,
+                         '\nYou rolled a sun face. Do you want to use it for points or reuse the die?\n'
+                         '\t[1] Use it for points\n\t[2] Keep the die for later',
+                         2, lambda: self.default.sun_die_use_choice(turn))
+
+    def sun_die_point_choice(self, turn) -> int:
+        return self._ask(SUN_POINTS,
+                         '\nDo you want to use the sun face for "5" or "10" points?\n'
+                         '\t[1] Use it for five points\n\t[2] Use it for ten points',
+                         2, lambda: self.default.sun_die_point_choice(turn))
+
+    def sun_trio_choice(self, turn, faces: List[Face]) -> int:
+        options = ''.join(f'\n\t[{index + 1}] Face "{face.value}"' for index, face in enumerate(faces))
+        return self._ask(SUN_TRIO, '\nPlease choose which face to make a trio with using the sun die:' + options,
+                         len(faces), lambda: self.default.sun_trio_choice(turn, faces))
+
+
+class RemoteDecisions(PromptedDecisions):
+    """Asks every decision over a socket with the line protocol of the game server.
+
+    Each decision is sent as an ``ASK`` line and answered by a line
+    holding the choice, and invalid answers are told ``INVALID``. Once
+    the connection closes or a decision times out, the person is taken
+    to have left and the default policy answers every later decision.
+
+    Attributes
+    -----------
+    connection: :class:`socket.socket`
+        The connection to the person.
+    connected: :class:`bool`
+        A boolean representing if the person is still connected.
+    """
+
+    __slots__ = (
+        'connection',
+        'connected',
+        '_file',
+    )
+
+    def __init__(self, connection: 'socket.socket', default: Optional[Policy] = None,
+                 timeout: Union[Optional[float], Dict[str, Optional[float]]] = None):
+        super().__init__(default, timeout)
+        self.connection: 'socket.socket' = connection
+        self.connected: bool = True
+        self._file: BinaryIO = connection.makefile('rwb')
+
+    def _send(self, line: str) -> None:
+        try:
+            self._file.write(f'{line}\n'.encode())
+            self._file.flush()
+        except OSError:
+            self.connected = False
+
+    def _read(self, question: str, timeout: Optional[float]) -> Optional[str]:
+        # a decision whose time ran out between answers times out as well
+        if not self.connected or timeout == 0:
+            self.connected = False
+            return None
+        self._send(f'ASK {question}')
+        try:
+            self.connection.settimeout(timeout)
+            line = self._file.readline()
+        except OSError:
+            # a timed out socket file cannot be read again
+            line = b''
+        if not line:
+            self.connected = False
+            return None
+        return line.decode(errors='replace')
+
+    def _reject(self) -> None:
+        self._send('INVALID')
+
+    def keep_playing_choice(self, turn) -> int:
+        dice_left = turn.remaining_white + turn.remaining_black
+        return self._ask(KEEP_PLAYING, f'KEEP {turn.score} {dice_left}', 2,
+                         lambda: self.default.keep_playing_choice(turn))
+
+    def sun_die_use_choice(self, turn) -> int:
+        return self._ask(SUN_USE, 'SUN_USE', 2, lambda: self.default.sun_die_use_choice(turn))
+
+    def sun_die_point_choice(self, turn) -> int:
+        return self._ask(SUN_POINTS, 'SUN_POINTS', 2, lambda: self.default.sun_die_point_choice(turn))
+
+    def sun_trio_choice(self, turn, faces: List[Face]) -> int:
+        return self._ask(SUN_TRIO, 'TRIO ' + ' '.join(face.value for face in faces), len(faces),
+                         lambda: self.default.sun_trio_choice(turn, faces))
+
+    def close(self) -> None:
+        self.connected = False
+        self._file.close()
+        self.connection.close()
+
+
+class ScriptedDecisions:
+    """Answers every decision with the next choice of a script.
+
+    Attributes
+    -----------
+    default: Optional[:class:`Policy`]
+        The policy answering once the script ran out, or ``None``
+        to raise :class:`ValueError` instead.
+    answered: :class:`int`
+        The number of choices taken from the script.
+    """
+
+    __slots__ = (
+        'default',
+        'answered',
+        '_choices',
+    )
+
+    def __init__(self, choices: Iterable[int], default: Optional[Policy] = None):
+        self.default: Optional[Policy] = default
+        self.answered: int = 0
+        self._choices: Iterator[int] = iter(choices)
+
+    @classmethod
+    def from_file(cls, path: str, default: Optional[Policy] = None) -> 'ScriptedDecisions':
+        """Reads a script with one choice per line, skipping blank lines and ``#`` comments
+        :param path: path of the script
+        :param default: policy answering once the script ran out  [default None]
+        :return: the provider
+        :raises ValueError: if a line is not a number
+        """
+        with open(path) as file:
+            lines = [line.split('#', 1)[0].strip() for line in file]
+        return cls([int(line) for line in lines if line], default)
+
+    def _next(self, choices: int) -> Optional[int]:
+        """Takes the next choice of the script
+        :param choices: number of choices of the decision
+        :return: the choice, or ``None`` if the script ran out
+        :raises ValueError: if the choice is not one of the choices, or
+                            the script ran out and there is no default
+        """
+        choice = next(self._choices, None)
+        if choice is None:
+            if self.default is None:
+                raise ValueError(f'The script ran out after {self.answered} choices')
+            return None
+        self.answered += 1
+        if choice not in _CHOICES[choices]:
+            raise ValueError(f'Choice {self.answered} of the script is {choice}, expected 1 to {choices}')
+        return choice
+
+    def keep_playing_choice(self, turn) -> int:
+        choice = self._next(2)
+        return self.default.keep_playing_choice(turn) if choice is None else choice
+
+    def sun_die_use_choice(self, turn) -> int:
+        choice = self._next(2)
+        return self.default.sun_die_use_choice(turn) if choice is None else choice
+
+    def sun_die_point_choice(self, turn) -> int:
+        choice = self._next(2)
+        return self.default.sun_die_point_choice(turn) if choice is None else choice
+
+    def sun_trio_choice(self, turn, faces: List[Face]) -> int:
+        choice = self._next(len(faces))
+        return self.default.sun_trio_choice(turn, faces) if choice is None else choice
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} answered={self.answered} default={self.default!r}>'
+
+
+class CallableDecisions:
+    """Answers every decision by calling a function.
+
+    The function is called as ``function(turn, decision, faces)``, with
+    the name of the decision and the faces a trio can be made with, or
+    ``None`` for the other decisions.
+
+    Attributes
+    -----------
+    function: Callable[[:class:`TurnLogic`, :class:`str`, Optional[List[:class:`Face`]]], :class:`int`]
+        The function answering every decision.
+    """
+
+    __slots__ = ('function',)
+
+    def __init__(self, function: Callable[..., int]):
+        self.function: Callable[..., int] = function
+
+    def _check(self, decision: str, choice: int, choices: int) -> int:
+        if choice not in _CHOICES[choices]:
+            raise ValueError(f'{self.function!r} answered {choice} to {decision}, expected 1 to {choices}')
+        return choice
+
+    def keep_playing_choice(self, turn) -> int:
+        return self._check(KEEP_PLAYING, self.function(turn, KEEP_PLAYING, None), 2)
+
+    def sun_die_use_choice(self, turn) -> int:
+        return self._check(SUN_USE, self.function(turn, SUN_USE, None), 2)
+
+    def sun_die_point_choice(self, turn) -> int:
+        return self._check(SUN_POINTS, self.function(turn, SUN_POINTS, None), 2)
+
+    def sun_trio_choice(self, turn, faces: List[Face]) -> int:
+        return self._check(SUN_TRIO, self.function(turn, SUN_TRIO, faces), len(faces))
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} function={self.function!r}>'
@@ -0,0 +1,271 @@
+"""
+Exact turn score distributions
+
+Computes the probability of every final score of a turn played by a
+:class:`Policy`, instead of estimating it by simulating turns. Each roll
+is expanded into every combination of faces with its exact probability,
+leaving the clearing face off the dice like :meth:`TurnLogic._roll_dice`
+does, and the outcome chosen by the policy is followed until the turn
+ends. States reached through different rolls are only expanded once.
+
+The policy must be deterministic: it is asked once per state and roll.
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .dice import Face
+from .cosmic_wimpout import ScoringLogic
+from .policy import Policy
+from .rolls import FACE_BY_CODE, FACE_CODES, WHITE_ROLLS, roll_probabilities
+from .scoring_table import NO_DECISION, RollEntry, ScoredRoll
+from .simulator import HeadlessTurnLogic
+from .solver import SCORE_STEP
+
+
+__all__ = (
+    'TurnDistribution',
+    'TurnAnalyzer',
+)
+
+
+# (turn score, remaining white dice, remaining black die, clearing face code)
+_State = Tuple[int, int, bool, int]
+
+# rolls of a dice state, as returned by TurnAnalyzer._rolls
+_Rolls = Tuple[List[Tuple[float, ScoredRoll]], List[Tuple[float, int, int, RollEntry]]]
+
+# probability of each final score bucket, and the instant win and loss probabilities
+_Outcome = Tuple[np.ndarray, float, float]
+
+
+class TurnDistribution:
+    """The exact distribution of the final score of a turn.
+
+    Attributes
+    -----------
+    scores: Dict[:class:`int`, :class:`float`]
+        The probability of each final score, with busts
+        counted as a score of ``0``.
+    instant_win: :class:`float`
+        The probability of rolling five sixes.
+    instant_loss: :class:`float`
+        The probability of rolling five tens.
+    max_score: :class:`int`
+        The turn score at which turns were banked.
+    """
+
+    __slots__ = (
+        'scores',
+        'instant_win',
+        'instant_loss',
+        'max_score',
+    )
+
+    def __init__(self, scores: Dict[int, float], instant_win: float, instant_loss: float, max_score: int):
+        self.scores: Dict[int, float] = scores
+        self.instant_win: float = instant_win
+        self.instant_loss: float = instant_loss
+        self.max_score: int = max_score
+
+    @property
+    def bust(self) -> float:
+        return self.scores.get(0, 0.0)
+
+    @property
+    def truncated(self) -> float:
+        """The probability of reaching ``max_score``, where the turn was banked"""
+        return sum(probability for score, probability in self.scores.items() if score >= self.max_score)
+
+    @property
+    def mean(self) -> float:
+        """The expected final score, counting instant wins and losses as ``0``"""
+        return sum(score * probability for score, probability in self.scores.items())
+
+    @property
+    def variance(self) -> float:
+        mean = self.mean
+        return sum((score - mean) ** 2 * probability for score, probability in self.scores.items()) \
+            + (self.instant_win + self.instant_loss) * mean ** 2
+
+    def at_least(self, score: int) -> float:
+        """Gets the probability of a final score of at least some points"""
+        return sum(probability for final, probability in self.scores.items() if final >= score)
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} mean={self.mean:.3f} bust={self.bust:.4f} '
+                f'instant_win={self.instant_win:.6f} instant_loss={self.instant_loss:.6f}>')
+
+
+class TurnAnalyzer:
+    """Computes exact turn score distributions for a policy.
+
+    Distributions are memoized by (turn score, remaining white dice,
+    remaining black die, clearing face), so later queries reuse every
+    state already expanded.
+
+    Attributes
+    -----------
+    policy: :class:`Policy`
+        The policy answering every decision.
+    max_score: :class:`int`
+        The turn score at which turns are always banked.
+    scoring: :class:`ScoringLogic`
+        The rules used to score each roll.
+    """
+
+    __slots__ = (
+        'policy',
+        'max_score',
+        'scoring',
+        '_turn',
+        '_buckets',
+        '_cache',
+        '_roll_cache',
+    )
+
+    def __init__(self, policy: Optional[Policy] = None, max_score: int = 1000,
+                 scoring: Optional[ScoringLogic] = None):
+        self.scoring: ScoringLogic = scoring or ScoringLogic()
+        self.max_score: int = max_score
+        # the turn the policy is shown while it decides
+        self._turn: HeadlessTurnLogic = HeadlessTurnLogic(policy, scoring=self.scoring)
+        self.policy: Policy = self._turn.policy
+        # the highest final score is a roll made just below max_score
+        top = max(outcome.points for entry in self.scoring.table.values() for outcome in entry.outcomes)
+        self._buckets: int = (max_score + top) // SCORE_STEP + 1
+        self._cache: Dict[_State, _Outcome] = {}
+        self._roll_cache: Dict[Tuple[int, bool, int], _Rolls] = {}
+
+    def distribution(self, score: int = 0, remaining_white: int = 4, remaining_black: bool = True,
+                     clearing_face: Optional[Face] = None) -> TurnDistribution:
+        """Gets the distribution of the final score of rolling the remaining dice
+        :param score: turn score before rolling  [default 0]
+        :param remaining_white: number of white dice to roll  [default 4]
+        :param remaining_black: if the black die is rolled  [default True]
+        :param clearing_face: face that must be cleared  [default None]
+        :return: the distribution of the final turn score
+        :raises ValueError: if the turn score is not below ``max_score``
+        """
+        # turns are banked once they reach max_score, before a roll could bust them
+        if not 0 <= score < self.max_score:
+            raise ValueError(f'The turn score must be at least 0 and below {self.max_score}')
+        scores, instant_win, instant_loss = self._roll(score, remaining_white, remaining_black,
+                                                       FACE_CODES[clearing_face])
+        scores = {int(bucket) * SCORE_STEP: float(scores[bucket]) for bucket in np.flatnonzero(scores)}
+        return TurnDistribution(scores, instant_win, instant_loss, self.max_score)
+
+    def _roll(self, score: int, remaining_white: int, remaining_black: bool, clearing: int) -> _Outcome:
+        key = (score, remaining_white, remaining_black, clearing)
+        outcome = self._cache.get(key)
+        if outcome is not None:
+            return outcome
+
+        turn = self._turn
+        forced, decided = self._rolls(remaining_white, remaining_black, clearing)
+        scores = np.zeros(self._buckets)
+        instant_win = instant_loss = 0.0
+
+        # many rolls lead to the same state, so the probability of
+        # reaching each state is summed before its scores are merged
+        rolls: Dict[_State, float] = {}
+
+        for probability, scored in forced:
+            if scored.instant == 1:
+                instant_win += probability
+            elif scored.instant == -1:
+                instant_loss += probability
+            else:
+                state = self._continue(score, remaining_white, remaining_black, scored)
+                if type(state) is int:
+                    scores[state // SCORE_STEP] += probability
+                else:
+                    rolls[state] = rolls.get(state, 0.0) + probability
+
+        for probability, white_roll, black_roll, entry in decided:
+            # the policy sees the rolled dice before they are scored
+            turn.score = score
+            turn.remaining_white = remaining_white
+            turn.remaining_black = remaining_black
+            turn.clearing = clearing
+            turn.white_roll = white_roll
+            turn.black_roll = black_roll
+            scored = entry.outcomes[turn._choose_outcome(entry)]
+
+            state = self._continue(score, remaining_white, remaining_black, scored)
+            if type(state) is int:
+                scores[state // SCORE_STEP] += probability
+            else:
+                rolls[state] = rolls.get(state, 0.0) + probability
+
+        for state, probability in rolls.items():
+            next_scores, next_win, next_loss = self._roll(*state)
+            scores += probability * next_scores
+            instant_win += probability * next_win
+            instant_loss += probability * next_loss
+
+        outcome = (scores, instant_win, instant_loss)
+        self._cache[key] = outcome
+        return outcome
+
+    def _rolls(self, remaining_white: int, remaining_black: bool, clearing: int) -> _Rolls:
+        """Gets every roll of the remaining dice, with the rolls asking no
+        decision grouped by their outcome
+        :return: (probability, outcome) of the rolls asking no decision, and
+                 (probability, white roll, black face code, entry) of the others
+        """
+        key = (remaining_white, remaining_black, clearing)
+        rolls = self._roll_cache.get(key)
+        if rolls is not None:
+            return rolls
+
+        entries = self.scoring.table
+        forced: Dict[ScoredRoll, float] = {}
+        decided = []
+        for probability, white_roll, black_roll in roll_probabilities(remaining_white, remaining_black, clearing):
+            entry = entries[WHITE_ROLLS[white_roll], FACE_BY_CODE[black_roll]]
+            if entry.decision == NO_DECISION:
+                outcome = entry.outcomes[0]
+                forced[outcome] = forced.get(outcome, 0.0) + probability
+            else:
+                decided.append((probability, white_roll, black_roll, entry))
+
+        rolls = ([(probability, outcome) for outcome, probability in forced.items()], decided)
+        self._roll_cache[key] = rolls
+        return rolls
+
+    def _continue(self, score: int, remaining_white: int, remaining_black: bool,
+                  scored: ScoredRoll) -> Union[int, _State]:
+        """Mirrors the continuation rules of :meth:`TurnLogic.resolve_turn`
+        :return: the final score of the turn if it ended, else the state rolled next
+        """
+        score += scored.points
+        white = remaining_white - scored.white_used
+        black = remaining_black and not scored.black_used
+
+        # every scoring roll earns points, so capping the score ends the recursion
+        if score >= self.max_score:
+            return score
+        # if all dice were used, we should continue
+        if white == 0 and not black:
+            return score, 4, True, scored.clearing
+        # if a clearing face was set, we should continue
+        if scored.clearing:
+            return score, white, black, scored.clearing
+        # if no scoring dice were rolled, we need to stop
+        if not scored.scoring_dice:
+            return 0
+
+        # ask the policy if it wants to keep playing
+        turn = self._turn
+        turn.score = score
+        turn.remaining_white = white
+        turn.remaining_black = black
+        turn.clearing = 0
+        if turn._get_keep_playing_choice() == 1:
+            return score, white, black, 0
+        return score
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} policy={self.policy!r} max_score={self.max_score} states={len(self._cache)}>'
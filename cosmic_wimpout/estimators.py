@@ -0,0 +1,294 @@
+"""
+Variance-reduced turn estimators
+
+Estimates the expected turn score of a policy, or the difference between
+two policies, from fewer turns than plain Monte Carlo simulation needs
+for the same confidence. Each technique can be switched on separately:
+
+- antithetic dice: the rolls of every dice state are ranked by the points
+  they score, and every turn is paired with a turn picking the mirrored
+  rank for each roll, so a lucky turn is paired with an unlucky one.
+- common random numbers: compared policies play each turn from the same
+  position of the dice stream, so their difference comes from their
+  decisions rather than from the dice.
+- control variates: every roll adds its points minus the exact expected
+  points of a roll of the same dice state to a control whose mean is
+  zero, and the turn score is corrected by its regression on the control.
+- stratification: the first roll of the ``i``-th of ``n`` turns is picked
+  from the ``i``-th of ``n`` equal slices of the ranked rolls, so every
+  first roll is played in proportion to its probability.
+
+The effective sample size of an estimate is the number of plain Monte
+Carlo turns per policy giving the same standard error.
+"""
+
+from statistics import NormalDist
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cosmic_wimpout import ScoringLogic
+from .policy import Policy
+from .rng import DiceStream
+from .rolls import FACE_BY_CODE, WHITE_ROLLS, roll_sampler
+from .simulator import HeadlessTurnLogic
+from .throwables import CosmicWimpoutException
+
+
+__all__ = (
+    'Estimate',
+    'TurnEstimator',
+)
+
+
+# the rolls of a dice state ranked by points, the points of each roll,
+# and the expected points of a roll
+_RankedRolls = Tuple[Tuple[int, ...], Tuple[int, ...], float]
+
+
+class Estimate:
+    """An estimated expected turn score, or difference between two.
+
+    Attributes
+    -----------
+    mean: :class:`float`
+        The estimated value.
+    variance: :class:`float`
+        The variance of the estimator.
+    turns: :class:`int`
+        The number of turns played by each policy.
+    effective_turns: :class:`float`
+        The number of plain Monte Carlo turns per policy
+        estimating the value with the same variance.
+    """
+
+    __slots__ = (
+        'mean',
+        'variance',
+        'turns',
+        'effective_turns',
+    )
+
+    def __init__(self, mean: float, variance: float, turns: int, effective_turns: float):
+        self.mean: float = mean
+        self.variance: float = variance
+        self.turns: int = turns
+        self.effective_turns: float = effective_turns
+
+    @property
+    def standard_error(self) -> float:
+        return self.variance ** 0.5
+
+    @property
+    def efficiency(self) -> float:
+        """The effective sample size per turn played"""
+        return self.effective_turns / self.turns if self.turns else 0.0
+
+    def confidence_interval(self, confidence: float = 0.95) -> Tuple[float, float]:
+        """Gets a normal confidence interval of the value
+        :param confidence: probability of the interval holding the value  [default 0.95]
+        :return: the lower and upper bounds
+        """
+        margin = NormalDist().inv_cdf((1 + confidence) / 2) * self.standard_error
+        return self.mean - margin, self.mean + margin
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} mean={self.mean:.3f} standard_error={self.standard_error:.3f} '
+                f'turns={self.turns} effective_turns={self.effective_turns:.0f}>')
+
+
+class _EstimatorTurnLogic(HeadlessTurnLogic):
+    """Headless turn logic rolling from ranked rolls and adding up the control.
+
+    Attributes
+    -----------
+    mirror: :class:`bool`
+        A boolean representing if every pick is mirrored.
+    first_roll: :class:`int`
+        The rank of the first roll of the turn, or ``-1`` to draw it.
+    control: :class:`float`
+        The points rolled minus their expectation, so far this turn.
+    """
+
+    __slots__ = (
+        'mirror',
+        'first_roll',
+        'control',
+        '_ranked',
+    )
+
+    def __init__(self, policy: Policy, rng: DiceStream, scoring: ScoringLogic,
+                 ranked: Dict[Tuple[int, bool, int], _RankedRolls]):
+        super().__init__(policy, rng, scoring)
+        self.mirror: bool = False
+        self.first_roll: int = -1
+        self.control: float = 0.0
+        self._ranked: Dict[Tuple[int, bool, int], _RankedRolls] = ranked
+
+    def _roll_dice(self) -> None:
+        rolls, points, expected = self._ranked[self.remaining_white, self.remaining_black, self.clearing]
+        if self.first_roll >= 0:
+            rank = self.first_roll
+            self.first_roll = -1
+        else:
+            rank = self.rng.randrange(len(rolls))
+        if self.mirror:
+            rank = len(rolls) - 1 - rank
+
+        roll = rolls[rank]
+        self.white_roll = roll >> 3
+        self.black_roll = roll & 7
+        self.control += points[rank] - expected
+
+
+class TurnEstimator:
+    """Estimates expected turn scores with variance reduction.
+
+    Every estimate restarts the dice from ``seed``, so estimates of
+    different policies already share their dice turn for turn.
+
+    Attributes
+    -----------
+    scoring: :class:`ScoringLogic`
+        The rules used to score each roll.
+    seed: :class:`int`
+        The seed of the dice.
+    antithetic: :class:`bool`
+        A boolean representing if turns are played in antithetic pairs.
+    control_variate: :class:`bool`
+        A boolean representing if scores are corrected by the points rolled.
+    stratify: :class:`bool`
+        A boolean representing if the first rolls are stratified.
+    """
+
+    __slots__ = (
+        'scoring',
+        'seed',
+        'antithetic',
+        'control_variate',
+        'stratify',
+        '_ranked',
+    )
+
+    def __init__(self, scoring: Optional[ScoringLogic] = None, seed: int = 0, antithetic: bool = False,
+                 control_variate: bool = False, stratify: bool = False):
+        self.scoring: ScoringLogic = scoring or ScoringLogic()
+        self.seed: int = seed
+        self.antithetic: bool = antithetic
+        self.control_variate: bool = control_variate
+        self.stratify: bool = stratify
+        self._ranked: Dict[Tuple[int, bool, int], _RankedRolls] = self._rank_rolls()
+
+    def _rank_rolls(self) -> Dict[Tuple[int, bool, int], _RankedRolls]:
+        """Ranks the equally likely rolls of every dice state by their points,
+        taking the first outcome of rolls asking a decision
+        """
+        table = self.scoring.table
+        ranked = {}
+        for remaining_white in range(5):
+            for remaining_black in (False, True):
+                for clearing in range(len(FACE_BY_CODE)):
+                    points = {}
+                    for roll in set(roll_sampler(remaining_white, remaining_black, clearing)):
+                        entry = table[WHITE_ROLLS[roll >> 3], FACE_BY_CODE[roll & 7]]
+                        points[roll] = entry.outcomes[0].points
+                    rolls = sorted(roll_sampler(remaining_white, remaining_black, clearing),
+                                   key=lambda roll: (points[roll], roll))
+                    roll_points = tuple(points[roll] for roll in rolls)
+                    ranked[remaining_white, remaining_black, clearing] = \
+                        tuple(rolls), roll_points, sum(roll_points) / len(roll_points)
+        return ranked
+
+    def estimate(self, policy: Policy, turns: int) -> Estimate:
+        """Estimates the expected turn score of a policy
+        :param policy: policy answering every decision
+        :param turns: number of turns to play
+        :return: the estimated expected score, counting instant wins and losses as ``0``
+        """
+        return self._run([policy], turns, True)
+
+    def compare(self, first: Policy, second: Policy, turns: int, common_random_numbers: bool = True) -> Estimate:
+        """Estimates how many more points a policy scores per turn than another
+        :param first: first policy
+        :param second: second policy
+        :param turns: number of turns played by each policy
+        :param common_random_numbers: if both policies play every turn with the same dice  [default True]
+        :return: the estimated expected score of the first policy minus the second
+        """
+        return self._run([first, second], turns, common_random_numbers)
+
+    def _run(self, policies: Sequence[Policy], turns: int, common_random_numbers: bool) -> Estimate:
+        rng = DiceStream(self.seed)
+        streams = [rng] if common_random_numbers else [rng.split(seat) for seat in range(len(policies))]
+        turn_logic = [_EstimatorTurnLogic(policy, streams[0 if common_random_numbers else seat], self.scoring,
+                                          self._ranked)
+                      for seat, policy in enumerate(policies)]
+
+        mirrors = (False, True) if self.antithetic else (False,)
+        samples = turns // len(mirrors)
+        if samples < 2:
+            raise ValueError(f'At least {2 * len(mirrors)} turns are needed to estimate the variance')
+        first_rolls = len(self._ranked[4, True, 0][0])
+        scores = np.zeros((samples, len(policies), len(mirrors)))
+        controls = np.zeros((samples, len(policies), len(mirrors)))
+
+        for sample in range(samples):
+            first_roll = -1
+            if self.stratify:
+                first_roll = (sample * first_rolls + rng.randrange(first_rolls)) // samples
+            # every turn of the sample starts from the same position of its stream
+            states = [stream.getstate() for stream in streams]
+
+            for seat, turn in enumerate(turn_logic):
+                stream = turn.rng
+                for index, mirror in enumerate(mirrors):
+                    stream.setstate(states[0 if common_random_numbers else seat])
+                    turn.reset()
+                    turn.mirror = mirror
+                    turn.first_roll = first_roll
+                    turn.control = 0.0
+                    try:
+                        turn.resolve_turn()
+                        scores[sample, seat, index] = turn.score
+                    except CosmicWimpoutException:
+                        pass
+                    controls[sample, seat, index] = turn.control
+
+        return self._summarize(scores, controls)
+
+    def _summarize(self, scores: np.ndarray, controls: np.ndarray) -> Estimate:
+        """Combines the turns into an estimate
+        :param scores: score of every turn, indexed by sample, policy and mirror
+        :param controls: control of every turn, with the same indices
+        """
+        samples, policies, mirrors = scores.shape
+        values = scores.mean(axis=2)
+        values = values[:, 0] - values[:, 1] if policies == 2 else values[:, 0]
+
+        if self.control_variate:
+            # the controls have a known mean of zero, so removing their
+            # regression from the values keeps the estimate unbiased
+            control = controls.mean(axis=2)
+            centered = control - control.mean(axis=0)
+            beta = np.linalg.lstsq(centered, values - values.mean(), rcond=None)[0]
+            values = values - control @ beta
+
+        mean = float(values.mean())
+        if self.stratify:
+            # neighboring samples come from neighboring strata, so each
+            # pair of them estimates the variance within its strata
+            pairs = samples // 2
+            differences = values[1:2 * pairs:2] - values[0:2 * pairs:2]
+            variance = float(np.sum(differences ** 2)) / (2 * pairs) ** 2
+        else:
+            variance = float(values.var(ddof=1)) / samples
+
+        # the variance of plain Monte Carlo turns, playing every policy apart
+        plain_variance = sum(float(scores[:, seat].var(ddof=1)) for seat in range(policies))
+        turns = samples * mirrors
+        effective_turns = plain_variance / variance if variance else float('inf')
+        return Estimate(mean, variance, turns, effective_turns)
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} seed={self.seed} antithetic={self.antithetic} '
+                f'control_variate={self.control_variate} stratify={self.stratify}>')
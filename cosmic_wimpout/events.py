@@ -0,0 +1,276 @@
+"""
+Turn events
+
+A :class:`TurnLogic` reports what happens during a turn as typed events
+sent to its listeners. A listener is any callable taking a single
+:class:`TurnEvent`. Events are only created while at least one listener
+is attached, and a turn logic without listeners looks each roll up in
+the compiled scoring table instead of running the rules one by one.
+"""
+
+from collections import Counter
+from enum import IntEnum
+from typing import Callable, Dict, Optional, TextIO
+
+from .dice import Face
+
+
+__all__ = (
+    'ScoreKind',
+    'TurnEvent',
+    'RollEvent',
+    'ScoreEvent',
+    'ClearingFaceEvent',
+    'BustEvent',
+    'TurnEndEvent',
+    'Listener',
+    'ConsoleRenderer',
+    'RuleCounter',
+)
+
+
+class ScoreKind(IntEnum):
+    FIVE_OF_A_KIND = 1
+    THREE_OF_A_KIND = 2
+    SINGLE = 3
+    SUN = 4
+
+
+class TurnEvent:
+    """Base class of every event of a turn."""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        attrs = ' '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'<{self.__class__.__name__} {attrs}>'
+
+
+class RollEvent(TurnEvent):
+    """The dice were rolled.
+
+    Attributes
+    -----------
+    white_die_rolls: Dict[:class:`Face`, :class:`int`]
+        The number of times each white face was rolled.
+    black_die_roll: Optional[:class:`Face`]
+        The face rolled on the black die, or ``None``
+        if the die was not rolled.
+    """
+
+    __slots__ = (
+        'white_die_rolls',
+        'black_die_roll',
+    )
+
+    def __init__(self, white_die_rolls: Dict[Face, int], black_die_roll: Optional[Face]):
+        self.white_die_rolls: Dict[Face, int] = white_die_rolls
+        self.black_die_roll: Optional[Face] = black_die_roll
+
+
+class ScoreEvent(TurnEvent):
+    """A scoring rule scored some of the rolled dice.
+
+    Attributes
+    -----------
+    rule: :class:`str`
+        The name of the rule that fired.
+    kind: :class:`ScoreKind`
+        The kind of combination that was scored.
+    face: :class:`Face`
+        The face that was scored.
+    white: :class:`int`
+        The number of white dice used.
+    black: :class:`bool`
+        A boolean representing if the black die was used.
+    wild: :class:`bool`
+        A boolean representing if the black die was used
+        as a wild sun for another face.
+    points: :class:`int`
+        The number of points added to the turn.
+    """
+
+    __slots__ = (
+        'rule',
+        'kind',
+        'face',
+        'white',
+        'black',
+        'wild',
+        'points',
+    )
+
+    def __init__(self, rule: str, kind: ScoreKind, face: Face, white: int, black: bool, points: int,
+                 wild: bool = False):
+        self.rule: str = rule
+        self.kind: ScoreKind = kind
+        self.face: Face = face
+        self.white: int = white
+        self.black: bool = black
+        self.wild: bool = wild
+        self.points: int = points
+
+
+class ClearingFaceEvent(TurnEvent):
+    """The turn continues without asking the player.
+
+    Attributes
+    -----------
+    face: Optional[:class:`Face`]
+        The face that must be cleared, or ``None`` if not present.
+    fresh_dice: :class:`bool`
+        A boolean representing if every die was used, so
+        all of them are rolled again.
+    """
+
+    __slots__ = (
+        'face',
+        'fresh_dice',
+    )
+
+    def __init__(self, face: Optional[Face], fresh_dice: bool):
+        self.face: Optional[Face] = face
+        self.fresh_dice: bool = fresh_dice
+
+
+class BustEvent(TurnEvent):
+    """No scoring dice were rolled, so the turn lost its points.
+
+    Attributes
+    -----------
+    score: :class:`int`
+        The score lost by the turn.
+    """
+
+    __slots__ = ('score',)
+
+    def __init__(self, score: int):
+        self.score: int = score
+
+
+class TurnEndEvent(TurnEvent):
+    """The turn ended, either by choice or by a bust.
+
+    Attributes
+    -----------
+    score: :class:`int`
+        The final score of the turn.
+    """
+
+    __slots__ = ('score',)
+
+    def __init__(self, score: int):
+        self.score: int = score
+
+
+Listener = Callable[[TurnEvent], None]
+
+_NUMBERS = {2: 'two', 3: 'three', 4: 'four', 5: 'five'}
+
+
+class ConsoleRenderer:
+    """Prints every event the way the game always has.
+
+    Attributes
+    -----------
+    file: Optional[TextIO]
+        The stream every event is printed to, or ``None`` to print
+        to the current ``sys.stdout``.
+    """
+
+    __slots__ = ('file',)
+
+    def __init__(self, file: Optional[TextIO] = None):
+        self.file: Optional[TextIO] = file
+
+    def __call__(self, event: TurnEvent) -> None:
+        if isinstance(event, RollEvent):
+            self.render_roll(event)
+        elif isinstance(event, ScoreEvent):
+            self.render_score(event)
+        elif isinstance(event, ClearingFaceEvent):
+            if not event.fresh_dice:
+                print(f'[DEBUG] The "{event.face.value}" face must be cleared, so the turn continues', file=self.file)
+                return
+            print('[DEBUG] All dice were consumed, so the turn continues', file=self.file)
+            if event.face is not None:
+                print(f'[DEBUG] The "{event.face.value}" face must be cleared', file=self.file)
+        elif isinstance(event, BustEvent):
+            print('[DEBUG] No scoring dice were rolled, so the turn ends with no points scored', file=self.file)
+            print(f'[DEBUG] Score {event.score} -> 0', file=self.file)
+
+    def render_roll(self, event: RollEvent) -> None:
+        print(file=self.file)
+        print('Dice:', end=' ', file=self.file)
+        for face, count in event.white_die_rolls.items():
+            for _ in range(count):
+                print(f'[{face.value}]', end=' ', file=self.file)
+        if event.black_die_roll is not None:
+            print(f'({event.black_die_roll.value})', end=' ', file=self.file)
+        print(file=self.file)
+        print(file=self.file)
+
+    def render_score(self, event: ScoreEvent) -> None:
+        value = event.face.value
+        if event.kind == ScoreKind.SUN:
+            print(f'[DEBUG] Sun die increased score by {event.points} points', file=self.file)
+            return
+
+        if event.wild:
+            dice = f'{_NUMBERS[event.white]} white "{value}" faces and a wild sun'
+        elif event.kind == ScoreKind.SINGLE:
+            dice = f'a black "{value}" face' if event.black else f'{event.white} white "{value}" faces'
+        else:
+            dice = f'{_NUMBERS[event.white + event.black]} "{value}" faces'
+        print(f'[DEBUG] Rolled {dice} and increased score by {event.points} points', file=self.file)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}>'
+
+
+class RuleCounter:
+    """Counts how often each scoring rule fires.
+
+    Attributes
+    -----------
+    rules: Counter[:class:`str`]
+        The number of times each rule fired.
+    points: Counter[:class:`str`]
+        The number of points scored by each rule.
+    rolls: :class:`int`
+        The number of rolls made.
+    busts: :class:`int`
+        The number of turns that ended without points.
+    turns: :class:`int`
+        The number of turns that ended without an instant win or loss.
+    """
+
+    __slots__ = (
+        'rules',
+        'points',
+        'rolls',
+        'busts',
+        'turns',
+    )
+
+    def __init__(self):
+        self.rules: Counter = Counter()
+        self.points: Counter = Counter()
+        self.rolls: int = 0
+        self.busts: int = 0
+        self.turns: int = 0
+
+    def __call__(self, event: TurnEvent) -> None:
+        if isinstance(event, ScoreEvent):
+            self.rules[event.rule] += 1
+            self.points[event.rule] += event.points
+        elif isinstance(event, RollEvent):
+            self.rolls += 1
+        elif isinstance(event, BustEvent):
+            self.busts += 1
+        elif isinstance(event, TurnEndEvent):
+            self.turns += 1
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} rolls={self.rolls} turns={self.turns} '
+                f'busts={self.busts} rules={dict(self.rules)}>')
@@ -0,0 +1,305 @@
+"""
+Columnar export
+
+Writes simulation results row by row into chunked columnar files that
+dataframe libraries load directly. Rows are buffered in typed arrays, one
+per column, and every ``chunk_rows`` rows the buffers are written as one
+NumPy ``.npy`` file per column and cleared, so memory stays bounded
+however many rows a run writes and no row is ever held as Python objects.
+
+An export directory looks like::
+
+    manifest.json           columns, types, chunk and row counts, metadata
+    score/000000.npy        the first chunk of the score column
+    score/000001.npy
+    ...
+
+Parallel runs write one directory per shard below a common one, and
+:func:`iter_chunks` and :func:`load_columns` read every directory below
+the one they are given, in order. Each chunk can be memory-mapped, or
+handed to ``pandas.DataFrame`` or ``pyarrow.Table.from_pydict`` as is.
+"""
+
+import hashlib
+import json
+import os
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .events import BustEvent, ClearingFaceEvent, RollEvent, TurnEndEvent, TurnEvent
+from .player import Player
+from .rolls import FACE_CODES
+
+
+__all__ = (
+    'ColumnWriter',
+    'TurnRecorder',
+    'GameRecorder',
+    'policy_id',
+    'iter_chunks',
+    'load_columns',
+)
+
+
+_VERSION = 1
+_MANIFEST = 'manifest.json'
+
+
+def policy_id(policy: Any) -> int:
+    """Gets a stable identifier of a policy, the same in every run and process
+    :param policy: policy to identify, by its ``repr``
+    :return: a signed 64-bit identifier
+    """
+    return int.from_bytes(hashlib.blake2b(repr(policy).encode(), digest_size=8).digest(), 'little', signed=True)
+
+
+class ColumnWriter:
+    """Writes rows to a directory of chunked columnar ``.npy`` files.
+
+    Columns are typed with the type codes shared by :mod:`array` and
+    NumPy, such as ``'q'`` for signed 64-bit and ``'B'`` for unsigned
+    8-bit integers. The manifest is rewritten after every chunk, so
+    the rows written so far stay readable if a run is stopped.
+
+    Attributes
+    -----------
+    directory: :class:`str`
+        The directory the columns are written to.
+    columns: Tuple[Tuple[:class:`str`, :class:`str`], ...]
+        The name and type code of every column, in row order.
+    chunk_rows: :class:`int`
+        The number of rows buffered before they are written.
+    metadata: Dict[:class:`str`, Any]
+        JSON compatible values stored in the manifest.
+    rows: :class:`int`
+        The number of rows written and buffered.
+    chunks: :class:`int`
+        The number of chunks written.
+    """
+
+    __slots__ = (
+        'directory',
+        'columns',
+        'chunk_rows',
+        'metadata',
+        'rows',
+        'chunks',
+        '_buffers',
+    )
+
+    def __init__(self, directory: str, columns: Sequence[Tuple[str, str]], chunk_rows: int = 1 << 20,
+                 metadata: Optional[Dict[str, Any]] = None):
+        """
+        :param directory: directory to write to, created if needed
+        :param columns: name and type code of every column
+        :param chunk_rows: rows buffered before they are written  [default 1048576]
+        :param metadata: values stored in the manifest  [default None]
+        :raises ValueError: if the directory already holds an export
+        """
+        if os.path.exists(os.path.join(directory, _MANIFEST)):
+            raise ValueError(f'"{directory}" already holds exported columns')
+        self.directory: str = directory
+        self.columns: Tuple[Tuple[str, str], ...] = tuple(columns)
+        self.chunk_rows: int = chunk_rows
+        self.metadata: Dict[str, Any] = dict(metadata or {})
+        self.rows: int = 0
+        self.chunks: int = 0
+        self._buffers: List[array] = [array(code) for _, code in self.columns]
+        for name, _ in self.columns:
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+    def append(self, *values: int) -> None:
+        """Adds a row, writing the buffered chunk once it is full
+        :param values: value of every column, in order
+        """
+        for buffer, value in zip(self._buffers, values):
+            buffer.append(value)
+        self.rows += 1
+        if len(self._buffers[0]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered rows as a chunk"""
+        if not len(self._buffers[0]):
+            return
+        for (name, code), buffer in zip(self.columns, self._buffers):
+            np.save(os.path.join(self.directory, name, f'{self.chunks:06d}.npy'), np.frombuffer(buffer, code))
+            del buffer[:]
+        self.chunks += 1
+        self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            'version': _VERSION,
+            'columns': [[name, np.dtype(code).str] for name, code in self.columns],
+            'chunks': self.chunks,
+            'rows': self.rows - len(self._buffers[0]),
+            'metadata': self.metadata,
+        }
+        path = os.path.join(self.directory, _MANIFEST)
+        with open(f'{path}.partial', 'w') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(f'{path}.partial', path)
+
+    def close(self) -> None:
+        """Writes the rows still buffered and the final manifest"""
+        self.flush()
+        self._write_manifest()
+
+    def __enter__(self) -> 'ColumnWriter':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} directory={self.directory!r} rows={self.rows} '
+                f'chunks={self.chunks}>')
+
+
+class TurnRecorder(ColumnWriter):
+    """Writes a row for every turn it listens to.
+
+    Attach it to the ``listeners`` of a turn logic, or pass it to
+    :meth:`TurnSimulator.simulate`. Like every listener, it makes the
+    turn logic walk the scoring rules one by one.
+
+    The columns are ``seed`` and ``policy``, the same for every row of a
+    recorder, ``turn``, the index of the turn, ``rolls``, the rolls made,
+    ``score``, the final score, ``bust``, ``1`` if the turn ended without
+    points, ``instant``, ``1`` or ``-1`` if it instantly won or lost, and
+    ``clearing_faces``, the faces that had to be cleared as a bit mask,
+    where face code ``c`` of :data:`FACE_CODES` is bit ``c - 1``.
+
+    Attributes
+    -----------
+    seed: :class:`int`
+        The seed of the dice of the turns.
+    policy: :class:`int`
+        The identifier of the policy playing the turns.
+    """
+
+    __slots__ = (
+        'seed',
+        'policy',
+        '_rolls',
+        '_bust',
+        '_clearing_faces',
+    )
+
+    COLUMNS = (
+        ('seed', 'Q'),
+        ('policy', 'q'),
+        ('turn', 'q'),
+        ('rolls', 'H'),
+        ('score', 'q'),
+        ('bust', 'b'),
+        ('instant', 'b'),
+        ('clearing_faces', 'B'),
+    )
+
+    def __init__(self, directory: str, seed: int = 0, policy: int = 0, chunk_rows: int = 1 << 20,
+                 metadata: Optional[Dict[str, Any]] = None):
+        """
+        :param seed: seed of the dice of the turns  [default 0]
+        :param policy: identifier of the policy, see :func:`policy_id`  [default 0]
+        """
+        super().__init__(directory, self.COLUMNS, chunk_rows, metadata)
+        self.seed: int = seed
+        self.policy: int = policy
+        self._rolls: int = 0
+        self._bust: bool = False
+        self._clearing_faces: int = 0
+
+    def __call__(self, event: TurnEvent) -> None:
+        if isinstance(event, RollEvent):
+            self._rolls += 1
+        elif isinstance(event, ClearingFaceEvent):
+            if event.face is not None:
+                self._clearing_faces |= 1 << FACE_CODES[event.face] - 1
+        elif isinstance(event, BustEvent):
+            self._bust = True
+        elif isinstance(event, TurnEndEvent):
+            self._add(event.score, 0)
+
+    def add_instant(self, won: bool) -> None:
+        """Adds a turn that instantly won or lost, scoring ``0``"""
+        self._add(0, 1 if won else -1)
+
+    def _add(self, score: int, instant: int) -> None:
+        self.append(self.seed, self.policy, self.rows, self._rolls, score, self._bust, instant,
+                    self._clearing_faces)
+        self._rolls = 0
+        self._bust = False
+        self._clearing_faces = 0
+
+
+class GameRecorder(ColumnWriter):
+    """Writes a row for every game, with the final score of every player.
+
+    The columns are ``seed``, the same for every row of a recorder,
+    ``game``, the index of the game, ``winner``, the seat of the winner
+    or ``-1`` if every player was removed, and ``score_0``, ``score_1``
+    and so on, the final score of the player in each seat.
+
+    Attributes
+    -----------
+    seed: :class:`int`
+        The seed of the dice of the games.
+    """
+
+    __slots__ = ('seed',)
+
+    def __init__(self, directory: str, players: int, seed: int = 0, chunk_rows: int = 1 << 20,
+                 metadata: Optional[Dict[str, Any]] = None):
+        """
+        :param players: number of players in every game
+        :param seed: seed of the dice of the games  [default 0]
+        """
+        columns = [('seed', 'Q'), ('game', 'q'), ('winner', 'b')] + [(f'score_{seat}', 'q') for seat in range(players)]
+        super().__init__(directory, columns, chunk_rows, metadata)
+        self.seed: int = seed
+
+    def add_game(self, winner: Optional[int], players: Sequence[Player]) -> None:
+        """Adds a finished game
+        :param winner: seat of the winner, or ``None`` if there was none
+        :param players: players of the game, in seat order
+        """
+        self.append(self.seed, self.rows, -1 if winner is None else winner, *(player.score for player in players))
+
+
+def _manifests(directory: str) -> List[str]:
+    """Gets every export directory below a directory, in order"""
+    return sorted(root for root, _, files in os.walk(directory) if _MANIFEST in files)
+
+
+def iter_chunks(directory: str, columns: Optional[Sequence[str]] = None,
+                mmap: bool = True) -> Iterator[Dict[str, np.ndarray]]:
+    """Reads exported columns a chunk at a time, in bounded memory
+    :param directory: export directory, or a directory holding several
+    :param columns: names of the columns to read  [default all of them]
+    :param mmap: if the chunks are memory-mapped instead of read  [default True]
+    :return: the columns of every chunk
+    """
+    for root in _manifests(directory):
+        with open(os.path.join(root, _MANIFEST)) as file:
+            manifest = json.load(file)
+        names = columns or [name for name, _ in manifest['columns']]
+        for chunk in range(manifest['chunks']):
+            yield {name: np.load(os.path.join(root, name, f'{chunk:06d}.npy'), mmap_mode='r' if mmap else None)
+                   for name in names}
+
+
+def load_columns(directory: str, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """Reads exported columns whole, e.g. for ``pandas.DataFrame(load_columns(path))``
+    :param directory: export directory, or a directory holding several
+    :param columns: names of the columns to read  [default all of them]
+    :return: every row of every column
+    """
+    chunks: Dict[str, List[np.ndarray]] = {}
+    for chunk in iter_chunks(directory, columns):
+        for name, values in chunk.items():
+            chunks.setdefault(name, []).append(values)
+    return {name: np.concatenate(values) for name, values in chunks.items()}
@@ -0,0 +1,53 @@
+"""
+House rules
+
+Scoring rules played at some tables but not by the standard game. Each
+rule is registered on a :class:`ScoringLogic`, e.g.::
+
+    scoring = ScoringLogic()
+    scoring.register(sun_freight_train, before='three_of_a_kind')
+    scoring.register(free_flash)
+    turn_logic = TurnLogic(scoring=scoring)
+"""
+
+from .dice import Face
+from .events import ScoreEvent, ScoreKind
+from .rolls import WHITE_FACES
+
+
+__all__ = (
+    'sun_freight_train',
+    'free_flash',
+)
+
+
+def sun_freight_train(state) -> None:
+    """Counts four matching white faces and a wild sun as a freight train
+
+    Register it before ``three_of_a_kind`` so the white dice are not
+    scored as a flash first.
+    """
+    if state.black_die_roll != Face.SUN:
+        return
+
+    white_counts = state.white_counts
+    for position, face in enumerate(WHITE_FACES):
+        if white_counts[position] == 4:
+            points = state.get_five_of_a_kind_points(face)
+            if state.listeners:
+                state.emit(ScoreEvent('sun_freight_train', ScoreKind.FIVE_OF_A_KIND, face, 4, True, points,
+                                      wild=True))
+            state.score += points
+            white_counts[position] = 0
+            state.black_die_roll = None
+            state.remaining_white = 0
+            state.remaining_black = False
+            state.scoring_dice = True
+
+
+def free_flash(state) -> None:
+    """Lets the turn continue without clearing the face of a flash
+
+    Register it last so it runs after every rule setting a clearing face.
+    """
+    state.clearing = 0
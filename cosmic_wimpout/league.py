@@ -0,0 +1,242 @@
+"""
+Strategy league
+
+Plays round-robin matches between registered policies with the full
+game engine. Each pairing is played in batches and stops as soon as the
+confidence interval of its win rate excludes an even match, instead of
+playing a fixed number of games.
+
+Every pairing uses common random numbers: game ``k`` of any pairing is
+rolled from the same dice stream, once with each seat order, so differences
+between pairings come from the policies and not from the dice.
+"""
+
+from math import log10, sqrt
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+from .policy import Policy
+from .rng import DiceStream
+from .simulator import GameSimulator
+
+
+__all__ = (
+    'PairingResult',
+    'League',
+)
+
+
+class PairingResult:
+    """Outcome of the games played between two policies.
+
+    Attributes
+    -----------
+    first: :class:`str`
+        The name of the first policy.
+    second: :class:`str`
+        The name of the second policy.
+    games: :class:`int`
+        The number of games played.
+    wins: :class:`int`
+        The number of games won by the first policy.
+    losses: :class:`int`
+        The number of games won by the second policy.
+    draws: :class:`int`
+        The number of games where both players were removed.
+    significant: :class:`bool`
+        A boolean representing if the pairing stopped because one
+        policy was found to be stronger.
+    """
+
+    __slots__ = (
+        'first',
+        'second',
+        'games',
+        'wins',
+        'losses',
+        'draws',
+        'significant',
+    )
+
+    def __init__(self, first: str, second: str):
+        self.first: str = first
+        self.second: str = second
+        self.games: int = 0
+        self.wins: int = 0
+        self.losses: int = 0
+        self.draws: int = 0
+        self.significant: bool = False
+
+    def record(self, winner: Optional[int]) -> None:
+        """Adds a game to the result
+        :param winner: seat of the winner, ``0`` for the first policy,
+                       or ``None`` if there was no winner
+        """
+        self.games += 1
+        if winner is None:
+            self.draws += 1
+        elif winner == 0:
+            self.wins += 1
+        else:
+            self.losses += 1
+
+    @property
+    def win_rate(self) -> float:
+        """The score of the first policy, counting draws as half a win"""
+        return (self.wins + self.draws / 2) / self.games if self.games else 0.5
+
+    def confidence_interval(self, z: float = 1.96) -> Tuple[float, float]:
+        """Gets the Wilson score interval of the win rate
+        :param z: standard normal quantile of the interval  [default 1.96]
+        :return: the lower and upper bounds
+        """
+        if not self.games:
+            return 0.0, 1.0
+        n = self.games
+        p = self.win_rate
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        margin = z / (1 + z * z / n) * sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+        return center - margin, center + margin
+
+    @property
+    def elo_difference(self) -> float:
+        """The Elo rating of the first policy minus the second"""
+        p = min(max(self.win_rate, 1e-6), 1 - 1e-6)
+        return 400 * log10(p / (1 - p))
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} first={self.first!r} second={self.second!r} games={self.games} '
+                f'win_rate={self.win_rate:.3f} elo_difference={self.elo_difference:+.1f} '
+                f'significant={self.significant}>')
+
+
+class League:
+    """Round-robin league between policies with early stopping.
+
+    A pairing is checked after every batch of games. Since the result
+    is looked at many times, each look uses a Bonferroni corrected
+    interval so the chance of a false verdict over the whole pairing
+    stays below ``alpha``.
+
+    Attributes
+    -----------
+    policies: Dict[:class:`str`, :class:`Policy`]
+        The registered policies, by name.
+    goal: :class:`int`
+        The number of points needed to win a game.
+    alpha: :class:`float`
+        The chance of calling an even pairing significant.
+    batch_size: :class:`int`
+        The number of games with each seat order played between looks.
+    max_games: :class:`int`
+        The most games played by a pairing.
+    seed: :class:`int`
+        The root seed of the dice.
+    results: List[:class:`PairingResult`]
+        The result of every pairing played so far.
+    """
+
+    __slots__ = (
+        'policies',
+        'goal',
+        'alpha',
+        'batch_size',
+        'max_games',
+        'seed',
+        'results',
+    )
+
+    def __init__(self, goal: int = 500, alpha: float = 0.05, batch_size: int = 100, max_games: int = 20_000,
+                 seed: int = 0):
+        self.policies: Dict[str, Policy] = {}
+        self.goal: int = goal
+        self.alpha: float = alpha
+        self.batch_size: int = batch_size
+        self.max_games: int = max_games
+        self.seed: int = seed
+        self.results: List[PairingResult] = []
+
+    def register(self, name: str, policy: Policy) -> None:
+        """Adds a policy to the league
+        :param name: name identifying the policy
+        :param policy: the policy
+        """
+        if name in self.policies:
+            raise ValueError(f'A policy named "{name}" is already registered')
+        self.policies[name] = policy
+
+    def play_pairing(self, first: str, second: str) -> PairingResult:
+        """Plays games between two policies until the result is significant
+        :param first: name of the first policy
+        :param second: name of the second policy
+        :return: the result of the pairing
+        """
+        rng = DiceStream()
+        games = GameSimulator([self.policies[first], self.policies[second]], self.goal, rng)
+        swapped = GameSimulator([self.policies[second], self.policies[first]], self.goal, rng)
+
+        looks = max(1, self.max_games // (2 * self.batch_size))
+        z = NormalDist().inv_cdf(1 - self.alpha / (2 * looks))
+
+        result = PairingResult(first, second)
+        game = 0
+        while result.games + 2 <= self.max_games:
+            for _ in range(min(self.batch_size, (self.max_games - result.games) // 2)):
+                # both seat orders roll the dice of the same game
+                rng.seed(self.seed, game)
+                result.record(games.play_game())
+                rng.seed(self.seed, game)
+                game += 1
+                winner = swapped.play_game()
+                result.record(None if winner is None else 1 - winner)
+
+            low, high = result.confidence_interval(z)
+            if low > 0.5 or high < 0.5:
+                result.significant = True
+                break
+        return result
+
+    def run(self) -> List[PairingResult]:
+        """Plays every pairing of the registered policies
+        :return: the result of every pairing
+        """
+        names = list(self.policies)
+        self.results = [self.play_pairing(first, second)
+                        for index, first in enumerate(names) for second in names[index + 1:]]
+        return self.results
+
+    def ratings(self, iterations: int = 1000) -> Dict[str, float]:
+        """Fits Elo ratings to the results with a Bradley-Terry model
+        :param iterations: most iterations of the fit  [default 1000]
+        :return: the rating of each policy, averaging 1500
+        """
+        names = list(self.policies)
+        index = {name: position for position, name in enumerate(names)}
+        # half a win each way keeps unbeaten policies finite
+        scores = [[0.0 if i == j else 0.5 for j in names] for i in names]
+        games = [[0.0 if i == j else 1.0 for j in names] for i in names]
+        for result in self.results:
+            i, j = index[result.first], index[result.second]
+            score = result.wins + result.draws / 2
+            scores[i][j] += score
+            scores[j][i] += result.games - score
+            games[i][j] += result.games
+            games[j][i] += result.games
+
+        strengths = [1.0] * len(names)
+        for _ in range(iterations):
+            updated = []
+            for i in range(len(names)):
+                expected = sum(games[i][j] / (strengths[i] + strengths[j]) for j in range(len(names)) if j != i)
+                updated.append(sum(scores[i]) / expected if expected else strengths[i])
+            change = max(abs(a - b) / b for a, b in zip(updated, strengths))
+            strengths = updated
+            if change < 1e-10:
+                break
+
+        elos = [400 * log10(strength) for strength in strengths]
+        mean = sum(elos) / len(elos) if elos else 0.0
+        return {name: 1500 + elo - mean for name, elo in zip(names, elos)}
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} policies={list(self.policies)} goal={self.goal} results={len(self.results)}>'
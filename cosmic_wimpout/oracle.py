@@ -0,0 +1,500 @@
+"""
+Win probabilities
+
+Computes the probability of winning a game from any decision of a turn,
+for a player who plays every later decision to win against an opponent
+playing a fixed :class:`Policy`. Games with more players are played as a
+duel against the highest scoring opponent.
+
+Game scores are coarsened to a grid of ``grid`` points below the goal,
+and the values between grid points are interpolated. Turn scores and the
+dice stay exact, and so does the final round: once a player reaches the
+goal, the other player gets a last turn, rolling until they beat it.
+
+A turn that busts is followed by the opponent's turn, which may bust as
+well and come back to the same scores, so the values of the grid depend
+on themselves. They are found by value iteration: every sweep plays one
+optimal turn from every grid point against the values of the last sweep.
+The final round has no such loop, and is solved once bucket by bucket.
+
+Solved values can be saved to a file and loaded by every later oracle
+with the same parameters, opponent and scoring rules, and answered
+queries are memoized.
+"""
+
+import hashlib
+import os
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import product
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dice import Face
+from .cosmic_wimpout import ScoringLogic
+from .distribution import TurnAnalyzer
+from .policy import Policy, ThresholdPolicy
+from .scoring_table import ScoredRoll
+from .solver import (CLEARING_FACES, SCORE_STEP, _BUST, _DECISION, _FORCED, _INSTANT, _STATES, _roll_distribution,
+                     _state_index, _transition)
+
+
+__all__ = (
+    'WinOracle',
+    'OraclePolicy',
+)
+
+
+_VERSION = 1
+
+# the dice of a fresh turn
+_START = _state_index(4, True, None)
+
+
+def _scoring_id(scoring: ScoringLogic) -> str:
+    """Gets an identifier of the compiled table of some scoring rules, the same in every process"""
+    entries = sorted(f'{key!r}: {entry!r}' for key, entry in scoring.table.items())
+    return hashlib.blake2b('\n'.join(entries).encode(), digest_size=16).hexdigest()
+
+
+class _Transitions:
+    """Every roll of every dice state, flattened for vectorized sweeps.
+
+    Rolls of a state with the same options are merged into one group.
+    Few distinct options follow all of the rolls, so their values are
+    taken once, and the value of every state is a weighted sum of them: a
+    matrix product for the groups with one option, and another over the
+    best options of the groups offering a choice.
+    """
+
+    __slots__ = (
+        'kinds',
+        'points',
+        'next_states',
+        'single_weights',
+        'choice_options',
+        'choice_starts',
+        'choice_weights',
+    )
+
+    def __init__(self, scoring: ScoringLogic):
+        table = scoring.table
+        options_index = {}
+        singles, choices = [], []
+        for remaining_white, remaining_black, clearing_face in product(range(5), (False, True), CLEARING_FACES):
+            if remaining_white == 0 and not remaining_black:
+                continue
+            groups = {}
+            for probability, entry in _roll_distribution(table, remaining_white, remaining_black, clearing_face):
+                transitions = (_transition(remaining_white, remaining_black, outcome) for outcome in entry.outcomes)
+                options = tuple(sorted({(kind, points, state) for kind, points, _, state in transitions}))
+                groups[options] = groups.get(options, 0.0) + probability
+
+            state = _state_index(remaining_white, remaining_black, clearing_face)
+            for options, probability in groups.items():
+                indices = [options_index.setdefault(option, len(options_index)) for option in options]
+                (singles if len(indices) == 1 else choices).append((state, probability, indices))
+
+        kinds, points, next_states = np.array(list(options_index), dtype=np.int64).T
+        self.kinds: np.ndarray = kinds
+        # instant outcomes keep their sign, every other gain is in score buckets
+        self.points: np.ndarray = points // np.where(kinds == _INSTANT, 1, SCORE_STEP)
+        self.next_states: np.ndarray = next_states
+
+        self.single_weights: np.ndarray = np.zeros((_STATES, len(kinds)))
+        for state, probability, (index,) in singles:
+            self.single_weights[state, index] += probability
+        self.choice_options: np.ndarray = np.array([index for _, _, indices in choices for index in indices])
+        self.choice_starts: np.ndarray = np.cumsum([0] + [len(indices) for _, _, indices in choices[:-1]])
+        self.choice_weights: np.ndarray = np.zeros((_STATES, len(choices)))
+        for group, (state, probability, _) in enumerate(choices):
+            self.choice_weights[state, group] = probability
+
+    def evaluate(self, option_values: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray],
+                 out: np.ndarray) -> None:
+        """Takes the best option of every roll and the expected value of every state
+        :param option_values: gets the value of options from their kinds, points and next states
+        :param out: values of every state, filled in place
+        """
+        values = option_values(self.kinds, self.points, self.next_states).reshape(len(self.kinds), -1)
+        best = np.maximum.reduceat(values[self.choice_options], self.choice_starts)
+        out[...] = (self.single_weights @ values + self.choice_weights @ best).reshape(out.shape)
+
+
+def _interpolation(knots: Sequence[int], values: np.ndarray) -> np.ndarray:
+    """Gets the weights interpolating between knots linearly
+    :param knots: sorted scores holding values
+    :param values: scores to interpolate at, clamped to the knots
+    :return: the weight of every knot for every value
+    """
+    weights = np.zeros((len(values), len(knots)))
+    for row, value in enumerate(np.clip(values, knots[0], knots[-1])):
+        right = min(bisect_right(knots, value), len(knots) - 1)
+        left = right - 1
+        fraction = (value - knots[left]) / (knots[right] - knots[left])
+        weights[row, left] += 1 - fraction
+        weights[row, right] += fraction
+    return weights
+
+
+class WinOracle:
+    """Gives the probability of winning from any decision of a game.
+
+    Every value is the probability of winning from there on, when
+    the player makes each later decision to win, and the opponent
+    plays ``opponent`` until their final turn, where they roll until
+    they beat the player. Rolling five tens is a loss.
+
+    Attributes
+    -----------
+    goal: :class:`int`
+        The number of points needed to win.
+    opponent: :class:`Policy`
+        The policy playing the opponent's turns.
+    grid: :class:`int`
+        The points between two game scores holding values.
+    margin: :class:`int`
+        The points past the goal at which a turn is always banked.
+    knots: Tuple[:class:`int`, ...]
+        The game scores holding values.
+    sweeps: :class:`int`
+        The number of sweeps the values took to converge, or
+        ``0`` if they were loaded from a file.
+    """
+
+    __slots__ = (
+        'goal',
+        'opponent',
+        'grid',
+        'margin',
+        'knots',
+        'sweeps',
+        '_turn_buckets',
+        '_cache_size',
+        '_reach',
+        '_banking',
+        '_rolling',
+        '_rolling_values',
+        '_banking_values',
+    )
+
+    def __init__(self, goal: int = 500, opponent: Optional[Policy] = None, grid: int = 50, margin: int = 150,
+                 scoring: Optional[ScoringLogic] = None, path: Optional[str] = None, tolerance: float = 1e-6,
+                 cache_size: int = 1 << 16):
+        """
+        :param goal: points needed to win  [default 500]
+        :param opponent: policy of the opponent  [default :class:`ThresholdPolicy`]
+        :param grid: points between two game scores holding values  [default 50]
+        :param margin: points past the goal at which a turn is always banked  [default 150]
+        :param scoring: rules used to score each roll  [default the standard rules]
+        :param path: file the solved values are loaded from, or saved to
+                     if it does not hold them yet  [default None]
+        :param tolerance: largest change of a value in the last sweep  [default 1e-6]
+        :param cache_size: most answered queries remembered  [default 65536]
+        """
+        if goal % SCORE_STEP or grid % SCORE_STEP or margin % SCORE_STEP:
+            raise ValueError(f'The goal, grid and margin must be multiples of {SCORE_STEP}')
+        self.goal: int = goal
+        self.opponent: Policy = opponent or ThresholdPolicy()
+        self.grid: int = grid
+        self.margin: int = margin
+        self.knots: Tuple[int, ...] = tuple(sorted(set(range(0, goal, grid)) | {goal - SCORE_STEP}))
+        self.sweeps: int = 0
+        self._turn_buckets: int = (goal + margin) // SCORE_STEP + 1
+        self._cache_size: int = cache_size
+
+        scoring = scoring or ScoringLogic()
+        if path is None or not self._load(path, scoring):
+            self._solve(scoring, tolerance)
+            if path is not None:
+                self._save(path, scoring)
+
+        self._memoize()
+
+    def _memoize(self) -> None:
+        self._banking: Callable[[int, int, int, bool], float] = lru_cache(maxsize=self._cache_size)(self._bank)
+        self._rolling: Callable[..., float] = lru_cache(maxsize=self._cache_size)(self._roll)
+
+    def _solve(self, scoring: ScoringLogic, tolerance: float) -> None:
+        transitions = _Transitions(scoring)
+        goal = self.goal
+        knots = np.array(self.knots)
+        turn_buckets = self._turn_buckets
+
+        # the chance of gaining at least some points in one turn, rolling until they are gained
+        reach_buckets = 2 * turn_buckets
+        reach = np.zeros((reach_buckets, _STATES))
+
+        def reach_values(needed: int) -> Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]:
+            def option_values(kinds: np.ndarray, points: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+                left = np.clip(needed - points, 0, needed)
+                values = reach[left, next_states]
+                # a decision with enough points banks them
+                values[(kinds == _DECISION) & (left == 0)] = 1.0
+                values[kinds == _BUST] = 0.0
+                instant = kinds == _INSTANT
+                values[instant] = points[instant] > 0
+                return values
+            return option_values
+
+        # forced rolls with enough points come back to the first bucket
+        for _ in range(200):
+            previous = reach[0].copy()
+            transitions.evaluate(reach_values(0), reach[0])
+            if np.abs(reach[0] - previous).max() < 1e-12:
+                break
+        for needed in range(1, reach_buckets):
+            transitions.evaluate(reach_values(needed), reach[needed])
+        self._reach = reach
+        start_reach = reach[:, _START]
+
+        def final_turn(needed: np.ndarray) -> np.ndarray:
+            """The chance of a final turn gaining more than some points"""
+            return start_reach[np.clip(needed // SCORE_STEP + 1, 0, reach_buckets - 1)]
+
+        # the final score distribution of the opponent's turns
+        distribution = TurnAnalyzer(self.opponent, goal + self.margin, scoring).distribution()
+        gains = np.array(list(distribution.scores), dtype=np.int64)
+        chances = np.array(list(distribution.scores.values()))
+
+        # the opponent plays from every grid score, against every exact score of the player
+        scores = np.arange(0, goal, SCORE_STEP)
+        reached = knots[:, None] + gains >= goal
+        playing = np.where(reached, 0.0, chances)
+        # transition from each grid score of the opponent to the grid scores after their turn
+        opponent_moves = np.stack([playing[row] @ _interpolation(self.knots, knots[row] + gains)
+                                   for row in range(len(knots))])
+        # reaching the goal gives the player their final turn
+        final_chances = np.where(reached, chances, 0.0)
+        final = np.stack([final_turn(knots[row] + gains - scores[:, None]) @ final_chances[row]
+                          for row in range(len(knots))], axis=1)
+        final += distribution.instant_loss
+        score_weights = _interpolation(self.knots, scores)
+
+        # the player banks at every turn score from every grid score pair
+        positions = knots[:, None, None] + SCORE_STEP * np.arange(turn_buckets)[None, :, None]
+        positions = np.broadcast_to(positions, (len(knots), turn_buckets, len(knots)))
+        banked_goal = positions >= goal
+        position_buckets = np.minimum(positions, goal - SCORE_STEP) // SCORE_STEP
+        opponent_rows = np.broadcast_to(np.arange(len(knots))[None, None, :], positions.shape)
+        banked_goal_values = 1.0 - final_turn(positions - knots[None, None, :])
+
+        starts = np.full((len(knots), len(knots)), 0.5)
+        rolling = np.zeros((turn_buckets, _STATES, len(knots), len(knots)))
+        for sweep in range(1, 10_000):
+            # the chance of winning with the opponent to play, from every exact score of the player
+            banking = score_weights @ starts @ opponent_moves.T + final
+            bank = np.where(banked_goal, banked_goal_values, banking[position_buckets, opponent_rows])
+            bank = bank.transpose(1, 0, 2)
+            bust = bank[0]
+
+            rolling[-1] = bank[-1]
+            for bucket in range(turn_buckets - 2, -1, -1):
+                def option_values(kinds: np.ndarray, points: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+                    after = np.clip(bucket + points, 0, turn_buckets - 1)
+                    values = rolling[after, next_states]
+                    decision = kinds == _DECISION
+                    values[decision] = np.maximum(values[decision], bank[after[decision]])
+                    values[kinds == _BUST] = bust
+                    instant = kinds == _INSTANT
+                    values[instant] = (points[instant] > 0)[:, None, None]
+                    return values
+                transitions.evaluate(option_values, rolling[bucket])
+
+            change = float(np.abs(rolling[0, _START] - starts).max())
+            starts = rolling[0, _START].copy()
+            if change < tolerance:
+                break
+
+        self.sweeps = sweep
+        self._rolling_values = rolling.astype(np.float32)
+        self._banking_values = (score_weights @ starts @ opponent_moves.T + final).astype(np.float32)
+
+    def _parameters(self) -> np.ndarray:
+        return np.array([_VERSION, self.goal, self.grid, self.margin])
+
+    def _load(self, path: str, scoring: ScoringLogic) -> bool:
+        """Loads values solved for the same goal, grid, margin, opponent and scoring rules
+        :return: if the values were loaded
+        """
+        try:
+            with np.load(path) as values:
+                if not np.array_equal(values['parameters'], self._parameters()) \
+                        or str(values['opponent']) != repr(self.opponent) \
+                        or str(values['scoring']) != _scoring_id(scoring):
+                    return False
+                self._reach = values['reach']
+                self._rolling_values = values['rolling']
+                self._banking_values = values['banking']
+        # a missing or unreadable file is simply solved again
+        except (OSError, KeyError, ValueError):
+            return False
+        return True
+
+    def _save(self, path: str, scoring: ScoringLogic) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as file:
+            np.savez(file, parameters=self._parameters(), opponent=repr(self.opponent),
+                     scoring=_scoring_id(scoring), reach=self._reach, rolling=self._rolling_values,
+                     banking=self._banking_values)
+
+    def __getstate__(self) -> dict:
+        # the memoized queries are rebuilt empty
+        return {name: getattr(self, name) for name in self.__slots__ if name not in ('_banking', '_rolling')}
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._memoize()
+
+    def _weights(self, score: int) -> Tuple[int, int, float]:
+        """Gets the knots around a score and the weight of the right one"""
+        knots = self.knots
+        score = min(max(score, 0), knots[-1])
+        right = min(bisect_right(knots, score), len(knots) - 1)
+        return right - 1, right, (score - knots[right - 1]) / (knots[right] - knots[right - 1])
+
+    def _final_turn(self, needed: int, remaining_white: int = 4, remaining_black: bool = True,
+                    clearing_face: Optional[Face] = None) -> float:
+        """Gets the chance of gaining more than some points rolling the remaining dice"""
+        bucket = min(max(needed // SCORE_STEP + 1, 0), len(self._reach) - 1)
+        return float(self._reach[bucket, _state_index(remaining_white, remaining_black, clearing_face)])
+
+    def _bank(self, score: int, opponent_score: int, turn_score: int, final_round: bool) -> float:
+        total = score + turn_score
+        if final_round:
+            return float(total > opponent_score)
+        if total >= self.goal:
+            return 1.0 - self._final_turn(total - opponent_score)
+        left, right, fraction = self._weights(opponent_score)
+        values = self._banking_values[total // SCORE_STEP]
+        return float((1 - fraction) * values[left] + fraction * values[right])
+
+    def _roll(self, score: int, opponent_score: int, turn_score: int, remaining_white: int, remaining_black: bool,
+              clearing_face: Optional[Face], final_round: bool) -> float:
+        if final_round:
+            return self._final_turn(opponent_score - score - turn_score, remaining_white, remaining_black,
+                                    clearing_face)
+        values = self._rolling_values[min(turn_score // SCORE_STEP, self._turn_buckets - 1),
+                                      _state_index(remaining_white, remaining_black, clearing_face)]
+        left, right, fraction = self._weights(score)
+        bottom, top, opponent_fraction = self._weights(opponent_score)
+        return float((1 - fraction) * ((1 - opponent_fraction) * values[left, bottom]
+                                       + opponent_fraction * values[left, top])
+                     + fraction * ((1 - opponent_fraction) * values[right, bottom]
+                                   + opponent_fraction * values[right, top]))
+
+    def banking(self, score: int, opponent_score: int, turn_score: int, final_round: bool = False) -> float:
+        """Gets the chance of winning by banking the turn score
+        :param score: game score of the player
+        :param opponent_score: game score of the opponent
+        :param turn_score: points scored this turn
+        :param final_round: if the opponent reached the goal  [default False]
+        :return: the probability of winning
+        """
+        return self._banking(score, opponent_score, turn_score, final_round)
+
+    def rolling(self, score: int, opponent_score: int, turn_score: int = 0, remaining_white: int = 4,
+                remaining_black: bool = True, clearing_face: Optional[Face] = None,
+                final_round: bool = False) -> float:
+        """Gets the chance of winning by rolling the remaining dice
+        :param score: game score of the player
+        :param opponent_score: game score of the opponent
+        :param turn_score: points scored this turn  [default 0]
+        :param remaining_white: number of white dice to roll  [default 4]
+        :param remaining_black: if the black die is rolled  [default True]
+        :param clearing_face: face that must be cleared  [default None]
+        :param final_round: if the opponent reached the goal  [default False]
+        :return: the probability of winning
+        """
+        return self._rolling(score, opponent_score, turn_score, remaining_white, remaining_black, clearing_face,
+                             final_round)
+
+    def win_probability(self, score: int, opponent_score: int, turn_score: int = 0, remaining_white: int = 4,
+                        remaining_black: bool = True, clearing_face: Optional[Face] = None,
+                        final_round: bool = False) -> float:
+        """Gets the chance of winning from a decision, taking the better of banking and rolling
+
+        A turn that has not scored yet, or must clear a face, is rolled.
+        """
+        rolling = self.rolling(score, opponent_score, turn_score, remaining_white, remaining_black, clearing_face,
+                               final_round)
+        if turn_score == 0 or clearing_face is not None:
+            return rolling
+        return max(rolling, self.banking(score, opponent_score, turn_score, final_round))
+
+    def outcome_probability(self, score: int, opponent_score: int, turn_score: int, remaining_white: int,
+                            remaining_black: bool, outcome: ScoredRoll, final_round: bool = False) -> float:
+        """Gets the chance of winning after a roll is scored
+        :param turn_score: turn score before the roll was scored
+        :param remaining_white: number of white dice that were rolled
+        :param remaining_black: if the black die was rolled
+        :param outcome: outcome of the roll
+        """
+        kind, points, white, state = _transition(remaining_white, remaining_black, outcome)
+        if kind == _INSTANT:
+            return float(points > 0)
+        if kind == _BUST:
+            return self.banking(score, opponent_score, 0, final_round)
+        turn_score += points
+        black = state % (2 * len(CLEARING_FACES)) >= len(CLEARING_FACES)
+        clearing_face = CLEARING_FACES[state % len(CLEARING_FACES)]
+        rolling = self.rolling(score, opponent_score, turn_score, white, black, clearing_face, final_round)
+        if kind == _FORCED:
+            return rolling
+        return max(rolling, self.banking(score, opponent_score, turn_score, final_round))
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} goal={self.goal} opponent={self.opponent!r} grid={self.grid} '
+                f'sweeps={self.sweeps}>')
+
+
+class OraclePolicy(Policy):
+    """A policy taking every decision with the best chance of winning the game.
+
+    The policy reads the game from the turn, as set by
+    :meth:`CosmicWimpout.play`, and plays turns outside of a game
+    as the first turn of one.
+
+    Attributes
+    -----------
+    oracle: :class:`WinOracle`
+        The oracle giving the chance of winning.
+    """
+
+    __slots__ = ('oracle',)
+
+    def __init__(self, oracle: Optional[WinOracle] = None):
+        self.oracle: WinOracle = oracle or WinOracle()
+
+    def _outcome_probabilities(self, turn) -> List[float]:
+        entry = turn.scoring.lookup(turn)
+        outcome_probability = self.oracle.outcome_probability
+        return [outcome_probability(turn.game_score, turn.opponent_score, turn.score, turn.remaining_white,
+                                    turn.remaining_black, outcome, turn.final_round)
+                for outcome in entry.outcomes]
+
+    def keep_playing_choice(self, turn) -> int:
+        oracle = self.oracle
+        rolling = oracle.rolling(turn.game_score, turn.opponent_score, turn.score, turn.remaining_white,
+                                 turn.remaining_black, None, turn.final_round)
+        banking = oracle.banking(turn.game_score, turn.opponent_score, turn.score, turn.final_round)
+        return 1 if rolling > banking else 2
+
+    def sun_die_use_choice(self, turn) -> int:
+        five, ten, kept = self._outcome_probabilities(turn)
+        return 1 if max(five, ten) >= kept else 2
+
+    def sun_die_point_choice(self, turn) -> int:
+        values = self._outcome_probabilities(turn)
+        return 2 if values[1] >= values[0] else 1
+
+    def sun_trio_choice(self, turn, faces: List[Face]) -> int:
+        first, second = self._outcome_probabilities(turn)
+        return 2 if second > first else 1
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} oracle={self.oracle!r}>'
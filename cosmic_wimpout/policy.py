@@ -0,0 +1,77 @@
+from typing import List
+
+from .dice import Face
+
+
+__all__ = (
+    'Policy',
+    'ThresholdPolicy',
+)
+
+
+class Policy:
+    """Represents an automated player answering the turn prompts.
+
+    Each method mirrors one of the ``_get_*_choice`` prompts of
+    :class:`TurnLogic` and returns the same 1-based choice the
+    interactive player would have typed. The turn in progress is
+    passed in so its score and remaining dice can be inspected.
+
+    The base policy ends its turn as soon as it is asked, always
+    spends the sun die for ten points and completes the trio worth
+    the most points.
+    """
+
+    __slots__ = ()
+
+    def keep_playing_choice(self, turn) -> int:
+        """[1] Keep playing, [2] End turn"""
+        return 2
+
+    def sun_die_use_choice(self, turn) -> int:
+        """[1] Use it for points, [2] Keep the die for later"""
+        return 1
+
+    def sun_die_point_choice(self, turn) -> int:
+        """[1] Use it for five points, [2] Use it for ten points"""
+        return 2
+
+    def sun_trio_choice(self, turn, faces: List[Face]) -> int:
+        """[n] Face to make a trio with using the sun die"""
+        best = max(faces, key=turn.get_three_of_a_kind_points)
+        return faces.index(best) + 1
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}>'
+
+
+class ThresholdPolicy(Policy):
+    """A policy that keeps rolling until the turn is worth enough.
+
+    Attributes
+    -----------
+    target: :class:`int`
+        The turn score at which the policy ends its turn.
+    min_dice: :class:`int`
+        The fewest dice the policy is willing to roll.
+    """
+
+    __slots__ = (
+        'target',
+        'min_dice',
+    )
+
+    def __init__(self, target: int = 35, min_dice: int = 1):
+        self.target: int = target
+        self.min_dice: int = min_dice
+
+    def keep_playing_choice(self, turn) -> int:
+        dice_left = turn.remaining_white
+        if turn.remaining_black:
+            dice_left += 1
+        if turn.score < self.target and dice_left >= self.min_dice:
+            return 1
+        return 2
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} target={self.target} min_dice={self.min_dice}>'
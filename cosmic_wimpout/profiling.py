@@ -0,0 +1,297 @@
+"""
+Hot path profiling
+
+Times every step of the turns played by a turn logic: the turn, each roll
+of the dice, each scoring rule or table lookup and each decision. Every
+step counts its calls and the nanoseconds spent in it, and scoring rules
+and decisions count their hits, so the steps that cost the most and the
+rules that fire the most can be found when tuning a ruleset.
+
+Profiling is opt-in per turn logic. Attaching a profiler switches the
+turn logic to a subclass wrapping each step with a timer, and detaching
+switches it back, so turn logic that is not profiled runs the unchanged
+code and pays nothing.
+
+The timings can be written as folded stacks, one ``step;step;step
+nanoseconds`` line per call path, the format read by ``flamegraph.pl``,
+inferno and speedscope and written by sampling profilers such as
+``py-spy record --format raw``.
+"""
+
+from collections import Counter
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List, Tuple
+
+from .cosmic_wimpout import ScoreRule, ScoringLogic, TurnLogic
+from .throwables import CosmicWimpoutException
+
+
+__all__ = (
+    'ProfileStep',
+    'TurnProfiler',
+)
+
+
+# decisions, by the name of the turn logic method asking them
+_DECISIONS = {
+    '_get_keep_playing_choice': 'keep_playing_choice',
+    '_get_sun_trio_choice': 'sun_trio_choice',
+    '_get_sun_die_use_choice': 'sun_die_use_choice',
+    '_get_sun_die_point_choice': 'sun_die_point_choice',
+}
+
+
+class ProfileStep:
+    """The calls and time of one step of a turn.
+
+    Attributes
+    -----------
+    name: :class:`str`
+        The name of the step.
+    calls: :class:`int`
+        The number of times the step ran.
+    nanoseconds: :class:`int`
+        The time spent in the step, including the steps it ran.
+    self_nanoseconds: :class:`int`
+        The time spent in the step itself.
+    hits: :class:`int`
+        For scoring rules, the number of calls that scored points.
+        For decisions, the number of calls answered with the first
+        choice: to keep rolling, to use the sun die, to take five
+        points or to take the first trio face. Other steps have none.
+    """
+
+    __slots__ = (
+        'name',
+        'calls',
+        'nanoseconds',
+        'self_nanoseconds',
+        'hits',
+    )
+
+    def __init__(self, name: str, calls: int = 0, nanoseconds: int = 0, self_nanoseconds: int = 0, hits: int = 0):
+        self.name: str = name
+        self.calls: int = calls
+        self.nanoseconds: int = nanoseconds
+        self.self_nanoseconds: int = self_nanoseconds
+        self.hits: int = hits
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.calls if self.calls else 0.0
+
+    @property
+    def nanoseconds_per_call(self) -> float:
+        return self.nanoseconds / self.calls if self.calls else 0.0
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} name={self.name!r} calls={self.calls} '
+                f'nanoseconds={self.nanoseconds} hits={self.hits}>')
+
+
+class TurnProfiler:
+    """Times every step of the turns played by the turn logic it is attached to.
+
+    A profiler keeps a single stack of the steps in progress, so each
+    thread attaches its own profiler, and profilers are merged at the end.
+    A profiled turn logic cannot be pickled until it is detached.
+
+    Attributes
+    -----------
+    rules: :class:`bool`
+        A boolean representing if every roll is scored by walking the
+        scoring rules one by one, timing each of them. Otherwise rolls
+        are scored by the table lookup played without listeners.
+    hits: Counter[:class:`str`]
+        The hits of each step, as described by :class:`ProfileStep`.
+    """
+
+    __slots__ = (
+        'rules',
+        'hits',
+        '_paths',
+        '_stack',
+        '_classes',
+        '_timed_rules',
+    )
+
+    def __init__(self, rules: bool = True):
+        """
+        :param rules: if rolls are scored by timing each scoring rule,
+                      instead of a single table lookup  [default True]
+        """
+        self.rules: bool = rules
+        self.hits: Counter = Counter()
+        # calls and nanoseconds of every path of steps
+        self._paths: Dict[Tuple[str, ...], List[int]] = {}
+        self._stack: List[str] = []
+        self._classes: Dict[type, type] = {}
+        self._timed_rules: Dict[Tuple[ScoreRule, ...], List[ScoreRule]] = {}
+
+    def _timed(self, name: str, function: Callable[..., Any], *args: Any) -> Any:
+        stack = self._stack
+        stack.append(name)
+        start = perf_counter_ns()
+        try:
+            return function(*args)
+        finally:
+            elapsed = perf_counter_ns() - start
+            path = tuple(stack)
+            stack.pop()
+            totals = self._paths.get(path)
+            if totals is None:
+                totals = self._paths[path] = [0, 0]
+            totals[0] += 1
+            totals[1] += elapsed
+
+    def _timed_rule(self, name: str, rule: ScoreRule) -> ScoreRule:
+        timed = self._timed
+        hits = self.hits
+
+        def run(state: TurnLogic) -> None:
+            score = state.score
+            try:
+                timed(name, rule, state)
+            # five of a kind ends the game at once, which is still a hit
+            except CosmicWimpoutException:
+                hits[name] += 1
+                raise
+            if state.score != score:
+                hits[name] += 1
+        return run
+
+    def _rules_of(self, scoring: ScoringLogic) -> List[ScoreRule]:
+        """Gets timed copies of the pipeline of a scoring logic"""
+        rules = tuple(scoring.__score_rules__)
+        timed_rules = self._timed_rules.get(rules)
+        if timed_rules is None:
+            timed_rules = self._timed_rules[rules] = [self._timed_rule(name, rule)
+                                                      for name, rule in zip(scoring.rules, rules)]
+        return timed_rules
+
+    def _profiled_class(self, cls: type) -> type:
+        """Gets the subclass of a turn logic class timing every step"""
+        profiled = self._classes.get(cls)
+        if profiled is not None:
+            return profiled
+
+        timed = self._timed
+        hits = self.hits
+        rules_of = self._rules_of
+
+        def resolve_turn(turn: TurnLogic) -> None:
+            timed('turn', cls.resolve_turn, turn)
+
+        def roll_dice(turn: TurnLogic) -> None:
+            timed('roll_dice', cls._roll_dice, turn)
+
+        def score_roll(turn: TurnLogic) -> None:
+            timed('score_roll', cls._score_roll, turn, rules_of(turn.scoring))
+
+        def lookup_roll(turn: TurnLogic) -> None:
+            timed('lookup_roll', cls._lookup_roll, turn)
+
+        def decision(method: str, name: str) -> Callable[..., int]:
+            ask = getattr(cls, method)
+
+            def choice(turn: TurnLogic, *args: Any) -> int:
+                answer = timed(name, ask, turn, *args)
+                if answer == 1:
+                    hits[name] += 1
+                return answer
+            return choice
+
+        namespace = {
+            '__slots__': (),
+            'resolve_turn': resolve_turn,
+            '_roll_dice': roll_dice,
+            '_score_roll': score_roll,
+            # rolls played without listeners walk the rules too
+            '_lookup_roll': score_roll if self.rules else lookup_roll,
+        }
+        for method, name in _DECISIONS.items():
+            namespace[method] = decision(method, name)
+
+        profiled = self._classes[cls] = type(cls.__name__, (cls,), namespace)
+        return profiled
+
+    def attach(self, turn_logic: TurnLogic) -> None:
+        """Starts timing the turns of a turn logic
+        :param turn_logic: turn logic to profile
+        """
+        if type(turn_logic) not in self._classes.values():
+            turn_logic.__class__ = self._profiled_class(type(turn_logic))
+
+    def detach(self, turn_logic: TurnLogic) -> None:
+        """Stops timing the turns of a turn logic, keeping the timings so far
+        :param turn_logic: turn logic to stop profiling
+        """
+        for cls, profiled in self._classes.items():
+            if type(turn_logic) is profiled:
+                turn_logic.__class__ = cls
+                return
+
+    def reset(self) -> None:
+        """Forgets every timing"""
+        self.hits.clear()
+        self._paths.clear()
+
+    def merge(self, other: 'TurnProfiler') -> None:
+        """Adds the timings of another profiler to this one"""
+        for path, (calls, nanoseconds) in other._paths.items():
+            totals = self._paths.setdefault(path, [0, 0])
+            totals[0] += calls
+            totals[1] += nanoseconds
+        self.hits.update(other.hits)
+
+    def _self_nanoseconds(self) -> Dict[Tuple[str, ...], int]:
+        """Gets the time of every path not spent in the steps below it"""
+        own = {path: nanoseconds for path, (_, nanoseconds) in self._paths.items()}
+        for path, (_, nanoseconds) in self._paths.items():
+            if path[:-1] in own:
+                own[path[:-1]] -= nanoseconds
+        return own
+
+    @property
+    def steps(self) -> Dict[str, ProfileStep]:
+        """The timings of every step, merged over the paths reaching it,
+        from the step costing the most time of its own"""
+        steps: Dict[str, ProfileStep] = {}
+        own = self._self_nanoseconds()
+        for path, (calls, nanoseconds) in self._paths.items():
+            name = path[-1]
+            step = steps.get(name)
+            if step is None:
+                step = steps[name] = ProfileStep(name, hits=self.hits[name])
+            step.calls += calls
+            step.nanoseconds += nanoseconds
+            step.self_nanoseconds += own[path]
+        return dict(sorted(steps.items(), key=lambda item: -item[1].self_nanoseconds))
+
+    def folded(self) -> str:
+        """Gets the time of every path as folded stacks, read by flame graph tools
+        :return: one ``step;step;step nanoseconds`` line per path
+        """
+        return ''.join(f'{";".join(path)} {max(nanoseconds, 0)}\n'
+                       for path, nanoseconds in sorted(self._self_nanoseconds().items()))
+
+    def write_folded(self, path: str) -> None:
+        """Writes the folded stacks to a file
+        :param path: path of the file to write
+        """
+        with open(path, 'w') as file:
+            file.write(self.folded())
+
+    def report(self) -> str:
+        """Gets a table of every step, from the step costing the most time of its own"""
+        # scoring rules run below the scoring of the roll
+        counted = set(_DECISIONS.values()) | {path[-1] for path in self._paths if path[-2:-1] == ('score_roll',)}
+        lines = [f'{"step":<24}{"calls":>12}{"total ms":>12}{"self ms":>12}{"ns/call":>10}{"hit rate":>10}']
+        for step in self.steps.values():
+            hit_rate = f'{step.hit_rate:.1%}' if step.name in counted else ''
+            lines.append(f'{step.name:<24}{step.calls:>12,}{step.nanoseconds / 1e6:>12,.1f}'
+                         f'{step.self_nanoseconds / 1e6:>12,.1f}{step.nanoseconds_per_call:>10,.0f}{hit_rate:>10}')
+        return '\n'.join(lines)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} rules={self.rules} paths={len(self._paths)}>'
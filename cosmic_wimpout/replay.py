@@ -0,0 +1,365 @@
+"""
+Binary replay logs
+
+Turns are stored as a stream of fixed-size records, one per roll, so a
+log can be appended to while turns are played and read back as a NumPy
+structured array mapped straight from the file. Each record holds::
+
+    flags       u1  TURN_START, TURN_END, BUST, INSTANT_WIN, INSTANT_LOSS, GAME_START
+    seat        u1  seat of the player rolling
+    white_roll  u1  index of the white faces in WHITE_ROLLS
+    black_roll  u1  code of the black face, 0 if not rolled
+    clearing    u1  code of the clearing face the dice were rolled with
+    option      u1  outcome chosen for the roll
+    points      i2  points scored by the roll
+
+The keep playing decision is not stored: a player kept playing exactly
+when another roll of the same turn follows a record that is not the
+last of its turn. A file starts with an 8 byte header holding a magic
+number, the format version and the record size.
+"""
+
+import os
+import struct
+from typing import BinaryIO, List, Optional, Sequence
+
+import numpy as np
+
+from .cosmic_wimpout import CosmicWimpout, ScoringLogic, TurnLogic
+from .policy import Policy
+from .rng import DiceStream
+from .simulator import HeadlessTurnLogic
+from .throwables import CosmicWimpoutException, PlayerInstantlyWon, PlayerInstantlyLost
+
+
+__all__ = (
+    'TURN_START',
+    'TURN_END',
+    'BUST',
+    'INSTANT_WIN',
+    'INSTANT_LOSS',
+    'GAME_START',
+    'RECORD_DTYPE',
+    'ReplayWriter',
+    'RecordingTurnLogic',
+    'ReplayLog',
+    'ReplayTurnLogic',
+    'record_turns',
+    'record_games',
+)
+
+
+# record flags
+TURN_START = 1
+TURN_END = 2
+BUST = 4
+INSTANT_WIN = 8
+INSTANT_LOSS = 16
+GAME_START = 32
+
+RECORD_DTYPE = np.dtype([
+    ('flags', 'u1'),
+    ('seat', 'u1'),
+    ('white_roll', 'u1'),
+    ('black_roll', 'u1'),
+    ('clearing', 'u1'),
+    ('option', 'u1'),
+    ('points', '<i2'),
+])
+
+_MAGIC = b'CWRP'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHH')
+_RECORD = struct.Struct('<BBBBBBh')
+
+
+class ReplayWriter:
+    """Appends roll records to a replay log.
+
+    Records are packed into a buffer that is written out whenever it
+    fills, so writing costs no system call per roll.
+
+    Attributes
+    -----------
+    path: :class:`str`
+        The path of the log.
+    records: :class:`int`
+        The number of records written by this writer.
+    """
+
+    __slots__ = (
+        'path',
+        'records',
+        '_file',
+        '_buffer',
+        '_offset',
+    )
+
+    def __init__(self, path: str, buffer_records: int = 65536):
+        self.path: str = path
+        self.records: int = 0
+        self._file: BinaryIO = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION, _RECORD.size))
+        self._buffer: bytearray = bytearray(_RECORD.size * buffer_records)
+        self._offset: int = 0
+
+    def write(self, flags: int, seat: int, white_roll: int, black_roll: int, clearing: int, option: int,
+              points: int) -> None:
+        _RECORD.pack_into(self._buffer, self._offset, flags, seat, white_roll, black_roll, clearing, option, points)
+        self._offset += _RECORD.size
+        self.records += 1
+        if self._offset == len(self._buffer):
+            self.flush()
+
+    def flush(self) -> None:
+        self._file.write(memoryview(self._buffer)[:self._offset])
+        self._file.flush()
+        self._offset = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> 'ReplayWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} path={self.path!r} records={self.records}>'
+
+
+class RecordingTurnLogic(HeadlessTurnLogic):
+    """Headless turn logic writing every roll to a replay log.
+
+    A roll is only written once the turn either goes on or ends, so
+    its record can be flagged as the last of the turn.
+
+    Attributes
+    -----------
+    writer: :class:`ReplayWriter`
+        The log the rolls are written to.
+    seat: :class:`int`
+        The seat written with every roll.
+    new_game: :class:`bool`
+        A boolean representing if the next turn starts a game.
+    """
+
+    __slots__ = (
+        'writer',
+        'seat',
+        'new_game',
+        '_pending',
+        '_flags',
+        '_white_roll',
+        '_black_roll',
+        '_clearing',
+        '_option',
+        '_points',
+    )
+
+    def __init__(self, writer: ReplayWriter, seat: int = 0, policy: Optional[Policy] = None,
+                 rng: Optional[DiceStream] = None, scoring: Optional[ScoringLogic] = None):
+        super().__init__(policy, rng, scoring)
+        self.writer: ReplayWriter = writer
+        self.seat: int = seat
+        self.new_game: bool = False
+        self._pending: bool = False
+
+    def _write_roll(self, flags: int = 0) -> None:
+        self.writer.write(self._flags | flags, self.seat, self._white_roll, self._black_roll, self._clearing,
+                          self._option, self._points)
+        self._flags = 0
+
+    def resolve_turn(self) -> None:
+        self._flags = TURN_START | GAME_START if self.new_game else TURN_START
+        self.new_game = False
+        self._pending = False
+        try:
+            super().resolve_turn()
+        except PlayerInstantlyWon:
+            self._write_roll(TURN_END | INSTANT_WIN)
+            raise
+        except PlayerInstantlyLost:
+            self._write_roll(TURN_END | INSTANT_LOSS)
+            raise
+        self._write_roll(TURN_END if self.score else TURN_END | BUST)
+
+    def _lookup_roll(self) -> None:
+        # the previous roll was not the last of the turn
+        if self._pending:
+            self._write_roll()
+
+        entry = self.scoring.lookup(self)
+        option = self._choose_outcome(entry)
+        outcome = entry.outcomes[option]
+        self._white_roll = self.white_roll
+        self._black_roll = self.black_roll
+        self._clearing = self.clearing
+        self._option = option
+        self._points = outcome.points
+        self._pending = True
+        self.scoring.apply(self, outcome)
+
+
+class ReplayLog:
+    """A replay log mapped into memory as a NumPy structured array.
+
+    Attributes
+    -----------
+    path: :class:`str`
+        The path of the log.
+    records: :class:`np.ndarray`
+        The records of every roll, with the fields of ``RECORD_DTYPE``.
+    """
+
+    __slots__ = (
+        'path',
+        'records',
+    )
+
+    def __init__(self, path: str):
+        self.path: str = path
+        with open(path, 'rb') as file:
+            magic, version, record_size = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f'"{path}" is not a version {_VERSION} replay log')
+
+        records = (os.path.getsize(path) - _HEADER.size) // RECORD_DTYPE.itemsize
+        if records:
+            self.records: np.ndarray = np.memmap(path, RECORD_DTYPE, 'r', _HEADER.size, (records,))
+        else:
+            self.records = np.empty(0, RECORD_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def turn_starts(self) -> np.ndarray:
+        """The index of the first record of every turn"""
+        return np.flatnonzero(self.records['flags'] & TURN_START)
+
+    @property
+    def turn_flags(self) -> np.ndarray:
+        """The flags of the last record of every turn"""
+        return self.records['flags'][self.records['flags'] & TURN_END != 0]
+
+    def turn_scores(self) -> np.ndarray:
+        """Gets the final score of every turn, counting instant wins and losses as ``0``"""
+        starts = self.turn_starts
+        if not len(starts):
+            return np.zeros(0, np.int64)
+        scores = np.add.reduceat(self.records['points'].astype(np.int64), starts)
+        scores[self.turn_flags & (BUST | INSTANT_WIN | INSTANT_LOSS) != 0] = 0
+        return scores
+
+    def replay(self, scoring: Optional[ScoringLogic] = None) -> np.ndarray:
+        """Plays every turn of the log again through the engine
+        :param scoring: rules used to score each roll  [default the standard rules]
+        :return: the final score of every turn, counting instant wins and losses as ``0``
+        :raises ValueError: if the engine does not follow the log
+        """
+        turn_logic = ReplayTurnLogic(self.records, scoring)
+        scores = np.zeros(len(self.turn_starts), np.int64)
+        for turn in range(len(scores)):
+            turn_logic.reset()
+            try:
+                turn_logic.resolve_turn()
+            except CosmicWimpoutException:
+                continue
+            scores[turn] = turn_logic.score
+        return scores
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} path={self.path!r} records={len(self)}>'
+
+
+class ReplayTurnLogic(TurnLogic):
+    """Turn logic taking its dice and decisions from replay records.
+
+    Attributes
+    -----------
+    position: :class:`int`
+        The index of the next record to replay.
+    """
+
+    __slots__ = (
+        'position',
+        '_flags',
+        '_white_roll',
+        '_black_roll',
+        '_clearing',
+        '_option',
+    )
+
+    def __init__(self, records: np.ndarray, scoring: Optional[ScoringLogic] = None):
+        super().__init__(verbose=False, scoring=scoring)
+        self.position: int = 0
+        # plain lists are much faster to index than the array itself
+        self._flags: List[int] = records['flags'].tolist()
+        self._white_roll: List[int] = records['white_roll'].tolist()
+        self._black_roll: List[int] = records['black_roll'].tolist()
+        self._clearing: List[int] = records['clearing'].tolist()
+        self._option: List[int] = records['option'].tolist()
+
+    def _roll_dice(self) -> None:
+        position = self.position
+        if self._clearing[position] != self.clearing:
+            raise ValueError(f'Record {position} was rolled with another clearing face')
+        self.white_roll = self._white_roll[position]
+        self.black_roll = self._black_roll[position]
+
+    def _choose_outcome(self, entry) -> int:
+        return self._option[self.position]
+
+    def _lookup_roll(self) -> None:
+        try:
+            super()._lookup_roll()
+        finally:
+            self.position += 1
+
+    def _get_keep_playing_choice(self) -> int:
+        # the turn went on if the last roll was not its last record
+        return 2 if self._flags[self.position - 1] & TURN_END else 1
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} position={self.position}>'
+
+
+def record_turns(path: str, turns: int, policy: Optional[Policy] = None, seed: int = 0) -> None:
+    """Plays turns and appends every roll to a replay log
+    :param path: path of the log
+    :param turns: number of turns to play
+    :param policy: policy answering every decision  [default :class:`Policy`]
+    :param seed: seed of the dice  [default 0]
+    """
+    with ReplayWriter(path) as writer:
+        turn_logic = RecordingTurnLogic(writer, policy=policy, rng=DiceStream(seed))
+        for _ in range(turns):
+            turn_logic.reset()
+            try:
+                turn_logic.resolve_turn()
+            except CosmicWimpoutException:
+                pass
+
+
+def record_games(path: str, games: int, policies: Sequence[Policy], goal: int = 500, seed: int = 0) -> None:
+    """Plays games and appends every roll to a replay log
+    :param path: path of the log
+    :param games: number of games to play
+    :param policies: policy of each seat
+    :param goal: number of points needed to win  [default 500]
+    :param seed: seed of the dice  [default 0]
+    """
+    rng = DiceStream(seed)
+    scoring = ScoringLogic()
+    with ReplayWriter(path) as writer:
+        turn_logic = [RecordingTurnLogic(writer, seat, policy, rng, scoring) for seat, policy in enumerate(policies)]
+        game = CosmicWimpout(len(policies), goal, turn_logic)
+        for _ in range(games):
+            game.reset()
+            turn_logic[0].new_game = True
+            game.play()
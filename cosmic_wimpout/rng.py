@@ -0,0 +1,207 @@
+"""
+Counter-based dice streams
+
+A :class:`DiceStream` draws its numbers from SHAKE-256 of a key and a
+block counter, so the numbers only depend on the seed and the stream
+path: they are the same on every platform and Python version, any block
+can be recomputed on its own, and a stream can be split into independent
+streams per game or per turn without sharing any state.
+
+Every die of the game has either five or six faces left to roll, and
+both divide 60, so each byte below 240 of the output is kept as a draw
+between 0 and 59 and a face is picked by the draw modulo the number of
+faces, exactly uniformly. Picks among more choices than that use a
+second sequence of blocks read as 16-bit numbers.
+"""
+
+import hashlib
+import os
+import sys
+from array import array
+from typing import TYPE_CHECKING, Optional, Sequence, TypeVar
+
+# numpy is only needed to fill arrays, so the scalar engines never import it
+if TYPE_CHECKING:
+    import numpy as np
+
+
+__all__ = (
+    'DRAW_RANGE',
+    'derive_seed',
+    'DiceStream',
+)
+
+
+T = TypeVar('T')
+
+# every draw is uniform in range(DRAW_RANGE)
+DRAW_RANGE = 60
+
+# bytes of output hashed per block
+_BLOCK_SIZE = 4096
+
+# bytes at or above 240 are rejected, the others are reduced modulo 60
+_REJECTED = bytes(range(DRAW_RANGE * (256 // DRAW_RANGE), 256))
+_REDUCE = bytes(byte % DRAW_RANGE for byte in range(256))
+
+# wide blocks are read as little-endian 16-bit numbers
+_WIDE_RANGE = 1 << 16
+_WIDE_DOMAIN = b'wide'
+
+
+def derive_seed(seed: int, *path: int) -> int:
+    """Derives an independent 64-bit seed from a seed and a stream path
+    :param seed: root seed of the run
+    :param path: indices identifying the stream, e.g. the shard number
+    :return: the derived seed
+    """
+    data = ':'.join(map(str, (seed,) + path)).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+class DiceStream:
+    """A reproducible, splittable stream of dice draws.
+
+    Draws are produced a block at a time, so drawing a single face
+    only indexes into the current block. The stream can be used
+    wherever a :class:`random.Random` rolls dice.
+
+    Attributes
+    -----------
+    root: :class:`int`
+        The seed the stream was derived from.
+    path: Tuple[:class:`int`, ...]
+        The indices identifying the stream, e.g. a game and a turn.
+    block: :class:`int`
+        The counter of the next block of output.
+    """
+
+    __slots__ = (
+        'root',
+        'path',
+        'block',
+        '_key',
+        '_draws',
+        '_position',
+        '_wide_block',
+        '_wide',
+        '_wide_position',
+    )
+
+    def __init__(self, seed: Optional[int] = None, *path: int):
+        """
+        :param seed: root seed of the stream  [default a random seed]
+        :param path: indices identifying the stream
+        """
+        self.seed(seed, *path)
+
+    def seed(self, seed: Optional[int] = None, *path: int) -> None:
+        """Restarts the stream from a seed and stream path
+        :param seed: root seed of the stream  [default a random seed]
+        :param path: indices identifying the stream
+        """
+        self.root: int = int.from_bytes(os.urandom(8), 'little') if seed is None else seed
+        self.path = path
+        data = ':'.join(map(str, (self.root,) + path)).encode()
+        self._key: bytes = hashlib.blake2b(data, digest_size=16).digest()
+        self.block: int = 0
+        self._draws: bytes = b''
+        self._position: int = 0
+        self._wide_block: int = 0
+        self._wide: array = array('H')
+        self._wide_position: int = 0
+
+    def split(self, *path: int) -> 'DiceStream':
+        """Gets an independent stream below this one
+        :param path: indices identifying the new stream, e.g. a game number
+        :return: the new stream
+        """
+        return DiceStream(self.root, *self.path, *path)
+
+    def getstate(self) -> tuple:
+        """Gets the position of the stream, like :meth:`random.Random.getstate`"""
+        return (self.root, self.path, self._key, self.block, self._draws, self._position,
+                self._wide_block, self._wide, self._wide_position)
+
+    def setstate(self, state: tuple) -> None:
+        """Moves the stream back to a position from :meth:`getstate`"""
+        (self.root, self.path, self._key, self.block, self._draws, self._position,
+         self._wide_block, self._wide, self._wide_position) = state
+
+    def _next_block(self) -> bytes:
+        output = hashlib.shake_256(self._key + self.block.to_bytes(8, 'little')).digest(_BLOCK_SIZE)
+        self.block += 1
+        return output.translate(_REDUCE, _REJECTED)
+
+    def _next_wide_block(self) -> array:
+        output = hashlib.shake_256(_WIDE_DOMAIN + self._key + self._wide_block.to_bytes(8, 'little'))
+        self._wide_block += 1
+        wide = array('H', output.digest(_BLOCK_SIZE))
+        if sys.byteorder == 'big':
+            wide.byteswap()
+        return wide
+
+    def draw(self) -> int:
+        """Draws a number uniformly from ``range(DRAW_RANGE)``"""
+        position = self._position
+        if position == len(self._draws):
+            self._draws = self._next_block()
+            position = 0
+        self._position = position + 1
+        return self._draws[position]
+
+    def choice(self, seq: Sequence[T]) -> T:
+        """Picks a face uniformly, like :meth:`random.Random.choice`
+        :param seq: faces to pick from, whose number must divide ``DRAW_RANGE``
+        :return: the picked face
+        """
+        position = self._position
+        draws = self._draws
+        if position == len(draws):
+            draws = self._draws = self._next_block()
+            position = 0
+        self._position = position + 1
+        return seq[draws[position] % len(seq)]
+
+    def randrange(self, n: int) -> int:
+        """Picks a number uniformly, like :meth:`random.Random.randrange`
+        :param n: number of choices, at most ``2 ** 16``
+        :return: the picked number in ``range(n)``
+        :raises ValueError: if ``n`` is not between 1 and ``2 ** 16``
+        """
+        if not 0 < n <= _WIDE_RANGE:
+            raise ValueError(f'Cannot pick among {n} choices, only between 1 and {_WIDE_RANGE}')
+        # numbers above the largest multiple of n are rejected
+        limit = _WIDE_RANGE - _WIDE_RANGE % n
+        while True:
+            position = self._wide_position
+            wide = self._wide
+            if position == len(wide):
+                wide = self._wide = self._next_wide_block()
+                position = 0
+            self._wide_position = position + 1
+            value = wide[position]
+            if value < limit:
+                return value % n
+
+    def fill(self, out: 'np.ndarray') -> 'np.ndarray':
+        """Draws many numbers from ``range(DRAW_RANGE)`` into a buffer
+        :param out: contiguous ``uint8`` array to fill
+        :return: the filled array
+        """
+        if not out.flags.c_contiguous:
+            raise ValueError('Draws can only be filled into a contiguous array')
+        flat = out.reshape(-1)
+        filled = 0
+        while filled < len(flat):
+            if self._position == len(self._draws):
+                self._draws = self._next_block()
+                self._position = 0
+            count = min(len(flat) - filled, len(self._draws) - self._position)
+            flat[filled:filled + count] = memoryview(self._draws)[self._position:self._position + count]
+            self._position += count
+            filled += count
+        return out
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} root={self.root} path={self.path} block={self.block}>'
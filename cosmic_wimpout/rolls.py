@@ -0,0 +1,132 @@
+"""
+Compact integer encoding of dice rolls
+
+Faces are encoded as small integer codes, with ``0`` standing for no
+face at all. The white faces of a roll form a multiset of at most four
+dice, and each of the 210 possible multisets is identified by its index
+in :data:`WHITE_ROLLS`. Every code and index fits in CPython's cache of
+small integers, so a roll is stored and looked up without building
+objects, though drawing it from the dice still creates a few short-lived
+integers.
+"""
+
+from functools import lru_cache
+from itertools import combinations_with_replacement
+from math import factorial
+from typing import Dict, Optional, Tuple
+
+from .dice import BlackDie, WhiteDie, Face
+
+
+__all__ = (
+    'WHITE_DIE',
+    'BLACK_DIE',
+    'FACE_BY_CODE',
+    'FACE_CODES',
+    'WHITE_FACES',
+    'BLACK_FACES',
+    'WHITE_ROLLS',
+    'WHITE_ROLL_INDEX',
+    'EMPTY_WHITE_ROLL',
+    'ADD_WHITE_FACE',
+    'ROLL_FACES',
+    'roll_weights',
+    'roll_probabilities',
+    'roll_sampler',
+)
+
+
+# shared die objects for states that were not given their own
+WHITE_DIE = WhiteDie()
+BLACK_DIE = BlackDie()
+
+WHITE_FACES: Tuple[Face, ...] = tuple(WHITE_DIE.faces)
+BLACK_FACES: Tuple[Face, ...] = tuple(BLACK_DIE.faces)
+
+# the code of a face is its position in this tuple
+FACE_BY_CODE: Tuple[Optional[Face], ...] = (None,) + tuple(Face)
+FACE_CODES: Dict[Optional[Face], int] = {face: code for code, face in enumerate(FACE_BY_CODE)}
+
+# the number of times each of the WHITE_FACES was rolled, for every multiset
+WHITE_ROLLS: Tuple[Tuple[int, ...], ...] = tuple(sorted(
+    (tuple(positions.count(position) for position in range(len(WHITE_FACES)))
+     for dice in range(5) for positions in combinations_with_replacement(range(len(WHITE_FACES)), dice)),
+    key=lambda counts: (sum(counts), counts)))
+WHITE_ROLL_INDEX: Dict[Tuple[int, ...], int] = {counts: index for index, counts in enumerate(WHITE_ROLLS)}
+EMPTY_WHITE_ROLL: int = WHITE_ROLL_INDEX[(0,) * len(WHITE_FACES)]
+
+
+def _add_white_face(counts: Tuple[int, ...], position: int) -> int:
+    if sum(counts) == 4:
+        return -1
+    counts = counts[:position] + (counts[position] + 1,) + counts[position + 1:]
+    return WHITE_ROLL_INDEX[counts]
+
+
+# the white roll reached by adding one die, indexed by roll and face position
+ADD_WHITE_FACE: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(_add_white_face(counts, position) for position in range(len(WHITE_FACES)))
+    for counts in WHITE_ROLLS)
+
+# the white face positions and black face codes left on the dice,
+# indexed by the code of the clearing face
+ROLL_FACES: Tuple[Tuple[Tuple[int, ...], Tuple[int, ...]], ...] = tuple(
+    (tuple(position for position, face in enumerate(WHITE_FACES) if face is not clearing_face),
+     tuple(FACE_CODES[face] for face in BLACK_FACES if face is not clearing_face))
+    for clearing_face in FACE_BY_CODE)
+
+
+@lru_cache(maxsize=None)
+def roll_weights(remaining_white: int, remaining_black: bool,
+                 clearing: int = 0) -> Tuple[int, Tuple[Tuple[int, int, int], ...]]:
+    """Counts the ways of rolling every roll of the remaining dice
+    :param remaining_white: number of white dice rolled
+    :param remaining_black: if the black die is rolled
+    :param clearing: code of the clearing face, which is not rolled  [default 0]
+    :return: the number of equally likely ways to roll the dice, and
+             (ways, white roll index, black face code) of every roll
+    """
+    white_die_faces, black_die_faces = ROLL_FACES[clearing]
+    black_die_faces = black_die_faces if remaining_black else (0,)
+    excluded = [position for position in range(len(WHITE_FACES)) if position not in white_die_faces]
+
+    rolls = []
+    for white_roll, counts in enumerate(WHITE_ROLLS):
+        if sum(counts) != remaining_white or any(counts[position] for position in excluded):
+            continue
+        # multinomial count of the orders the white faces can be rolled in
+        ways = factorial(remaining_white)
+        for count in counts:
+            ways //= factorial(count)
+        for black_roll in black_die_faces:
+            rolls.append((ways, white_roll, black_roll))
+    return len(white_die_faces) ** remaining_white * len(black_die_faces), tuple(rolls)
+
+
+@lru_cache(maxsize=None)
+def roll_probabilities(remaining_white: int, remaining_black: bool,
+                       clearing: int = 0) -> Tuple[Tuple[float, int, int], ...]:
+    """Enumerates every roll of the remaining dice with its probability
+    :param remaining_white: number of white dice rolled
+    :param remaining_black: if the black die is rolled
+    :param clearing: code of the clearing face, which is not rolled  [default 0]
+    :return: (probability, white roll index, black face code) of every roll
+    """
+    total, rolls = roll_weights(remaining_white, remaining_black, clearing)
+    return tuple((ways / total, white_roll, black_roll) for ways, white_roll, black_roll in rolls)
+
+
+@lru_cache(maxsize=None)
+def roll_sampler(remaining_white: int, remaining_black: bool, clearing: int = 0) -> Tuple[int, ...]:
+    """Lists every equally likely way of rolling the remaining dice, so a
+    single uniform pick from the list rolls all of them at once
+    :param remaining_white: number of white dice rolled
+    :param remaining_black: if the black die is rolled
+    :param clearing: code of the clearing face, which is not rolled  [default 0]
+    :return: the rolls, each encoded as ``white_roll << 3 | black_roll``
+    """
+    _, rolls = roll_weights(remaining_white, remaining_black, clearing)
+    sampler = []
+    for ways, white_roll, black_roll in rolls:
+        sampler.extend([white_roll << 3 | black_roll] * ways)
+    return tuple(sampler)
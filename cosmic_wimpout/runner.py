@@ -0,0 +1,150 @@
+"""
+Parallel Monte Carlo runner
+
+Splits a simulation into fixed-size shards and plays them across a
+process pool, or a thread pool. Every shard draws its dice from its own
+:class:`DiceStream`, split from the run seed by the shard number only,
+so a run gives the same results with any number of workers. Workers
+send back aggregated :class:`SimulationResult` objects, never per-turn
+data, optionally with the constant memory :class:`TurnStatistics` of
+their turns. Every turn can also be exported, each shard writing its
+own directory of columns.
+
+Threads skip the pickling and start up of worker processes, and every
+shard plays its own engine, so they share nothing but the read-only
+scoring table. On a free-threaded build of CPython the shards run in
+parallel; with the GIL they take turns, which suits short runs and
+policies releasing the GIL, like the NumPy engines.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, Union
+
+from .cosmic_wimpout import ScoringLogic
+from .policy import Policy
+from .rng import DiceStream, derive_seed
+from .simulator import SimulationResult, TurnSimulator
+from .stats import TurnStatistics
+
+# the batch engine needs NumPy, so it is only imported when it is used
+if TYPE_CHECKING:
+    from .batch import BatchPolicy
+
+
+__all__ = (
+    'derive_seed',
+    'MonteCarloRunner',
+)
+
+
+def _run_shard(policy, seed: int, turns: int, statistics: bool = False, count_rules: bool = False,
+               scoring: Optional[ScoringLogic] = None, export: Optional[str] = None) -> SimulationResult:
+    """Plays a single shard, using the batch engine for batch policies"""
+    shard_statistics = TurnStatistics() if statistics else None
+    if isinstance(policy, Policy):
+        simulator = TurnSimulator(policy, DiceStream(seed), scoring)
+        if export is None:
+            return simulator.simulate(turns, shard_statistics, count_rules)
+
+        from .export import TurnRecorder, policy_id
+        with TurnRecorder(export, seed, policy_id(policy), metadata={'policy': repr(policy)}) as recorder:
+            return simulator.simulate(turns, shard_statistics, count_rules, recorder)
+
+    from .batch import BatchTurnLogic
+    return BatchTurnLogic(min(turns, 100_000), policy, DiceStream(seed)).simulate(turns, shard_statistics)
+
+
+class MonteCarloRunner:
+    """Plays simulations across a pool of worker processes.
+
+    Attributes
+    -----------
+    policy: Union[:class:`Policy`, :class:`BatchPolicy`]
+        The policy answering every decision. Batch policies are
+        played with the vectorized batch engine.
+    workers: Optional[:class:`int`]
+        The number of worker processes or threads, or ``None`` to use
+        one per CPU. A single worker plays in the calling thread.
+    shard_size: :class:`int`
+        The number of turns played by each shard.
+    statistics: :class:`bool`
+        A boolean representing if every shard gathers :class:`TurnStatistics`.
+    count_rules: :class:`bool`
+        A boolean representing if the statistics also count every scoring
+        rule and clearing face. This walks the rules one by one, and is
+        only supported by the scalar engine.
+    threads: :class:`bool`
+        A boolean representing if the shards are played by a thread
+        pool sharing one compiled scoring table, instead of a process
+        pool. The policy is shared by every thread, so it must not keep
+        state between decisions.
+    export: Optional[:class:`str`]
+        The directory every turn is exported to, where each shard writes
+        a directory of columns with a :class:`TurnRecorder`, or ``None``
+        to export nothing. Exporting walks the rules one by one, and is
+        only supported by the scalar engine.
+    """
+
+    __slots__ = (
+        'policy',
+        'workers',
+        'shard_size',
+        'statistics',
+        'count_rules',
+        'threads',
+        'export',
+    )
+
+    def __init__(self, policy: Union[Policy, 'BatchPolicy'], workers: Optional[int] = None,
+                 shard_size: int = 100_000, statistics: bool = False, count_rules: bool = False,
+                 threads: bool = False, export: Optional[str] = None):
+        self.policy = policy
+        self.workers: Optional[int] = workers
+        self.shard_size: int = shard_size
+        self.statistics: bool = statistics
+        self.count_rules: bool = count_rules
+        self.threads: bool = threads
+        self.export: Optional[str] = export
+
+    def run(self, turns: int, seed: int = 0) -> SimulationResult:
+        """Plays many turns and merges the results of every shard
+        :param turns: number of turns to play
+        :param seed: root seed of the run  [default 0]
+        :return: the aggregated outcome of every turn
+        :raises ValueError: if a batch policy is exported
+        """
+        export = self.export
+        if export is not None and not isinstance(self.policy, Policy):
+            raise ValueError('Only the scalar engine can export its turns')
+        shard_size = self.shard_size
+        shards = [(derive_seed(seed, index), min(shard_size, turns - start),
+                   None if export is None else os.path.join(export, f'shard-{index:06d}'))
+                  for index, start in enumerate(range(0, turns, shard_size))]
+        result = SimulationResult()
+
+        if self.workers == 1:
+            for shard_seed, shard_turns, shard_export in shards:
+                result.merge(_run_shard(self.policy, shard_seed, shard_turns, self.statistics, self.count_rules,
+                                        export=shard_export))
+            return result
+
+        scoring = None
+        pool = ProcessPoolExecutor
+        if self.threads:
+            # compiled before the threads start, which then only read it
+            scoring = ScoringLogic()
+            scoring.compile()
+            pool = ThreadPoolExecutor
+
+        with pool(max_workers=self.workers or os.cpu_count()) as executor:
+            futures = [executor.submit(_run_shard, self.policy, shard_seed, shard_turns, self.statistics,
+                                       self.count_rules, scoring, shard_export)
+                       for shard_seed, shard_turns, shard_export in shards]
+            for future in futures:
+                result.merge(future.result())
+        return result
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} policy={self.policy!r} workers={self.workers} '
+                f'shard_size={self.shard_size} threads={self.threads}>')
@@ -0,0 +1,280 @@
+"""
+Precomputed roll outcomes
+
+Every roll of a turn is one of a few thousand combinations of white
+faces and a black face, so the outcome of each of them is computed once
+by running the rules of a :class:`ScoringLogic` and stored in a table.
+Rolls that ask the player about the sun die store one outcome per
+possible answer.
+
+The scoring rules reset the clearing face before they run, so it only
+limits which rolls can happen and is not part of the key.
+
+The table of the standard rules is built on first use and cached on disk.
+A compact view of a table, indexed by the integer roll encoding of
+:mod:`rolls`, serves the lookups made while playing. The cache location
+defaults to ``~/.cache/cosmic_wimpout`` and can be moved with the
+``COSMIC_WIMPOUT_CACHE`` environment variable.
+"""
+
+import os
+import pickle
+import threading
+from itertools import product
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .dice import Face
+from .rolls import WHITE_FACES, BLACK_FACES, FACE_BY_CODE, WHITE_ROLLS
+
+
+__all__ = (
+    'NO_DECISION',
+    'SUN_TRIO_DECISION',
+    'SUN_USE_DECISION',
+    'SUN_POINT_DECISION',
+    'DECISION_ANSWERS',
+    'ScoredRoll',
+    'RollEntry',
+    'RollKey',
+    'roll_key',
+    'build_scoring_table',
+    'load_scoring_table',
+    'get_scoring_table',
+    'index_roll_entries',
+)
+
+
+TABLE_VERSION = 2
+
+# The decision a roll asks the player about before it can be scored
+NO_DECISION = 0
+SUN_TRIO_DECISION = 1   # outcomes are indexed by the trio choice
+SUN_USE_DECISION = 2    # outcomes are (five points, ten points, keep the die)
+SUN_POINT_DECISION = 3  # outcomes are (five points, ten points)
+
+# The prompts of the scoring rules, as (decision, answer) pairs, answered to reach each
+# outcome of a decision. Prompts beyond them are answered with the first choice.
+DECISION_ANSWERS: Dict[int, Tuple[Tuple[Tuple[int, int], ...], ...]] = {
+    NO_DECISION: ((),),
+    SUN_TRIO_DECISION: (((SUN_TRIO_DECISION, 1),), ((SUN_TRIO_DECISION, 2),)),
+    SUN_USE_DECISION: (((SUN_USE_DECISION, 1), (SUN_POINT_DECISION, 1)),
+                       ((SUN_USE_DECISION, 1), (SUN_POINT_DECISION, 2)),
+                       ((SUN_USE_DECISION, 2),)),
+    SUN_POINT_DECISION: (((SUN_POINT_DECISION, 1),), ((SUN_POINT_DECISION, 2),)),
+}
+
+RollKey = Tuple[Tuple[int, ...], Optional[Face]]
+
+
+class ScoredRoll(NamedTuple):
+    """The effect of scoring a single roll.
+
+    Attributes
+    -----------
+    points: :class:`int`
+        The number of points earned by the roll.
+    white_used: :class:`int`
+        The number of white dice that scored.
+    black_used: :class:`bool`
+        If the black die scored.
+    clearing: :class:`int`
+        The code of the face that must be cleared after the
+        roll, or ``0`` if not present.
+    scoring_dice: :class:`bool`
+        If at least one die scored points.
+    instant: :class:`int`
+        ``1`` if the roll instantly won the game, ``-1`` if it
+        instantly lost the game and ``0`` otherwise.
+    """
+    points: int
+    white_used: int
+    black_used: bool
+    clearing: int
+    scoring_dice: bool
+    instant: int
+
+    @property
+    def clearing_face(self) -> Optional[Face]:
+        return FACE_BY_CODE[self.clearing]
+
+
+class RollEntry(NamedTuple):
+    """All possible outcomes of a single roll.
+
+    Attributes
+    -----------
+    decision: :class:`int`
+        The decision the roll asks the player about.
+    faces: Tuple[:class:`Face`, ...]
+        The faces offered by a :data:`SUN_TRIO_DECISION`.
+    outcomes: Tuple[:class:`ScoredRoll`, ...]
+        The outcome of each answer to the decision.
+    """
+    decision: int
+    faces: Tuple[Face, ...]
+    outcomes: Tuple[ScoredRoll, ...]
+
+
+def roll_key(white_die_rolls: Dict[Face, int], black_die_roll: Optional[Face]) -> RollKey:
+    """Gets the table key of a roll
+    :param white_die_rolls: number of times each white face was rolled
+    :param black_die_roll:  face rolled on the black die, if any
+    :return: the key of the roll in the scoring table
+    """
+    return tuple([white_die_rolls.get(face, 0) for face in WHITE_FACES]), black_die_roll
+
+
+def _make_scorer(scoring):
+    # imported here since the turn logic itself scores through this table
+    from .cosmic_wimpout import TurnLogic
+    from .throwables import PlayerInstantlyWon, PlayerInstantlyLost
+
+    class ScriptedTurnLogic(TurnLogic):
+        """Scores a given roll with scripted answers to the prompts"""
+
+        __slots__ = ('asked',)
+
+        def __init__(self):
+            super().__init__(verbose=False, scoring=scoring)
+            self.asked: List[Tuple[int, Tuple[Face, ...]]] = []
+
+        def _answer(self, decision: int, faces: Tuple[Face, ...] = ()) -> int:
+            self.asked.append((decision, faces))
+            return super()._answer(decision, faces)
+
+        def score_roll(self, counts: Tuple[int, ...], black_die_roll: Optional[Face],
+                       answers: Sequence[Tuple[int, int]]) -> ScoredRoll:
+            self.reset()
+            self.white_die_rolls = {face: count for face, count in zip(WHITE_FACES, counts) if count}
+            self.black_die_roll = black_die_roll
+            self.remaining_white = sum(counts)
+            self.remaining_black = black_die_roll is not None
+            self._answers[:] = answers
+            self.asked = []
+            instant = 0
+            try:
+                self.scoring.score(self)
+            except PlayerInstantlyWon:
+                instant = 1
+            except PlayerInstantlyLost:
+                instant = -1
+            return ScoredRoll(
+                points=self.score,
+                white_used=sum(counts) - self.remaining_white,
+                black_used=black_die_roll is not None and not self.remaining_black,
+                clearing=self.clearing,
+                scoring_dice=self.scoring_dice,
+                instant=instant,
+            )
+
+    return ScriptedTurnLogic()
+
+
+def build_scoring_table(scoring=None) -> Dict[RollKey, RollEntry]:
+    """Scores every possible roll by running the rules one by one
+    :param scoring: rules to score with  [default the standard :class:`ScoringLogic`]
+    :return: the scoring table
+    """
+    scorer = _make_scorer(scoring)
+    table = {}
+
+    for white_dice in range(5):
+        for counts in product(range(white_dice + 1), repeat=len(WHITE_FACES)):
+            if sum(counts) != white_dice:
+                continue
+            for black_die_roll in (None,) + BLACK_FACES:
+                outcome = scorer.score_roll(counts, black_die_roll, ())
+                if not scorer.asked:
+                    entry = RollEntry(NO_DECISION, (), (outcome,))
+                else:
+                    decision, faces = scorer.asked[0]
+                    outcomes = tuple(scorer.score_roll(counts, black_die_roll, answers)
+                                     for answers in DECISION_ANSWERS[decision])
+                    entry = RollEntry(decision, faces, outcomes)
+                table[counts, black_die_roll] = entry
+
+    return table
+
+
+def _cache_path() -> str:
+    directory = os.environ.get('COSMIC_WIMPOUT_CACHE') \
+        or os.path.join(os.path.expanduser('~'), '.cache', 'cosmic_wimpout')
+    return os.path.join(directory, f'scoring_table-v{TABLE_VERSION}.pickle')
+
+
+def _encode(face: Optional[Face]) -> Optional[str]:
+    return None if face is None else face.value
+
+
+def _decode(value: Optional[str]) -> Optional[Face]:
+    return None if value is None else Face(value)
+
+
+def load_scoring_table(path: Optional[str] = None) -> Dict[RollKey, RollEntry]:
+    """Loads the scoring table from disk, building and saving it if needed
+
+    Faces are stored by value so the cache does not depend on where
+    the :class:`Face` enum is imported from.
+
+    :param path: cache file to use  [default from ``_cache_path()``]
+    :return: the scoring table
+    """
+    path = path or _cache_path()
+
+    try:
+        with open(path, 'rb') as file:
+            rows = pickle.load(file)
+        return {
+            (counts, _decode(black)): RollEntry(decision, tuple(map(_decode, faces)), tuple(
+                ScoredRoll(*outcome) for outcome in outcomes))
+            for counts, black, decision, faces, outcomes in rows
+        }
+    # a missing or unreadable cache is simply rebuilt
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        pass
+
+    table = build_scoring_table()
+    rows = [
+        (counts, _encode(black), entry.decision, tuple(map(_encode, entry.faces)),
+         tuple(map(tuple, entry.outcomes)))
+        for (counts, black), entry in table.items()
+    ]
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written aside and moved in place, so concurrent readers never see half a table
+        partial = f'{path}.{os.getpid()}.{threading.get_ident()}'
+        with open(partial, 'wb') as file:
+            pickle.dump(rows, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, path)
+    # the cache is only an optimization, so a read-only disk is fine
+    except OSError:
+        pass
+    return table
+
+
+_scoring_table: Optional[Dict[RollKey, RollEntry]] = None
+_scoring_table_lock = threading.Lock()
+
+
+def get_scoring_table() -> Dict[RollKey, RollEntry]:
+    """Gets the shared scoring table, loading it on first use
+    :return: the scoring table
+    """
+    global _scoring_table
+    if _scoring_table is None:
+        # threads starting together load the table once and share it
+        with _scoring_table_lock:
+            if _scoring_table is None:
+                _scoring_table = load_scoring_table()
+    return _scoring_table
+
+
+def index_roll_entries(table: Dict[RollKey, RollEntry]) -> List[List[Optional[RollEntry]]]:
+    """Indexes a scoring table by the integer roll encoding
+    :param table: scoring table to index
+    :return: entries indexed by black face code, then by white roll index
+    """
+    return [
+        [table.get((counts, black_die_roll)) for counts in WHITE_ROLLS]
+        for black_die_roll in FACE_BY_CODE
+    ]
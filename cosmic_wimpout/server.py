@@ -0,0 +1,556 @@
+"""
+asyncio game server
+
+Hosts many tables of Cosmic Wimpout in a single process. Every decision
+of a turn is awaited from the :class:`Seat` of the player, so a table
+waiting on a remote player never blocks the others. Bots answer inline
+through a :class:`Policy`, and remote players connect over TCP and play
+with a line protocol, e.g. with ``nc 127.0.0.1 7777``.
+
+Every line sent by the server is a keyword followed by its arguments::
+
+    WELCOME <name>
+    TABLE <name> <name> ...
+    TURN <name> <score>
+    ROLL <white faces> [<black face>]   black face in parentheses
+    CLEAR <face>                        the face must be cleared
+    BUST <turn score>
+    END <name> <turn score> <score>
+    INSTANT_WIN <name>
+    INSTANT_LOSS <name>
+    ASK KEEP <turn score> <dice left>   [1] keep playing [2] end turn
+    ASK SUN_USE                         [1] use for points [2] keep the die
+    ASK SUN_POINTS                      [1] five points [2] ten points
+    ASK TRIO <face> <face> ...          [n] face to make a trio with
+    INVALID
+    WINNER <name>|NONE
+
+and the player answers each ``ASK`` with the number of its choice on a
+line of its own. A player who disconnects or does not answer in time is
+played by the fallback policy of its seat.
+"""
+
+import argparse
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional, Sequence
+
+from .dice import Face
+from .cosmic_wimpout import ScoringLogic, TurnLogic
+from .events import BustEvent, ClearingFaceEvent, Listener, RollEvent, TurnEndEvent, TurnEvent
+from .player import Player
+from .policy import Policy
+from .rng import DiceStream
+from .scoring_table import NO_DECISION, RollEntry, SUN_TRIO_DECISION, SUN_USE_DECISION
+from .throwables import PlayerInstantlyWon, PlayerInstantlyLost
+
+
+__all__ = (
+    'Seat',
+    'BotSeat',
+    'RemoteSeat',
+    'AsyncTurnLogic',
+    'AsyncTable',
+    'GameServer',
+)
+
+
+class Seat(ABC):
+    """Represents the player sitting at a table.
+
+    Each method mirrors one of the ``_get_*_choice`` prompts of
+    :class:`TurnLogic` and returns the same 1-based choice, but is
+    awaited so the table can wait on the player without blocking.
+
+    Attributes
+    -----------
+    name: :class:`str`
+        A name to identify the player, without spaces.
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name: str = name
+
+    @abstractmethod
+    async def keep_playing_choice(self, turn: TurnLogic) -> int:
+        pass
+
+    @abstractmethod
+    async def sun_die_use_choice(self, turn: TurnLogic) -> int:
+        pass
+
+    @abstractmethod
+    async def sun_die_point_choice(self, turn: TurnLogic) -> int:
+        pass
+
+    @abstractmethod
+    async def sun_trio_choice(self, turn: TurnLogic, faces: List[Face]) -> int:
+        pass
+
+    def notify(self, line: str) -> None:
+        """Tells the player what happens at the table"""
+
+    def close(self) -> None:
+        """Lets the player go once the game is over"""
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} name={self.name!r}>'
+
+
+class BotSeat(Seat):
+    """A seat played by a :class:`Policy`, answering without waiting.
+
+    Attributes
+    -----------
+    policy: :class:`Policy`
+        The policy answering every decision.
+    """
+
+    __slots__ = ('policy',)
+
+    def __init__(self, name: str, policy: Optional[Policy] = None):
+        super().__init__(name)
+        self.policy: Policy = policy or Policy()
+
+    async def keep_playing_choice(self, turn: TurnLogic) -> int:
+        return self.policy.keep_playing_choice(turn)
+
+    async def sun_die_use_choice(self, turn: TurnLogic) -> int:
+        return self.policy.sun_die_use_choice(turn)
+
+    async def sun_die_point_choice(self, turn: TurnLogic) -> int:
+        return self.policy.sun_die_point_choice(turn)
+
+    async def sun_trio_choice(self, turn: TurnLogic, faces: List[Face]) -> int:
+        return self.policy.sun_trio_choice(turn, faces)
+
+
+class RemoteSeat(BotSeat):
+    """A seat played over a connection with the line protocol.
+
+    Attributes
+    -----------
+    reader: :class:`asyncio.StreamReader`
+        The stream the answers of the player are read from.
+    writer: :class:`asyncio.StreamWriter`
+        The stream the lines of the table are written to.
+    timeout: Optional[:class:`float`]
+        The number of seconds the player has to answer a decision, or
+        ``None`` to wait forever.
+    connected: :class:`bool`
+        A boolean representing if the player is still connected.
+        Once disconnected, the policy plays in their place.
+    """
+
+    __slots__ = (
+        'reader',
+        'writer',
+        'timeout',
+        'connected',
+    )
+
+    def __init__(self, name: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 policy: Optional[Policy] = None, timeout: Optional[float] = None):
+        super().__init__(name, policy)
+        self.reader: asyncio.StreamReader = reader
+        self.writer: asyncio.StreamWriter = writer
+        self.timeout: Optional[float] = timeout
+        self.connected: bool = True
+
+    async def _ask(self, question: str, choices: int, fallback: Callable[[], int]) -> int:
+        """Asks the player until they answer with a valid choice
+        :param question: arguments of the ``ASK`` line
+        :param choices: number of choices, numbered from 1
+        :param fallback: answers in place of the player if they are gone
+        :return: the choice of the player
+        """
+        # the timeout covers every attempt, so invalid answers do not extend it
+        loop = asyncio.get_running_loop()
+        deadline = None if self.timeout is None else loop.time() + self.timeout
+        while self.connected:
+            self.notify(f'ASK {question}')
+            try:
+                await self.writer.drain()
+                timeout = None if deadline is None else deadline - loop.time()
+                if timeout is not None and timeout <= 0:
+                    raise asyncio.TimeoutError
+                line = await asyncio.wait_for(self.reader.readline(), timeout)
+            except (asyncio.TimeoutError, ConnectionError):
+                line = b''
+            if not line:
+                self.connected = False
+                break
+            try:
+                choice = int(line)
+                if 1 <= choice <= choices:
+                    return choice
+            except ValueError:
+                pass
+            self.notify('INVALID')
+        return fallback()
+
+    async def keep_playing_choice(self, turn: TurnLogic) -> int:
+        dice_left = turn.remaining_white + turn.remaining_black
+        return await self._ask(f'KEEP {turn.score} {dice_left}', 2,
+                               lambda: self.policy.keep_playing_choice(turn))
+
+    async def sun_die_use_choice(self, turn: TurnLogic) -> int:
+        return await self._ask('SUN_USE', 2, lambda: self.policy.sun_die_use_choice(turn))
+
+    async def sun_die_point_choice(self, turn: TurnLogic) -> int:
+        return await self._ask('SUN_POINTS', 2, lambda: self.policy.sun_die_point_choice(turn))
+
+    async def sun_trio_choice(self, turn: TurnLogic, faces: List[Face]) -> int:
+        return await self._ask('TRIO ' + ' '.join(face.value for face in faces), len(faces),
+                               lambda: self.policy.sun_trio_choice(turn, faces))
+
+    def notify(self, line: str) -> None:
+        if self.connected:
+            self.writer.write(f'{line}\n'.encode())
+
+    def close(self) -> None:
+        self.connected = False
+        self.writer.close()
+
+
+class AsyncTurnLogic(TurnLogic):
+    """Turn logic awaiting every decision from a :class:`Seat`.
+
+    Rolls are scored through the scoring table, so the decisions of
+    a roll are awaited before it is scored, and nothing blocks while
+    the seat is deciding.
+
+    Attributes
+    -----------
+    seat: :class:`Seat`
+        The seat answering every decision of the turn.
+    """
+
+    __slots__ = ('seat',)
+
+    def __init__(self, seat: Seat, rng: Optional[DiceStream] = None, scoring: Optional[ScoringLogic] = None,
+                 listeners: Optional[List[Listener]] = None):
+        super().__init__(verbose=False, rng=rng, scoring=scoring, listeners=listeners)
+        self.seat: Seat = seat
+
+    async def resolve_turn_async(self) -> None:
+        """Plays the turn like :meth:`TurnLogic.resolve_turn`
+        :raises PlayerInstantlyWon:  if five sixes were rolled
+        :raises PlayerInstantlyLost: if five tens were rolled
+        """
+        should_continue = True
+
+        while should_continue:
+            await self._resolve_turn_async()
+
+            # if all dice were used, we should continue
+            if self.remaining_white == 0 and not self.remaining_black:
+                self.remaining_white = 4
+                self.remaining_black = True
+                if self.listeners:
+                    self.emit(ClearingFaceEvent(self.clearing_face, True))
+            # if a clearing face was set, we should continue
+            elif self.clearing:
+                if self.listeners:
+                    self.emit(ClearingFaceEvent(self.clearing_face, False))
+            # if no scoring dice were rolled, we need to stop
+            elif not self.scoring_dice:
+                should_continue = False
+                if self.listeners:
+                    self.emit(BustEvent(self.score))
+                self.score = 0
+            # ask the player if they want to keep playing
+            else:
+                should_continue = await self.seat.keep_playing_choice(self) == 1
+
+        if self.listeners:
+            self.emit(TurnEndEvent(self.score))
+
+    async def _resolve_turn_async(self) -> None:
+        self._roll_dice()
+        if self.listeners:
+            self.emit(RollEvent(self.white_die_rolls, self.black_die_roll))
+
+        entry = self.scoring.lookup(self)
+        option = await self._choose_outcome_async(entry)
+        self.scoring.apply(self, entry.outcomes[option])
+
+    async def _choose_outcome_async(self, entry: RollEntry) -> int:
+        decision = entry.decision
+        if decision == NO_DECISION:
+            return 0
+        seat = self.seat
+        if decision == SUN_TRIO_DECISION:
+            return await seat.sun_trio_choice(self, list(entry.faces)) - 1
+        if decision == SUN_USE_DECISION and await seat.sun_die_use_choice(self) == 2:
+            return 2
+        return await seat.sun_die_point_choice(self) - 1
+
+
+def _format_event(event: TurnEvent) -> Optional[str]:
+    """Gets the protocol line of a turn event"""
+    if isinstance(event, RollEvent):
+        dice = [face.value for face, count in event.white_die_rolls.items() for _ in range(count)]
+        if event.black_die_roll is not None:
+            dice.append(f'({event.black_die_roll.value})')
+        return 'ROLL ' + ' '.join(dice)
+    if isinstance(event, ClearingFaceEvent) and event.face is not None:
+        return f'CLEAR {event.face.value}'
+    if isinstance(event, BustEvent):
+        return f'BUST {event.score}'
+    return None
+
+
+class AsyncTable:
+    """The game loop of :class:`CosmicWimpout`, played by seats.
+
+    Attributes
+    -----------
+    goal: :class:`int`
+        The number of points needed to win.
+    seats: List[:class:`Seat`]
+        The seats of the players, in turn order.
+    players: List[:class:`Player`]
+        The players of the game, named after their seats.
+    turn_logic: List[:class:`AsyncTurnLogic`]
+        The turn logic resolving each player's turns.
+    """
+
+    __slots__ = (
+        'goal',
+        'seats',
+        'players',
+        'turn_logic',
+    )
+
+    def __init__(self, seats: Sequence[Seat], goal: int = 500, rng: Optional[DiceStream] = None,
+                 scoring: Optional[ScoringLogic] = None):
+        rng = rng or DiceStream()
+        scoring = scoring or ScoringLogic()
+        self.goal: int = goal
+        self.seats: List[Seat] = list(seats)
+        self.players: List[Player] = [Player(name=seat.name) for seat in self.seats]
+
+        # only tables with remote players need to hear about the rolls
+        listeners = [self._broadcast] if any(isinstance(seat, RemoteSeat) for seat in self.seats) else []
+        self.turn_logic: List[AsyncTurnLogic] = [AsyncTurnLogic(seat, rng, scoring, listeners)
+                                                 for seat in self.seats]
+
+    def notify(self, line: str) -> None:
+        for seat in self.seats:
+            seat.notify(line)
+
+    def _broadcast(self, event: TurnEvent) -> None:
+        line = _format_event(event)
+        if line is not None:
+            self.notify(line)
+
+    async def run(self) -> Optional[Player]:
+        """Plays the game, announces the winner and lets every seat go
+        :return: the winning player, or ``None`` if every
+                 player was removed from the game
+        """
+        self.notify('TABLE ' + ' '.join(player.name for player in self.players))
+        try:
+            winner = await self.play()
+            self.notify(f'WINNER {winner.name if winner is not None else "NONE"}')
+            return winner
+        finally:
+            for seat in self.seats:
+                seat.close()
+
+    async def play(self) -> Optional[Player]:
+        """Plays the game until it is finished, like :meth:`CosmicWimpout.play`
+        :return: the winning player, or ``None`` if every
+                 player was removed from the game
+        """
+        first_player_to_meet_the_goal: Optional[Player] = None
+        current_winner: Optional[Player] = None
+
+        while True:
+            for player, turn_logic in zip(self.players, self.turn_logic):
+
+                # Skip if this player is not alive
+                if not player.alive:
+                    continue
+
+                # The final round ends when it comes back to this player
+                if player is first_player_to_meet_the_goal:
+                    return current_winner
+
+                self.notify(f'TURN {player.name} {player.score}')
+
+                turn_logic.game_score = player.score
+                turn_logic.opponent_score = max(
+                    (other.score for other in self.players if other.alive and other is not player), default=0)
+                turn_logic.goal = self.goal
+                turn_logic.final_round = first_player_to_meet_the_goal is not None
+
+                try:
+                    turn_logic.reset()
+                    await turn_logic.resolve_turn_async()
+                except PlayerInstantlyWon:
+                    self.notify(f'INSTANT_WIN {player.name}')
+                    return player
+                # Rolling a supernova removes the player from the game
+                except PlayerInstantlyLost:
+                    self.notify(f'INSTANT_LOSS {player.name}')
+                    player.alive = False
+                    survivors = [other for other in self.players if other.alive]
+                    if len(survivors) <= 1 < len(self.players):
+                        return survivors[0] if survivors else None
+                    continue
+
+                player.score += turn_logic.score
+                self.notify(f'END {player.name} {turn_logic.score} {player.score}')
+
+                # Check if this marks the start of the final round
+                if first_player_to_meet_the_goal is None:
+                    if player.score >= self.goal:
+                        first_player_to_meet_the_goal = player
+                        current_winner = player
+                # During the final round, a player must beat the current winner
+                elif player.score > current_winner.score:
+                    current_winner = player
+
+                # bots never wait, so let the other tables play between turns
+                await asyncio.sleep(0)
+
+            # A single player game ends once that player is removed
+            if not any(player.alive for player in self.players):
+                return None
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} goal={self.goal} seats={self.seats}>'
+
+
+class GameServer:
+    """Seats players connecting over TCP at tables and plays them.
+
+    A table starts as soon as enough players are waiting for it. Each
+    table is played by its own task, so thousands of tables share the
+    process and a slow player only ever delays their own table.
+
+    Attributes
+    -----------
+    players: :class:`int`
+        The number of players at each table.
+    bots: :class:`int`
+        The number of seats of each table played by bots.
+    goal: :class:`int`
+        The number of points needed to win.
+    policy: :class:`Policy`
+        The policy playing the bots, and the players who left.
+    timeout: Optional[:class:`float`]
+        The number of seconds players have to answer.
+    scoring: :class:`ScoringLogic`
+        The rules used to score each roll, shared by every table.
+    host: :class:`str`
+        The address the server listens on.
+    port: :class:`int`
+        The port the server listens on.
+    tables: List[:class:`asyncio.Task`]
+        The tables being played.
+    """
+
+    __slots__ = (
+        'players',
+        'bots',
+        'goal',
+        'policy',
+        'timeout',
+        'scoring',
+        'host',
+        'port',
+        'tables',
+        '_waiting',
+        '_connections',
+        '_server',
+    )
+
+    def __init__(self, players: int = 2, bots: int = 0, goal: int = 500, policy: Optional[Policy] = None,
+                 timeout: Optional[float] = None, scoring: Optional[ScoringLogic] = None,
+                 host: str = '127.0.0.1', port: int = 7777):
+        if not 0 <= bots < players:
+            raise ValueError('A table needs at least one remote player')
+        self.players: int = players
+        self.bots: int = bots
+        self.goal: int = goal
+        self.policy: Policy = policy or Policy()
+        self.timeout: Optional[float] = timeout
+        self.scoring: ScoringLogic = scoring or ScoringLogic()
+        self.host: str = host
+        self.port: int = port
+        self.tables: List[asyncio.Task] = []
+        self._waiting: List[RemoteSeat] = []
+        self._connections: int = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._connect, self.host, self.port)
+        # a port of 0 picks a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for table in self.tables:
+            table.cancel()
+        await asyncio.gather(*self.tables, return_exceptions=True)
+
+    async def _connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections += 1
+        seat = RemoteSeat(f'player-{self._connections}', reader, writer, self.policy, self.timeout)
+        seat.notify(f'WELCOME {seat.name}')
+        self._waiting.append(seat)
+
+        if len(self._waiting) == self.players - self.bots:
+            seats: List[Seat] = self._waiting
+            self._waiting = []
+            seats += [BotSeat(f'bot-{self._connections}-{index + 1}', self.policy) for index in range(self.bots)]
+            self.open_table(seats)
+
+    def open_table(self, seats: Sequence[Seat], rng: Optional[DiceStream] = None) -> asyncio.Task:
+        """Starts playing a table
+        :param seats: seats of the players, in turn order
+        :param rng: random generator rolling the dice  [default a new one]
+        :return: the task playing the table, resulting in the winner
+        """
+        task = asyncio.create_task(AsyncTable(seats, self.goal, rng, self.scoring).run())
+        self.tables.append(task)
+        task.add_done_callback(self.tables.remove)
+        return task
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} host={self.host!r} port={self.port} players={self.players} '
+                f'bots={self.bots} tables={len(self.tables)}>')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hosts Cosmic Wimpout tables over TCP.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=7777, help='port to listen on')
+    parser.add_argument('--players', type=int, default=2, help='players at each table')
+    parser.add_argument('--bots', type=int, default=0, help='seats of each table played by bots')
+    parser.add_argument('--goal', type=int, default=500, help='points needed to win')
+    parser.add_argument('--timeout', type=float, help='seconds players have to answer')
+    args = parser.parse_args()
+
+    server = GameServer(args.players, args.bots, args.goal, timeout=args.timeout, host=args.host, port=args.port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
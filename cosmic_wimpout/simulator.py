@@ -0,0 +1,283 @@
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+from .cosmic_wimpout import CosmicWimpout, ScoringLogic, TurnLogic
+from .events import Listener
+from .policy import Policy
+from .rng import DiceStream
+from .stats import TurnStatistics
+from .throwables import PlayerInstantlyWon, PlayerInstantlyLost
+
+# the recorders write with NumPy, which simulating alone never imports
+if TYPE_CHECKING:
+    from .export import GameRecorder, TurnRecorder
+
+
+__all__ = (
+    'HeadlessTurnLogic',
+    'SimulationResult',
+    'TurnSimulator',
+    'GameResult',
+    'GameSimulator',
+)
+
+
+class HeadlessTurnLogic(TurnLogic):
+    """Turn logic driven by a :class:`Policy` with no console I/O.
+
+    The rolls are scored by the :class:`ScoringLogic` of the turn logic,
+    only the prompts are answered by the policy instead of ``input()``.
+
+    Attributes
+    -----------
+    policy: :class:`Policy`
+        The policy answering every decision of the turn.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, policy: Optional[Policy] = None, rng: Optional[DiceStream] = None,
+                 scoring: Optional[ScoringLogic] = None, listeners: Optional[List[Listener]] = None):
+        super().__init__(verbose=False, rng=rng, scoring=scoring, listeners=listeners, decisions=policy or Policy())
+
+    @property
+    def policy(self) -> Policy:
+        return self.decisions
+
+    @policy.setter
+    def policy(self, policy: Policy) -> None:
+        self.decisions = policy
+
+
+class SimulationResult:
+    """Aggregated outcome of many simulated turns.
+
+    Attributes
+    -----------
+    turns: :class:`int`
+        The number of turns simulated.
+    total_score: :class:`int`
+        The sum of the final score of every turn.
+    busts: :class:`int`
+        The number of turns that ended without points.
+    instant_wins: :class:`int`
+        The number of turns that rolled five sixes.
+    instant_losses: :class:`int`
+        The number of turns that rolled five tens.
+    statistics: Optional[:class:`TurnStatistics`]
+        The streaming statistics of the turns, if they were gathered.
+    """
+
+    __slots__ = (
+        'turns',
+        'total_score',
+        'busts',
+        'instant_wins',
+        'instant_losses',
+        'statistics',
+    )
+
+    def __init__(self, **kwargs):
+        self.turns: int = kwargs.get('turns', 0)
+        self.total_score: int = kwargs.get('total_score', 0)
+        self.busts: int = kwargs.get('busts', 0)
+        self.instant_wins: int = kwargs.get('instant_wins', 0)
+        self.instant_losses: int = kwargs.get('instant_losses', 0)
+        self.statistics: Optional[TurnStatistics] = kwargs.get('statistics')
+
+    @property
+    def mean_score(self) -> float:
+        return self.total_score / self.turns if self.turns else 0.0
+
+    def merge(self, other: 'SimulationResult') -> None:
+        """Adds the outcomes of another simulation to this one"""
+        self.turns += other.turns
+        self.total_score += other.total_score
+        self.busts += other.busts
+        self.instant_wins += other.instant_wins
+        self.instant_losses += other.instant_losses
+        if other.statistics is not None:
+            if self.statistics is None:
+                # copied, so merging more results never changes the other one
+                self.statistics = TurnStatistics.from_dict(other.statistics.to_dict())
+            else:
+                self.statistics.merge(other.statistics)
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} turns={self.turns} mean_score={self.mean_score:.3f} '
+                f'busts={self.busts} instant_wins={self.instant_wins} instant_losses={self.instant_losses}>')
+
+
+class TurnSimulator:
+    """Plays turns back-to-back with a :class:`HeadlessTurnLogic`.
+
+    A single turn logic instance is reused for every turn, so no
+    per-turn objects are created while simulating.
+
+    Attributes
+    -----------
+    turn_logic: :class:`HeadlessTurnLogic`
+        The turn logic used to play every turn.
+    """
+
+    __slots__ = ('turn_logic',)
+
+    def __init__(self, policy: Optional[Policy] = None, rng: Optional[DiceStream] = None,
+                 scoring: Optional[ScoringLogic] = None):
+        self.turn_logic: HeadlessTurnLogic = HeadlessTurnLogic(policy, rng, scoring)
+
+    def play_turn(self) -> int:
+        """Plays a single turn
+        :return: the final score of the turn
+        :raises PlayerInstantlyWon:  if five sixes were rolled
+        :raises PlayerInstantlyLost: if five tens were rolled
+        """
+        turn_logic = self.turn_logic
+        turn_logic.reset()
+        turn_logic.resolve_turn()
+        return turn_logic.score
+
+    def simulate(self, turns: int, statistics: Optional[TurnStatistics] = None,
+                 count_rules: bool = False, recorder: Optional['TurnRecorder'] = None) -> SimulationResult:
+        """Plays many turns and aggregates their outcomes
+        :param turns: number of turns to play
+        :param statistics: statistics fed the final score of every turn  [default None]
+        :param count_rules: if the statistics listen to every rule and clearing
+                            face, which walks the scoring rules one by one  [default False]
+        :param recorder: recorder writing a row for every turn, which also
+                         walks the scoring rules one by one  [default None]
+        :return: the aggregated outcome of every turn
+        """
+        play_turn = self.play_turn
+        total_score = busts = instant_wins = instant_losses = 0
+        listening = statistics is not None and count_rules
+        if listening:
+            self.turn_logic.listeners.append(statistics)
+        if recorder is not None:
+            self.turn_logic.listeners.append(recorder)
+
+        try:
+            for _ in range(turns):
+                try:
+                    score = play_turn()
+                except PlayerInstantlyWon:
+                    instant_wins += 1
+                    if statistics is not None:
+                        statistics.add_instant(True)
+                    if recorder is not None:
+                        recorder.add_instant(True)
+                    continue
+                except PlayerInstantlyLost:
+                    instant_losses += 1
+                    if statistics is not None:
+                        statistics.add_instant(False)
+                    if recorder is not None:
+                        recorder.add_instant(False)
+                    continue
+                if score == 0:
+                    busts += 1
+                total_score += score
+                if statistics is not None and not listening:
+                    statistics.add_turn(score)
+        finally:
+            if listening:
+                self.turn_logic.listeners.remove(statistics)
+            if recorder is not None:
+                self.turn_logic.listeners.remove(recorder)
+
+        return SimulationResult(
+            turns=turns,
+            total_score=total_score,
+            busts=busts,
+            instant_wins=instant_wins,
+            instant_losses=instant_losses,
+            statistics=statistics,
+        )
+
+
+class GameResult:
+    """Aggregated outcome of many simulated games.
+
+    Attributes
+    -----------
+    games: :class:`int`
+        The number of games simulated.
+    wins: List[:class:`int`]
+        The number of games won by each seat.
+    no_winner: :class:`int`
+        The number of games where every player was removed.
+    """
+
+    __slots__ = (
+        'games',
+        'wins',
+        'no_winner',
+    )
+
+    def __init__(self, players: int, **kwargs):
+        self.games: int = kwargs.get('games', 0)
+        self.wins: List[int] = kwargs.get('wins') or [0] * players
+        self.no_winner: int = kwargs.get('no_winner', 0)
+
+    @property
+    def win_rates(self) -> List[float]:
+        return [wins / self.games if self.games else 0.0 for wins in self.wins]
+
+    def merge(self, other: 'GameResult') -> None:
+        """Adds the outcomes of another simulation to this one"""
+        self.games += other.games
+        self.wins = [wins + other_wins for wins, other_wins in zip(self.wins, other.wins)]
+        self.no_winner += other.no_winner
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} games={self.games} wins={self.wins} no_winner={self.no_winner}>'
+
+
+class GameSimulator:
+    """Plays full games back-to-back between policies.
+
+    Attributes
+    -----------
+    game: :class:`CosmicWimpout`
+        The game reused for every simulated game. Each seat is
+        played by a :class:`HeadlessTurnLogic` for its policy.
+    """
+
+    __slots__ = ('game',)
+
+    def __init__(self, policies: Sequence[Policy], goal: int = 500, rng: Optional[DiceStream] = None,
+                 scoring: Optional[ScoringLogic] = None, listeners: Optional[List[Listener]] = None):
+        rng = rng or DiceStream()
+        scoring = scoring or ScoringLogic()
+        turn_logic = [HeadlessTurnLogic(policy, rng, scoring, listeners) for policy in policies]
+        self.game: CosmicWimpout = CosmicWimpout(len(policies), goal, turn_logic)
+
+    def play_game(self) -> Optional[int]:
+        """Plays a single game
+        :return: the seat of the winning player, or ``None`` if
+                 every player was removed from the game
+        """
+        game = self.game
+        game.reset()
+        winner = game.play()
+        return None if winner is None else game.players.index(winner)
+
+    def simulate(self, games: int, recorder: Optional['GameRecorder'] = None) -> GameResult:
+        """Plays many games and aggregates their outcomes
+        :param games: number of games to play
+        :param recorder: recorder writing a row for every game  [default None]
+        :return: the aggregated outcome of every game
+        """
+        play_game = self.play_game
+        wins = [0] * len(self.game.players)
+        no_winner = 0
+
+        for _ in range(games):
+            seat = play_game()
+            if recorder is not None:
+                recorder.add_game(seat, self.game.players)
+            if seat is None:
+                no_winner += 1
+            else:
+                wins[seat] += 1
+
+        return GameResult(len(wins), games=games, wins=wins, no_winner=no_winner)
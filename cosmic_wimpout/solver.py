@@ -0,0 +1,287 @@
+"""
+Optimal single turn strategy
+
+Computes the exact expected turn score of every (turn score, remaining
+white dice, remaining black die, clearing face) state when every decision
+is taken optimally, using the roll probabilities implied by the faces of
+:class:`WhiteDie` and :class:`BlackDie`.
+
+Every scoring roll earns at least five points, so the values are solved
+bucket by bucket from the highest turn score down. Turn scores are
+clamped at ``max_score``, where the turn is always banked.
+"""
+
+import pickle
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+from .dice import Face
+from .cosmic_wimpout import ScoringLogic
+from .policy import Policy
+from .rolls import FACE_BY_CODE, FACE_CODES, WHITE_ROLLS, roll_probabilities
+from .scoring_table import RollEntry, RollKey, ScoredRoll, WHITE_FACES
+
+
+__all__ = (
+    'SCORE_STEP',
+    'PolicyTable',
+    'TurnSolver',
+    'OptimalPolicy',
+)
+
+
+# every score in the game is a multiple of five
+SCORE_STEP = 5
+
+CLEARING_FACES: Tuple[Optional[Face], ...] = (None,) + WHITE_FACES
+
+# what happens after a roll is scored
+_BUST, _DECISION, _FORCED, _INSTANT = range(4)
+
+
+def _state_index(remaining_white: int, remaining_black: bool, clearing_face: Optional[Face]) -> int:
+    return (remaining_white * 2 + remaining_black) * len(CLEARING_FACES) + CLEARING_FACES.index(clearing_face)
+
+
+_STATES = len(CLEARING_FACES) * 2 * 5
+
+
+def _roll_distribution(table: Dict[RollKey, RollEntry], remaining_white: int, remaining_black: bool,
+                       clearing_face: Optional[Face]):
+    """Enumerates every roll with its probability
+    :return: list of (probability, roll entry) pairs
+    """
+    return [(probability, table[WHITE_ROLLS[white_roll], FACE_BY_CODE[black_roll]])
+            for probability, white_roll, black_roll
+            in roll_probabilities(remaining_white, remaining_black, FACE_CODES[clearing_face])]
+
+
+def _transition(remaining_white: int, remaining_black: bool, outcome: ScoredRoll) -> Tuple[int, int, int, int]:
+    """Mirrors the continuation rules of :meth:`TurnLogic.resolve_turn`
+    :return: (kind, points, remaining white, state index) after the roll
+    """
+    if outcome.instant:
+        return _INSTANT, outcome.instant, 0, 0
+    white = remaining_white - outcome.white_used
+    black = remaining_black and not outcome.black_used
+    # if all dice were used, we should continue
+    if white == 0 and not black:
+        return _FORCED, outcome.points, 4, _state_index(4, True, outcome.clearing_face)
+    # if a clearing face was set, we should continue
+    if outcome.clearing_face is not None:
+        return _FORCED, outcome.points, white, _state_index(white, black, outcome.clearing_face)
+    # if no scoring dice were rolled, we need to stop
+    if not outcome.scoring_dice:
+        return _BUST, 0, 0, 0
+    return _DECISION, outcome.points, white, _state_index(white, black, None)
+
+
+class PolicyTable:
+    """The values and decisions of an optimal single turn strategy.
+
+    Attributes
+    -----------
+    max_score: :class:`int`
+        The turn score at which turns are always banked.
+    instant_win_value: :class:`float`
+        The value given to rolling five sixes.
+    instant_loss_value: :class:`float`
+        The value given to rolling five tens.
+    roll_values: List[List[:class:`float`]]
+        The expected final turn score of rolling, indexed by
+        score bucket and dice state.
+    """
+
+    __slots__ = (
+        'max_score',
+        'instant_win_value',
+        'instant_loss_value',
+        'roll_values',
+    )
+
+    def __init__(self, max_score: int, instant_win_value: float, instant_loss_value: float,
+                 roll_values: List[List[float]]):
+        self.max_score: int = max_score
+        self.instant_win_value: float = instant_win_value
+        self.instant_loss_value: float = instant_loss_value
+        self.roll_values: List[List[float]] = roll_values
+
+    def roll_value(self, score: int, remaining_white: int, remaining_black: bool,
+                   clearing_face: Optional[Face] = None) -> float:
+        """Gets the expected final turn score of rolling the remaining dice"""
+        bucket = min(score, self.max_score) // SCORE_STEP
+        return self.roll_values[bucket][_state_index(remaining_white, remaining_black, clearing_face)]
+
+    def keep_playing(self, score: int, remaining_white: int, remaining_black: bool) -> bool:
+        """Gets if rolling is worth more than banking the turn score"""
+        if score >= self.max_score:
+            return False
+        return self.roll_value(score, remaining_white, remaining_black) > score
+
+    def outcome_value(self, score: int, remaining_white: int, remaining_black: bool, outcome: ScoredRoll) -> float:
+        """Gets the expected final turn score after scoring a roll
+        :param score: turn score before the roll was scored
+        :param remaining_white: number of white dice that were rolled
+        :param remaining_black: if the black die was rolled
+        :param outcome: outcome of the roll
+        """
+        kind, points, _, state = _transition(remaining_white, remaining_black, outcome)
+        if kind == _INSTANT:
+            return self.instant_win_value if points == 1 else self.instant_loss_value
+        if kind == _BUST:
+            return 0.0
+        score = min(score + points, self.max_score)
+        value = self.roll_values[score // SCORE_STEP][state]
+        if kind == _DECISION:
+            return value if score < self.max_score and value > score else float(score)
+        return value
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as file:
+            pickle.dump((self.max_score, self.instant_win_value, self.instant_loss_value, self.roll_values),
+                        file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> 'PolicyTable':
+        with open(path, 'rb') as file:
+            return cls(*pickle.load(file))
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} max_score={self.max_score} expected_score={self.roll_value(0, 4, True):.3f}>'
+
+
+class TurnSolver:
+    """Solves the optimal single turn strategy by dynamic programming.
+
+    Attributes
+    -----------
+    max_score: :class:`int`
+        The turn score at which turns are always banked.
+    instant_win_value: :class:`float`
+        The value given to rolling five sixes.  [default 0]
+    instant_loss_value: :class:`float`
+        The value given to rolling five tens.  [default 0]
+    scoring: :class:`ScoringLogic`
+        The rules used to score each roll.
+    """
+
+    __slots__ = (
+        'max_score',
+        'instant_win_value',
+        'instant_loss_value',
+        'scoring',
+    )
+
+    def __init__(self, max_score: int = 1000, instant_win_value: float = 0.0, instant_loss_value: float = 0.0,
+                 scoring: Optional[ScoringLogic] = None):
+        self.max_score: int = max_score - max_score % SCORE_STEP
+        self.instant_win_value: float = instant_win_value
+        self.instant_loss_value: float = instant_loss_value
+        self.scoring: ScoringLogic = scoring or ScoringLogic()
+
+    def solve(self) -> PolicyTable:
+        """Computes the expected value of rolling in every state
+        :return: the solved policy table
+        """
+        max_score = self.max_score
+        instant_values = {1: self.instant_win_value, -1: self.instant_loss_value}
+        table = self.scoring.table
+
+        # every roll, reduced to its possible transitions
+        states = []
+        for remaining_white, remaining_black, clearing_face in product(range(5), (False, True), CLEARING_FACES):
+            if remaining_white == 0 and not remaining_black:
+                continue
+            rolls = []
+            for probability, entry in _roll_distribution(table, remaining_white, remaining_black, clearing_face):
+                options = tuple(_transition(remaining_white, remaining_black, outcome) for outcome in entry.outcomes)
+                rolls.append((probability, options))
+            states.append((_state_index(remaining_white, remaining_black, clearing_face), rolls))
+
+        def roll_value(score: int, values: List[float], higher: List[List[float]]) -> List[float]:
+            """Evaluates every state of a score bucket
+            :param values: values of this bucket, used for clamped scores
+            :param higher: values of every higher bucket
+            """
+            result = [0.0] * _STATES
+            for index, rolls in states:
+                expected = 0.0
+                for probability, options in rolls:
+                    best = None
+                    for kind, points, _, state in options:
+                        if kind == _BUST:
+                            value = 0.0
+                        elif kind == _INSTANT:
+                            value = instant_values[points]
+                        else:
+                            new_score = min(score + points, max_score)
+                            bucket = values if new_score == score else higher[new_score // SCORE_STEP]
+                            value = bucket[state]
+                            if kind == _DECISION and (new_score >= max_score or value < new_score):
+                                value = float(new_score)
+                        if best is None or value > best:
+                            best = value
+                    expected += probability * best
+                result[index] = expected
+            return result
+
+        buckets = max_score // SCORE_STEP + 1
+        roll_values: List[List[float]] = [[0.0] * _STATES for _ in range(buckets)]
+
+        # at the clamped score, forced rolls may lead back into the same
+        # bucket, so its values are found by iterating to a fixed point
+        top = [0.0] * _STATES
+        for _ in range(200):
+            new_top = roll_value(max_score, top, roll_values)
+            converged = max(abs(a - b) for a, b in zip(new_top, top)) < 1e-12
+            top = new_top
+            if converged:
+                break
+        roll_values[-1] = top
+
+        for bucket in range(buckets - 2, -1, -1):
+            roll_values[bucket] = roll_value(bucket * SCORE_STEP, roll_values[bucket], roll_values)
+
+        return PolicyTable(max_score, self.instant_win_value, self.instant_loss_value, roll_values)
+
+
+class OptimalPolicy(Policy):
+    """A policy that follows a solved :class:`PolicyTable`.
+
+    Sun die decisions compare the value of each possible outcome of
+    the roll, so the turn must be scored through the scoring table.
+
+    Attributes
+    -----------
+    table: :class:`PolicyTable`
+        The solved policy table.
+    """
+
+    __slots__ = ('table',)
+
+    def __init__(self, table: Optional[PolicyTable] = None):
+        self.table: PolicyTable = table or TurnSolver().solve()
+
+    def _outcome_values(self, turn) -> List[float]:
+        entry = turn.scoring.lookup(turn)
+        outcome_value = self.table.outcome_value
+        return [outcome_value(turn.score, turn.remaining_white, turn.remaining_black, outcome)
+                for outcome in entry.outcomes]
+
+    def keep_playing_choice(self, turn) -> int:
+        return 1 if self.table.keep_playing(turn.score, turn.remaining_white, turn.remaining_black) else 2
+
+    def sun_die_use_choice(self, turn) -> int:
+        five, ten, kept = self._outcome_values(turn)
+        return 1 if max(five, ten) >= kept else 2
+
+    def sun_die_point_choice(self, turn) -> int:
+        values = self._outcome_values(turn)
+        return 2 if values[1] >= values[0] else 1
+
+    def sun_trio_choice(self, turn, faces: List[Face]) -> int:
+        first, second = self._outcome_values(turn)
+        return 2 if second > first else 1
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} table={self.table!r}>'
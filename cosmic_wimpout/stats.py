@@ -0,0 +1,417 @@
+"""
+Streaming turn statistics
+
+Aggregates simulated turns in constant memory, however many are played:
+running moments, a fixed-bucket score histogram, a quantile sketch and
+counters per scoring rule and clearing face. Every aggregate can be
+merged with one built by another worker, and converted to and from a
+JSON compatible dict, so shards of a run can be combined anywhere.
+"""
+
+from collections import Counter
+from math import ceil, log
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from .events import ClearingFaceEvent, RollEvent, ScoreEvent, TurnEndEvent, TurnEvent
+
+# numpy is only needed by the batch methods, so the scalar engines never import it
+if TYPE_CHECKING:
+    import numpy as np
+
+
+__all__ = (
+    'RunningStats',
+    'ScoreHistogram',
+    'QuantileSketch',
+    'TurnStatistics',
+)
+
+
+class RunningStats:
+    """Running mean and variance, updated with Welford's algorithm.
+
+    Attributes
+    -----------
+    count: :class:`int`
+        The number of values added.
+    mean: :class:`float`
+        The mean of the values.
+    m2: :class:`float`
+        The sum of squared differences from the mean.
+    """
+
+    __slots__ = (
+        'count',
+        'mean',
+        'm2',
+    )
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count: int = count
+        self.mean: float = mean
+        self.m2: float = m2
+
+    @property
+    def variance(self) -> float:
+        """The sample variance of the values"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return self.variance ** 0.5
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def add_many(self, values: 'np.ndarray') -> None:
+        """Adds an array of values at once"""
+        if len(values):
+            mean = float(values.mean())
+            self.merge(RunningStats(len(values), mean, float(((values - mean) ** 2).sum())))
+
+    def merge(self, other: 'RunningStats') -> None:
+        """Adds the values of another aggregate to this one"""
+        count = self.count + other.count
+        if not count:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RunningStats':
+        return cls(data['count'], data['mean'], data['m2'])
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} count={self.count} mean={self.mean:.3f} std={self.std:.3f}>'
+
+
+class ScoreHistogram:
+    """Counts of scores in fixed-width buckets.
+
+    Bucket ``i`` counts the scores from ``i * bucket_width`` up to the
+    next bucket, and the last bucket counts every score above them.
+
+    Attributes
+    -----------
+    bucket_width: :class:`int`
+        The range of scores counted by each bucket.
+    counts: List[:class:`int`]
+        The count of each bucket.
+    """
+
+    __slots__ = (
+        'bucket_width',
+        'counts',
+    )
+
+    def __init__(self, bucket_width: int = 5, buckets: int = 200):
+        self.bucket_width: int = bucket_width
+        self.counts = [0] * (buckets + 1)
+
+    def add(self, score: int) -> None:
+        self.counts[min(score // self.bucket_width, len(self.counts) - 1)] += 1
+
+    def add_many(self, scores: 'np.ndarray') -> None:
+        """Adds an array of scores at once"""
+        import numpy as np
+        buckets = np.minimum(scores // self.bucket_width, len(self.counts) - 1)
+        for bucket, count in enumerate(np.bincount(buckets, minlength=len(self.counts)).tolist()):
+            self.counts[bucket] += count
+
+    def merge(self, other: 'ScoreHistogram') -> None:
+        """Adds the counts of another histogram with the same buckets to this one"""
+        if other.bucket_width != self.bucket_width or len(other.counts) != len(self.counts):
+            raise ValueError('Only histograms with the same buckets can be merged')
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'bucket_width': self.bucket_width, 'counts': list(self.counts)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ScoreHistogram':
+        histogram = cls(data['bucket_width'], len(data['counts']) - 1)
+        histogram.counts = list(data['counts'])
+        return histogram
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} bucket_width={self.bucket_width} buckets={len(self.counts) - 1}>'
+
+
+class QuantileSketch:
+    """A mergeable sketch of non-negative values with relative error quantiles.
+
+    Values are counted in logarithmic bins, as in DDSketch, so every
+    quantile is within ``relative_accuracy`` of an actual value. When
+    more than ``max_bins`` bins are used, the lowest ones are collapsed,
+    which only loses accuracy on the smallest values.
+
+    Attributes
+    -----------
+    relative_accuracy: :class:`float`
+        The relative error of every quantile.
+    max_bins: :class:`int`
+        The most bins kept.
+    count: :class:`int`
+        The number of values added.
+    zero_count: :class:`int`
+        The number of zeros added.
+    bins: Dict[:class:`int`, :class:`int`]
+        The count of each logarithmic bin.
+    """
+
+    __slots__ = (
+        'relative_accuracy',
+        'max_bins',
+        'count',
+        'zero_count',
+        'bins',
+        '_log_gamma',
+    )
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy: float = relative_accuracy
+        self.max_bins: int = max_bins
+        self.count: int = 0
+        self.zero_count: int = 0
+        self.bins: Dict[int, int] = {}
+        self._log_gamma: float = log((1 + relative_accuracy) / (1 - relative_accuracy))
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value < 0:
+            raise ValueError('Only non-negative values can be sketched')
+        self.count += count
+        if value == 0:
+            self.zero_count += count
+            return
+        key = ceil(log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def add_many(self, values: 'np.ndarray') -> None:
+        """Adds an array of values at once"""
+        if len(values) and values.min() < 0:
+            raise ValueError('Only non-negative values can be sketched')
+        import numpy as np
+        positive = values[values > 0]
+        self.count += len(values)
+        self.zero_count += len(values) - len(positive)
+        keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma), return_counts=True)
+        for key, count in zip(keys.astype(np.int64).tolist(), counts.tolist()):
+            self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        keys = sorted(self.bins)
+        collapsed = keys[:len(keys) - self.max_bins + 1]
+        lowest = collapsed[-1]
+        for key in collapsed[:-1]:
+            self.bins[lowest] += self.bins.pop(key)
+
+    def quantile(self, q: float) -> float:
+        """Gets a quantile of the values
+        :param q: quantile between 0 and 1
+        :return: the estimated value, or ``nan`` if the sketch is empty
+        """
+        if not self.count:
+            return float('nan')
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        gamma = (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # the value with the same relative error to both bin edges
+                return 2 * gamma ** key / (gamma + 1)
+        return 2 * gamma ** max(self.bins) / (gamma + 1)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """Adds the values of another sketch with the same accuracy to this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Only sketches with the same accuracy can be merged')
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def to_dict(self) -> Dict[str, Any]:
+        # JSON objects only have string keys
+        return {'relative_accuracy': self.relative_accuracy, 'max_bins': self.max_bins, 'count': self.count,
+                'zero_count': self.zero_count, 'bins': {str(key): count for key, count in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'], data['max_bins'])
+        sketch.count = data['count']
+        sketch.zero_count = data['zero_count']
+        sketch.bins = {int(key): count for key, count in data['bins'].items()}
+        return sketch
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} count={self.count} relative_accuracy={self.relative_accuracy} '
+                f'bins={len(self.bins)}>')
+
+
+class TurnStatistics:
+    """Constant memory statistics of turns.
+
+    Attach it to the ``listeners`` of a turn logic to count every rule
+    and clearing face, or feed final scores straight to :meth:`add_turn`
+    and :meth:`add_scores` when only the scores are needed.
+
+    Attributes
+    -----------
+    scores: :class:`RunningStats`
+        The moments of the final scores, counting instant wins and losses as ``0``.
+    histogram: :class:`ScoreHistogram`
+        The histogram of the final scores.
+    sketch: :class:`QuantileSketch`
+        The quantile sketch of the final scores.
+    busts: :class:`int`
+        The number of turns that ended without points.
+    instant_wins: :class:`int`
+        The number of turns that rolled five sixes.
+    instant_losses: :class:`int`
+        The number of turns that rolled five tens.
+    rolls: :class:`int`
+        The number of rolls heard.
+    rules: Counter[:class:`str`]
+        The number of times each rule was heard to fire.
+    rule_points: Counter[:class:`str`]
+        The number of points scored by each rule.
+    clearing_faces: Counter[:class:`str`]
+        The number of times each face had to be cleared, by face name.
+    """
+
+    __slots__ = (
+        'scores',
+        'histogram',
+        'sketch',
+        'busts',
+        'instant_wins',
+        'instant_losses',
+        'rolls',
+        'rules',
+        'rule_points',
+        'clearing_faces',
+    )
+
+    def __init__(self, histogram: Optional[ScoreHistogram] = None, sketch: Optional[QuantileSketch] = None):
+        self.scores: RunningStats = RunningStats()
+        self.histogram: ScoreHistogram = histogram or ScoreHistogram()
+        self.sketch: QuantileSketch = sketch or QuantileSketch()
+        self.busts: int = 0
+        self.instant_wins: int = 0
+        self.instant_losses: int = 0
+        self.rolls: int = 0
+        self.rules: Counter = Counter()
+        self.rule_points: Counter = Counter()
+        self.clearing_faces: Counter = Counter()
+
+    @property
+    def turns(self) -> int:
+        return self.scores.count
+
+    def __call__(self, event: TurnEvent) -> None:
+        if isinstance(event, ScoreEvent):
+            self.rules[event.rule] += 1
+            self.rule_points[event.rule] += event.points
+        elif isinstance(event, RollEvent):
+            self.rolls += 1
+        elif isinstance(event, ClearingFaceEvent):
+            if event.face is not None:
+                self.clearing_faces[event.face.name] += 1
+        elif isinstance(event, TurnEndEvent):
+            self.add_turn(event.score)
+
+    def add_turn(self, score: int) -> None:
+        """Adds the final score of a turn, where ``0`` is a bust"""
+        self.scores.add(score)
+        self.histogram.add(score)
+        self.sketch.add(score)
+        if score == 0:
+            self.busts += 1
+
+    def add_instant(self, won: bool) -> None:
+        """Adds a turn that instantly won or lost, scoring ``0``"""
+        self.scores.add(0)
+        self.histogram.add(0)
+        self.sketch.add(0)
+        if won:
+            self.instant_wins += 1
+        else:
+            self.instant_losses += 1
+
+    def add_scores(self, scores: 'np.ndarray', instant_wins: int = 0, instant_losses: int = 0) -> None:
+        """Adds the final scores of many turns at once
+        :param scores: final score of every turn that did not end instantly
+        :param instant_wins: number of other turns that rolled five sixes  [default 0]
+        :param instant_losses: number of other turns that rolled five tens  [default 0]
+        """
+        instants = instant_wins + instant_losses
+        if instants:
+            import numpy as np
+            scores = np.concatenate([scores, np.zeros(instants, scores.dtype)])
+        self.scores.add_many(scores)
+        self.histogram.add_many(scores)
+        self.sketch.add_many(scores)
+        self.busts += int((scores == 0).sum()) - instants
+        self.instant_wins += instant_wins
+        self.instant_losses += instant_losses
+
+    def merge(self, other: 'TurnStatistics') -> None:
+        """Adds the statistics gathered by another worker to these"""
+        self.scores.merge(other.scores)
+        self.histogram.merge(other.histogram)
+        self.sketch.merge(other.sketch)
+        self.busts += other.busts
+        self.instant_wins += other.instant_wins
+        self.instant_losses += other.instant_losses
+        self.rolls += other.rolls
+        self.rules.update(other.rules)
+        self.rule_points.update(other.rule_points)
+        self.clearing_faces.update(other.clearing_faces)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'scores': self.scores.to_dict(),
+            'histogram': self.histogram.to_dict(),
+            'sketch': self.sketch.to_dict(),
+            'busts': self.busts,
+            'instant_wins': self.instant_wins,
+            'instant_losses': self.instant_losses,
+            'rolls': self.rolls,
+            'rules': dict(self.rules),
+            'rule_points': dict(self.rule_points),
+            'clearing_faces': dict(self.clearing_faces),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TurnStatistics':
+        statistics = cls(ScoreHistogram.from_dict(data['histogram']), QuantileSketch.from_dict(data['sketch']))
+        statistics.scores = RunningStats.from_dict(data['scores'])
+        statistics.busts = data['busts']
+        statistics.instant_wins = data['instant_wins']
+        statistics.instant_losses = data['instant_losses']
+        statistics.rolls = data['rolls']
+        statistics.rules = Counter(data['rules'])
+        statistics.rule_points = Counter(data['rule_points'])
+        statistics.clearing_faces = Counter(data['clearing_faces'])
+        return statistics
+
+    def __repr__(self) -> str:
+        return (f'<{self.__class__.__name__} turns={self.turns} mean={self.scores.mean:.3f} '
+                f'median={self.sketch.quantile(0.5):.1f} busts={self.busts}>')
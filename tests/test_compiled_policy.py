@@ -0,0 +1,61 @@
+import pickle
+
+import pytest
+
+from cosmic_wimpout.compiled_policy import CompiledPolicy, compile_policy
+from cosmic_wimpout.policy import Policy, ThresholdPolicy
+from cosmic_wimpout.rng import DiceStream
+from cosmic_wimpout.simulator import TurnSimulator
+from cosmic_wimpout.solver import OptimalPolicy, TurnSolver
+from cosmic_wimpout.throwables import CosmicWimpoutException
+
+
+@pytest.fixture(scope='module')
+def optimal():
+    return OptimalPolicy(TurnSolver().solve())
+
+
+@pytest.fixture(scope='module')
+def optimal_path(tmp_path_factory, optimal):
+    path = str(tmp_path_factory.mktemp('compiled') / 'optimal.cwp')
+    compile_policy(optimal, path=path)
+    return path
+
+
+def turn_scores(policy, turns=5000, seed=0):
+    simulator = TurnSimulator(policy, DiceStream(seed))
+    scores = []
+    for _ in range(turns):
+        try:
+            scores.append(simulator.play_turn())
+        except CosmicWimpoutException as exception:
+            scores.append(type(exception).__name__)
+    return scores
+
+
+@pytest.mark.parametrize('make_policy', [Policy, ThresholdPolicy, lambda: ThresholdPolicy(100, 2)])
+def test_compiled_policy_plays_like_its_policy(make_policy):
+    policy = make_policy()
+    assert turn_scores(compile_policy(policy)) == turn_scores(policy)
+
+
+def test_compiled_optimal_policy_plays_like_its_policy(optimal, optimal_path):
+    assert turn_scores(CompiledPolicy.load(optimal_path), seed=1) == turn_scores(optimal, seed=1)
+
+
+def test_compiled_keep_playing_choices_match(optimal, optimal_path):
+    compiled = CompiledPolicy.load(optimal_path)
+    turn = TurnSimulator(optimal).turn_logic
+    for score in range(0, 1001, 5):
+        turn.score = score
+        for remaining_white in range(5):
+            turn.remaining_white = remaining_white
+            for remaining_black in (False, True):
+                turn.remaining_black = remaining_black
+                assert compiled.keep_playing_choice(turn) == optimal.keep_playing_choice(turn), \
+                    (score, remaining_white, remaining_black)
+
+
+def test_pickled_policy_decides_the_same(optimal, optimal_path):
+    loaded = pickle.loads(pickle.dumps(CompiledPolicy.load(optimal_path)))
+    assert turn_scores(loaded, seed=2) == turn_scores(optimal, seed=2)
@@ -0,0 +1,68 @@
+from collections import Counter
+from fractions import Fraction
+from itertools import product
+from math import sqrt
+
+import pytest
+
+from cosmic_wimpout.batch import BatchThresholdPolicy, BatchTurnLogic
+from cosmic_wimpout.distribution import TurnAnalyzer
+from cosmic_wimpout.policy import ThresholdPolicy
+from cosmic_wimpout.rng import DiceStream
+from cosmic_wimpout.rolls import ROLL_FACES, WHITE_FACES, WHITE_ROLL_INDEX, roll_sampler
+from cosmic_wimpout.simulator import TurnSimulator
+
+
+TURNS = 100_000
+
+
+@pytest.fixture(scope='module')
+def exact():
+    return TurnAnalyzer(ThresholdPolicy()).distribution()
+
+
+def assert_close(result, exact):
+    # fixed seeds make the simulations deterministic, and five standard
+    # errors leave room for a change of seed
+    error = 5 * sqrt(exact.variance / result.turns)
+    assert abs(result.mean_score - exact.mean) < error
+    assert abs(result.busts / result.turns - exact.bust) < 0.01
+
+
+def test_scalar_engine_matches_the_exact_mean(exact):
+    assert_close(TurnSimulator(ThresholdPolicy(), DiceStream(0)).simulate(TURNS), exact)
+
+
+def test_batch_engine_matches_the_exact_mean(exact):
+    batch = BatchTurnLogic(10_000, BatchThresholdPolicy(), DiceStream(0))
+    assert_close(batch.simulate(TURNS), exact)
+
+
+def test_engines_are_deterministic():
+    def scalar():
+        return TurnSimulator(ThresholdPolicy(), DiceStream(1)).simulate(5000).total_score
+
+    def batch():
+        return BatchTurnLogic(1000, BatchThresholdPolicy(), DiceStream(1)).simulate(5000).total_score
+
+    assert scalar() == scalar()
+    assert batch() == batch()
+
+
+@pytest.mark.parametrize('remaining_white', range(5))
+@pytest.mark.parametrize('remaining_black', [False, True])
+@pytest.mark.parametrize('clearing', range(len(ROLL_FACES)))
+def test_one_pick_rolls_like_rolling_die_by_die(remaining_white, remaining_black, clearing):
+    white_die_faces, black_die_faces = ROLL_FACES[clearing]
+    die_by_die = Counter()
+    for faces in product(white_die_faces, repeat=remaining_white):
+        counts = [0] * len(WHITE_FACES)
+        for position in faces:
+            counts[position] += 1
+        for black_roll in black_die_faces if remaining_black else (0,):
+            die_by_die[WHITE_ROLL_INDEX[tuple(counts)] << 3 | black_roll] += 1
+
+    rolls = roll_sampler(remaining_white, remaining_black, clearing)
+    total = sum(die_by_die.values())
+    assert {roll: Fraction(count, len(rolls)) for roll, count in Counter(rolls).items()} == \
+        {roll: Fraction(count, total) for roll, count in die_by_die.items()}
@@ -0,0 +1,49 @@
+import numpy as np
+
+from cosmic_wimpout.policy import Policy, ThresholdPolicy
+from cosmic_wimpout.replay import ReplayLog, record_games, record_turns
+from cosmic_wimpout.rng import DiceStream
+from cosmic_wimpout.simulator import TurnSimulator
+from cosmic_wimpout.throwables import CosmicWimpoutException
+
+
+def test_replaying_turns_reproduces_their_scores(tmp_path):
+    path = str(tmp_path / 'turns.log')
+    record_turns(path, 3000, ThresholdPolicy(), seed=1)
+    log = ReplayLog(path)
+
+    scores = log.turn_scores()
+    assert len(scores) == 3000
+    assert np.array_equal(log.replay(), scores)
+
+
+def test_logged_scores_are_the_scores_played(tmp_path):
+    path = str(tmp_path / 'turns.log')
+    record_turns(path, 2000, ThresholdPolicy(), seed=2)
+
+    simulator = TurnSimulator(ThresholdPolicy(), DiceStream(2))
+    played = []
+    for _ in range(2000):
+        try:
+            played.append(simulator.play_turn())
+        except CosmicWimpoutException:
+            played.append(0)
+    assert ReplayLog(path).turn_scores().tolist() == played
+
+
+def test_replaying_games_reproduces_their_scores(tmp_path):
+    path = str(tmp_path / 'games.log')
+    record_games(path, 20, [ThresholdPolicy(), Policy()], goal=200, seed=3)
+    log = ReplayLog(path)
+
+    assert np.array_equal(log.replay(), log.turn_scores())
+
+
+def test_an_appended_log_replays_whole(tmp_path):
+    path = str(tmp_path / 'turns.log')
+    record_turns(path, 500, seed=4)
+    record_turns(path, 500, seed=5)
+    log = ReplayLog(path)
+
+    assert len(log.turn_starts) == 1000
+    assert np.array_equal(log.replay(), log.turn_scores())
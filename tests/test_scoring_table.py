@@ -0,0 +1,87 @@
+import pytest
+
+from cosmic_wimpout import house_rules
+from cosmic_wimpout.cosmic_wimpout import ScoringLogic, TurnLogic
+from cosmic_wimpout.dice import Face
+from cosmic_wimpout.policy import Policy
+from cosmic_wimpout.rng import DiceStream
+from cosmic_wimpout.rolls import FACE_CODES, WHITE_ROLL_INDEX
+from cosmic_wimpout.scoring_table import DECISION_ANSWERS, build_scoring_table, get_scoring_table
+from cosmic_wimpout.simulator import TurnSimulator
+from cosmic_wimpout.solver import OptimalPolicy, TurnSolver
+from cosmic_wimpout.stats import TurnStatistics
+from cosmic_wimpout.throwables import PlayerInstantlyLost, PlayerInstantlyWon
+
+
+class ChoicePolicy(Policy):
+    """Answers every sun die decision with the same choice"""
+
+    __slots__ = ('choice',)
+
+    def __init__(self, choice: int):
+        self.choice = choice
+
+    def sun_die_use_choice(self, turn) -> int:
+        return self.choice
+
+    def sun_die_point_choice(self, turn) -> int:
+        return self.choice
+
+    def sun_trio_choice(self, turn, faces) -> int:
+        return self.choice
+
+
+def house_scoring():
+    scoring = ScoringLogic()
+    scoring.register(house_rules.sun_freight_train, before='three_of_a_kind')
+    scoring.register(house_rules.free_flash)
+    return scoring
+
+
+def scored(turn_logic, key, score_roll):
+    counts, black_die_roll = key
+    turn_logic.reset()
+    turn_logic.white_roll = WHITE_ROLL_INDEX[counts]
+    turn_logic.black_roll = FACE_CODES[black_die_roll]
+    turn_logic.remaining_white = sum(counts)
+    turn_logic.remaining_black = black_die_roll is not None
+    try:
+        score_roll()
+    except PlayerInstantlyWon:
+        return 'won'
+    except PlayerInstantlyLost:
+        return 'lost'
+    return (turn_logic.score, turn_logic.remaining_white, turn_logic.remaining_black,
+            turn_logic.clearing, turn_logic.scoring_dice)
+
+
+def test_built_table_matches_the_cached_table():
+    assert build_scoring_table() == get_scoring_table()
+
+
+@pytest.mark.parametrize('make_scoring', [ScoringLogic, house_scoring])
+@pytest.mark.parametrize('choice', [1, 2])
+def test_rule_walk_scores_every_roll_like_the_table(make_scoring, choice):
+    turn_logic = TurnLogic(verbose=False, decisions=ChoicePolicy(choice), scoring=make_scoring())
+    for key in turn_logic.scoring.table:
+        assert scored(turn_logic, key, turn_logic._score_roll) == \
+            scored(turn_logic, key, turn_logic._lookup_roll), key
+
+
+def test_every_decision_has_an_outcome_per_answer():
+    for entry in get_scoring_table().values():
+        assert len(entry.outcomes) == len(DECISION_ANSWERS[entry.decision])
+
+
+def test_listeners_do_not_change_how_turns_are_played():
+    policy = OptimalPolicy(TurnSolver().solve())
+    results = []
+    for count_rules in (False, True):
+        simulator = TurnSimulator(policy, DiceStream(3))
+        result = simulator.simulate(20_000, TurnStatistics(), count_rules=count_rules)
+        results.append((result.total_score, result.busts, result.instant_wins, result.instant_losses))
+    assert results[0] == results[1]
+
+
+def test_five_threes_score_nothing():
+    assert TurnLogic.get_five_of_a_kind_points(Face.THREE) == 0